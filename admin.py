@@ -1,63 +1,97 @@
-import pytesseract
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
 import os
 import uuid
+import logging
 from db_utils import admin_required, get_db_connection
+from stats_utils import get_admin_stats
+from sql_stats_utils import get_sql_metrics
+from reference_utils import get_reference, invalidate_reference
+from autocomplete_utils import get_autocomplete
+from pagination_utils import InvalidCursor, encode_cursor, decode_cursor, parse_limit, like_escape
+from ocr_utils import enqueue_ocr, get_ocr_status, wake_ocr_queue
+from blob_utils import store_blob, release_blob, delete_released
+from image_utils import enqueue_variants, wake_image_queue, DEFAULT_LIST_VARIANT
+from nutrition_utils import enqueue_product_nutrition, wake_nutrition_queue
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+logger = logging.getLogger(__name__)
 
+ADMIN_PAGE_SIZE = 50
+ADMIN_MAX_PAGE_SIZE = 200
+LOOKUP_LIMIT = 20
 
-# Context processor to inject stats into all admin templates
-@admin_bp.context_processor
-def inject_stats():
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    # Count users
-    cur.execute("SELECT COUNT(*) FROM users")
-    result = cur.fetchone()
-    user_count = result['count'] if result else 0  # Change this line
+# Type-ahead filter sources: kind -> (table, label expression, searched expressions)
+LOOKUPS = {
+    'brands': ('brands', 'name', ['name']),
+    'base-ingredients': ('base_ingredients', 'name', ['name']),
+    'users': ('users', "first_name || ' ' || last_name", ["first_name || ' ' || last_name", 'email']),
+}
 
-    # Count recipes
-    cur.execute("SELECT COUNT(*) FROM recipes")
-    result = cur.fetchone()
-    recipe_count = result['count'] if result else 0  # And this line
 
-    # Count ingredients
-    cur.execute("SELECT COUNT(*) FROM base_ingredients")
-    result = cur.fetchone()
-    ingredient_count = result['count'] if result else 0  # And this line
+def _uuid_arg(name):
+    """A UUID query parameter as a string, or None if missing or malformed."""
+    value = request.args.get(name)
+    try:
+        return str(uuid.UUID(value)) if value else None
+    except ValueError:
+        return None
 
-    # Count brands
-    cur.execute("SELECT COUNT(*) FROM brands")
-    result = cur.fetchone()
-    brand_count = result['count'] if result else 0  # And this line
 
-    # Count additives
-    cur.execute("SELECT COUNT(*) FROM additives")
-    result = cur.fetchone()
-    additive_count = result['count'] if result else 0  # And this line
+def _keyset_page(cur, query, params, keys, descending=False):
+    """Run one page of a listing query, resuming after the ``after`` cursor.
 
-    # Count Branded Ingredients
-    cur.execute("SELECT COUNT(*) FROM branded_ingredients")
-    result = cur.fetchone()
-    product_count = result['count'] if result else 0  # And this line
+    ``query`` must end inside its WHERE clause. ``keys`` lists the sort key as
+    (sql expression, result column, cast) tuples and must be unique per row.
+    Returns the rows plus the pagination links for the template.
+    """
+    per_page = parse_limit(request.args.get('per_page'), ADMIN_PAGE_SIZE, ADMIN_MAX_PAGE_SIZE)
+    after = request.args.get('after')
+    if after:
+        try:
+            values = decode_cursor(after, len(keys))
+        except InvalidCursor:
+            values = None
+        if values:
+            columns = ', '.join(expr for expr, _, _ in keys)
+            placeholders = ', '.join('%s' + cast for _, _, cast in keys)
+            query += f" AND ({columns}) {'<' if descending else '>'} ({placeholders})"
+            params = params + values
 
-    cur.close()
-    conn.close()
+    direction = ' DESC' if descending else ''
+    query += ' ORDER BY ' + ', '.join(expr + direction for expr, _, _ in keys) + ' LIMIT %s'
+    cur.execute(query, params + [per_page + 1])
+    rows = cur.fetchall()
 
-    stats = {
-        'user_count': user_count,
-        'recipe_count': recipe_count,
-        'ingredient_count': ingredient_count,
-        'brand_count': brand_count,
-        'additive_count': additive_count,
-        'product_count': product_count
+    args = request.args.to_dict()
+    args.pop('after', None)
+    page = {
+        'first_url': url_for(request.endpoint, **args) if after else None,
+        'next_url': None,
     }
-    return dict(stats=stats)
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        page['next_url'] = url_for(request.endpoint, **args,
+                                   after=encode_cursor(*(last[column] for _, column, _ in keys)))
+    return rows, page
+
+
+def _lookup_label(cur, kind, id):
+    """Display label for a selected type-ahead filter value."""
+    if not id:
+        return ''
+    table, label, _ = LOOKUPS[kind]
+    cur.execute(f'SELECT {label} AS label FROM {table} WHERE id = %s', (id,))
+    row = cur.fetchone()
+    return row['label'] if row else ''
+
+
+# Context processor to inject stats into all admin templates
+@admin_bp.context_processor
+def inject_stats():
+    # Counts come from the trigger-maintained table_counts table (cached)
+    return dict(stats=get_admin_stats())
 
 @admin_bp.route('/')
 @login_required
@@ -66,6 +100,44 @@ def dashboard():
     # With the context processor, stats is injected automatically.
     return render_template('admin/dashboard.html')
 
+# JSON source for the type-ahead filter widgets on the list pages
+@admin_bp.route('/lookup/<kind>')
+@login_required
+@admin_required
+def lookup(kind):
+    if kind not in LOOKUPS:
+        return jsonify({"error": "Unknown lookup"}), 404
+
+    table, label, searched = LOOKUPS[kind]
+    term = like_escape(request.args.get('q', '').strip())
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    try:
+        # Prefix matches first, then anything containing the term
+        cur.execute(f'''
+            SELECT id, {label} AS label
+            FROM {table}
+            WHERE {' OR '.join(f'{expr} ILIKE %(contains)s' for expr in searched)}
+            ORDER BY ({label}) ILIKE %(prefix)s DESC, {label}
+            LIMIT %(limit)s
+        ''', {'contains': f'%{term}%', 'prefix': f'{term}%', 'limit': LOOKUP_LIMIT})
+        return jsonify([{"id": str(row['id']), "label": row['label']} for row in cur.fetchall()])
+    finally:
+        cur.close()
+        conn.close()
+
+# Query counts and DB time per endpoint for this process (sql_stats_utils);
+# POST clears them to start a fresh measurement
+@admin_bp.route('/sql-stats', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def sql_stats():
+    metrics = get_sql_metrics()
+    if request.method == 'POST':
+        metrics.clear()
+    return jsonify(metrics.snapshot())
+
 # Cuisines Management
 @admin_bp.route('/cuisines')
 @login_required
@@ -75,20 +147,10 @@ def cuisines():
     cur = conn.cursor()
     
     # Get filter parameters
-    name_filter = request.args.get('name', '')
+    name_filter = request.args.get('name', '').casefold()
     
-    # Build query based on filters
-    query = 'SELECT * FROM cuisines WHERE 1=1'
-    params = []
-    
-    if name_filter:
-        query += ' AND name ILIKE %s'
-        params.append(f'%{name_filter}%')
-    
-    query += ' ORDER BY name'
-    
-    cur.execute(query, params)
-    cuisines = cur.fetchall()
+    # Served from the reference-data cache, already sorted by name
+    cuisines = [c for c in get_reference(cur, 'cuisines') if name_filter in c['name'].casefold()]
     
     cur.close()
     conn.close()
@@ -122,6 +184,7 @@ def add_cuisine():
                 (name, name_hindi, name_gujarati, name_marathi, name_tamil)
             )
             conn.commit()
+            invalidate_reference('cuisines')
             flash('Cuisine added successfully', 'success')
             return redirect(url_for('admin.cuisines'))
         except Exception as e:
@@ -170,6 +233,7 @@ def edit_cuisine(id):
                 (name, name_hindi, name_gujarati, name_marathi, name_tamil, str(id))
             )
             conn.commit()
+            invalidate_reference('cuisines')
             flash('Cuisine updated successfully', 'success')
             return redirect(url_for('admin.cuisines'))
         except Exception as e:
@@ -199,6 +263,7 @@ def delete_cuisine(id):
         
         cur.execute('DELETE FROM cuisines WHERE id = %s', (str(id),))
         conn.commit()
+        invalidate_reference('cuisines')
         flash('Cuisine deleted successfully', 'success')
     except Exception as e:
         conn.rollback()
@@ -217,16 +282,37 @@ def base_ingredients():
     conn = get_db_connection()
     cur = conn.cursor()
     
-    # Get all ingredients
-    cur.execute('''
+    # Get filter parameters
+    search = request.args.get('search', '').strip()
+    category_id = _uuid_arg('category_id')
+    is_verified = request.args.get('is_verified')
+    
+    query = '''
         SELECT bi.*, ic.name as category_name 
         FROM base_ingredients bi
         LEFT JOIN ingredient_categories ic ON bi.category_id = ic.id
-        ORDER BY bi.name
-    ''')
-    ingredients = cur.fetchall()
+        WHERE 1=1
+    '''
+    params = []
+    
+    if search:
+        # Every name column has a trigram index (migrations/003)
+        query += ''' AND (bi.name ILIKE %s OR bi.name_hindi ILIKE %s OR bi.name_gujarati ILIKE %s
+                        OR bi.name_marathi ILIKE %s OR bi.name_tamil ILIKE %s)'''
+        params.extend([f'%{like_escape(search)}%'] * 5)
     
-    # Get all categories for the filter dropdown
+    if category_id:
+        query += " AND bi.category_id = %s"
+        params.append(category_id)
+    
+    if is_verified:
+        query += " AND bi.is_verified = %s"
+        params.append(is_verified.lower() == 'true')
+    
+    ingredients, page = _keyset_page(cur, query, params,
+                                     [('bi.name', 'name', ''), ('bi.id', 'id', '::uuid')])
+    
+    # Categories are a short reference list, so the filter dropdown still loads them all
     cur.execute('SELECT id, name FROM ingredient_categories ORDER BY name')
     categories = cur.fetchall()
     
@@ -235,7 +321,8 @@ def base_ingredients():
     
     return render_template('admin/base_ingredients/index.html', 
                            ingredients=ingredients,
-                           categories=categories)
+                           categories=categories,
+                           page=page)
 
 @admin_bp.route('/base-ingredients/add', methods=['GET', 'POST'])
 @login_required
@@ -277,6 +364,7 @@ def add_base_ingredient():
                 INSERT INTO base_ingredients 
                 (name, name_hindi, name_gujarati, name_marathi, name_tamil, category_id, is_verified, added_by_user_id)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
                 ''',
                 (
                     name, name_hindi, name_gujarati, name_marathi, name_tamil, 
@@ -285,7 +373,11 @@ def add_base_ingredient():
                     current_user.id
                 )
             )
+            new_id = cur.fetchone()['id']
             conn.commit()
+            autocomplete = get_autocomplete()
+            if autocomplete:
+                autocomplete.ingredient_saved(new_id, name, name_hindi, name_gujarati, name_marathi, name_tamil)
             flash('Base ingredient added successfully', 'success')
             return redirect(url_for('admin.base_ingredients'))
         except Exception as e:
@@ -352,6 +444,9 @@ def edit_base_ingredient(id):
                 )
             )
             conn.commit()
+            autocomplete = get_autocomplete()
+            if autocomplete:
+                autocomplete.ingredient_saved(id, name, name_hindi, name_gujarati, name_marathi, name_tamil)
             flash('Base ingredient updated successfully', 'success')
             return redirect(url_for('admin.base_ingredients'))
         except Exception as e:
@@ -386,6 +481,9 @@ def delete_base_ingredient(id):
         
         cur.execute('DELETE FROM base_ingredients WHERE id = %s', (str(id),))
         conn.commit()
+        autocomplete = get_autocomplete()
+        if autocomplete:
+            autocomplete.ingredient_deleted(id)
         flash('Base ingredient deleted successfully', 'success')
     except Exception as e:
         conn.rollback()
@@ -442,10 +540,15 @@ def add_brand():
                 '''
                 INSERT INTO brands (name, is_verified, added_by_user_id)
                 VALUES (%s, %s, %s)
+                RETURNING id
                 ''',
                 (name, is_verified, current_user.id)
             )
+            new_id = cur.fetchone()['id']
             conn.commit()
+            autocomplete = get_autocomplete()
+            if autocomplete:
+                autocomplete.brand_saved(new_id, name)
             flash('Brand added successfully', 'success')
             return redirect(url_for('admin.brands'))
         except Exception as e:
@@ -491,6 +594,9 @@ def edit_brand(id):
                 (name, is_verified, str(id))
             )
             conn.commit()
+            autocomplete = get_autocomplete()
+            if autocomplete:
+                autocomplete.brand_saved(id, name)
             flash('Brand updated successfully', 'success')
             return redirect(url_for('admin.brands'))
         except Exception as e:
@@ -520,6 +626,9 @@ def delete_brand(id):
         
         cur.execute('DELETE FROM brands WHERE id = %s', (str(id),))
         conn.commit()
+        autocomplete = get_autocomplete()
+        if autocomplete:
+            autocomplete.brand_deleted(id)
         flash('Brand deleted successfully', 'success')
     except Exception as e:
         conn.rollback()
@@ -538,32 +647,57 @@ def branded_ingredients():
     conn = get_db_connection()
     cur = conn.cursor()
     
-    # Get branded ingredients
-    cur.execute('''
+    # Get filter parameters
+    search = request.args.get('search', '').strip()
+    brand_id = _uuid_arg('brand_id')
+    base_ingredient_id = _uuid_arg('base_ingredient_id')
+    is_verified = request.args.get('is_verified')
+    
+    query = '''
         SELECT bi.id, b.name as brand_name, i.name as ingredient_name, 
                bi.description, bi.is_verified, bi.created_at, bi.image_url
         FROM branded_ingredients bi
         JOIN brands b ON bi.brand_id = b.id
         JOIN base_ingredients i ON bi.base_ingredient_id = i.id
-        ORDER BY b.name, i.name
-    ''')
-    branded_ingredients = cur.fetchall()
+        WHERE 1=1
+    '''
+    params = []
     
-    # Get all brands for filter dropdown
-    cur.execute('SELECT id, name FROM brands ORDER BY name')
-    brands = cur.fetchall()
+    if search:
+        query += " AND (b.name ILIKE %s OR i.name ILIKE %s OR bi.description ILIKE %s)"
+        params.extend([f'%{like_escape(search)}%'] * 3)
     
-    # Get all base ingredients for filter dropdown
-    cur.execute('SELECT id, name FROM base_ingredients ORDER BY name')
-    base_ingredients = cur.fetchall()
+    if brand_id:
+        query += " AND bi.brand_id = %s"
+        params.append(brand_id)
+    
+    if base_ingredient_id:
+        query += " AND bi.base_ingredient_id = %s"
+        params.append(base_ingredient_id)
+    
+    if is_verified:
+        query += " AND bi.is_verified = %s"
+        params.append(is_verified.lower() == 'true')
+    
+    branded_ingredients, page = _keyset_page(cur, query, params, [
+        ('b.name', 'brand_name', ''),
+        ('i.name', 'ingredient_name', ''),
+        ('bi.id', 'id', '::uuid'),
+    ])
+    
+    # Brands and base ingredients are filtered through type-ahead widgets,
+    # so only the selected values need labels
+    brand_label = _lookup_label(cur, 'brands', brand_id)
+    base_ingredient_label = _lookup_label(cur, 'base-ingredients', base_ingredient_id)
     
     cur.close()
     conn.close()
     
     return render_template('admin/branded_ingredients/index.html', 
                           branded_ingredients=branded_ingredients,
-                          brands=brands,
-                          base_ingredients=base_ingredients)
+                          brand_label=brand_label,
+                          base_ingredient_label=base_ingredient_label,
+                          page=page)
 
 @admin_bp.route('/branded-ingredients/add', methods=['GET', 'POST'])
 @login_required
@@ -604,30 +738,29 @@ def add_branded_ingredient():
                                   base_ingredients=base_ingredients,
                                   brands=brands)
         
-        # Handle image upload if provided
-        image_url = None
-        if 'image' in request.files and request.files['image'].filename:
-            image = request.files['image']
-            filename = secure_filename(image.filename)
-            # Generate unique filename
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            # Save to upload folder - make sure this directory exists
-            upload_path = os.path.join('static', 'uploads', 'ingredients')
-            os.makedirs(upload_path, exist_ok=True)
-            file_path = os.path.join(upload_path, unique_filename)
-            image.save(file_path)
-            image_url = f"/static/uploads/ingredients/{unique_filename}"
-        
         try:
+            # Handle image upload if provided; identical files are stored once
+            image_url = None
+            if 'image' in request.files and request.files['image'].filename:
+                image_url = store_blob(cur, request.files['image'])
+                enqueue_variants(cur, image_url)
+            
             cur.execute(
                 '''
                 INSERT INTO branded_ingredients 
                 (base_ingredient_id, brand_id, description, image_url, is_verified, added_by_user_id)
                 VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING id
                 ''',
                 (base_ingredient_id, brand_id, description, image_url, is_verified, current_user.id)
             )
+            new_id = cur.fetchone()['id']
             conn.commit()
+            if image_url:
+                wake_image_queue()
+            autocomplete = get_autocomplete()
+            if autocomplete:
+                autocomplete.branded_saved(new_id, base_ingredient_id, brand_id)
             flash('Branded ingredient added successfully', 'success')
             return redirect(url_for('admin.branded_ingredients'))
         except Exception as e:
@@ -670,26 +803,16 @@ def edit_branded_ingredient(id):
         description = request.form.get('description', '')
         is_verified = 'is_verified' in request.form
         
-        # Handle image upload if provided
-        image_url = branded_ingredient['image_url']
-        if 'image' in request.files and request.files['image'].filename:
-            image = request.files['image']
-            filename = secure_filename(image.filename)
-            # Generate unique filename
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            # Save to upload folder
-            upload_path = os.path.join('static', 'uploads', 'ingredients')
-            os.makedirs(upload_path, exist_ok=True)
-            file_path = os.path.join(upload_path, unique_filename)
-            image.save(file_path)
-            
-            # Remove old image if exists
-            if image_url and os.path.exists(os.path.join('static', image_url.lstrip('/'))):
-                os.remove(os.path.join('static', image_url.lstrip('/')))
-            
-            image_url = f"/static/uploads/ingredients/{unique_filename}"
-        
         try:
+            # Handle image upload if provided
+            old_image_url = branded_ingredient['image_url']
+            image_url = old_image_url
+            replaced = False
+            if 'image' in request.files and request.files['image'].filename:
+                image_url = store_blob(cur, request.files['image'])
+                replaced = True
+                enqueue_variants(cur, image_url)
+            
             cur.execute(
                 '''
                 UPDATE branded_ingredients 
@@ -698,7 +821,14 @@ def edit_branded_ingredient(id):
                 ''',
                 (description, image_url, is_verified, str(id))
             )
+            # store_blob took a reference even for identical content, so the
+            # old one goes whenever a file was uploaded. Only removes the old
+            # file if nothing else uses the same content.
+            released = release_blob(cur, old_image_url) if replaced else None
             conn.commit()
+            delete_released(conn, [released])
+            if image_url != old_image_url:
+                wake_image_queue()
             flash('Branded ingredient updated successfully', 'success')
             return redirect(url_for('admin.branded_ingredients'))
         except Exception as e:
@@ -730,15 +860,21 @@ def delete_branded_ingredient(id):
             flash('Cannot delete branded ingredient as it is being used in recipes', 'danger')
             return redirect(url_for('admin.branded_ingredients'))
         
-        # Get image URL to delete file if exists
-        cur.execute('SELECT image_url FROM branded_ingredients WHERE id = %s', (str(id),))
-        result = cur.fetchone()
-        
-        if result and result['image_url'] and os.path.exists(os.path.join('static', result['image_url'].lstrip('/'))):
-            os.remove(os.path.join('static', result['image_url'].lstrip('/')))
+        # Product images go with it (ON DELETE CASCADE), so release their files too
+        cur.execute('''
+            SELECT image_url FROM branded_ingredients WHERE id = %s
+            UNION ALL
+            SELECT image_url FROM product_images WHERE branded_ingredient_id = %s
+        ''', (str(id), str(id)))
+        image_urls = [row['image_url'] for row in cur.fetchall()]
         
         cur.execute('DELETE FROM branded_ingredients WHERE id = %s', (str(id),))
+        released = [release_blob(cur, image_url) for image_url in image_urls]
         conn.commit()
+        delete_released(conn, released)
+        autocomplete = get_autocomplete()
+        if autocomplete:
+            autocomplete.branded_deleted(id)
         flash('Branded ingredient deleted successfully', 'success')
     except Exception as e:
         conn.rollback()
@@ -758,8 +894,7 @@ def additive_categories():
     conn = get_db_connection()
     cur = conn.cursor()
     
-    cur.execute('SELECT * FROM additive_categories ORDER BY name')
-    categories = cur.fetchall()
+    categories = get_reference(cur, 'additive_categories')
     
     cur.close()
     conn.close()
@@ -795,6 +930,7 @@ def add_additive_category():
                 (name, description, name_hindi, name_gujarati, name_marathi, name_tamil)
             )
             conn.commit()
+            invalidate_reference('additive_categories')
             flash('Additive category added successfully', 'success')
             return redirect(url_for('admin.additive_categories'))
         except Exception as e:
@@ -815,14 +951,13 @@ def additives():
     cur = conn.cursor()
     
     # Get filter parameters
-    category_id = request.args.get('category_id')
+    category_id = _uuid_arg('category_id')
     is_natural = request.args.get('is_natural')
     is_verified = request.args.get('is_verified')
-    search = request.args.get('search', '')
+    search = request.args.get('search', '').strip()
     
     # Get all additive categories for filter
-    cur.execute('SELECT * FROM additive_categories ORDER BY name')
-    categories = cur.fetchall()
+    categories = get_reference(cur, 'additive_categories')
     
     # Build query with filters
     query = '''
@@ -835,7 +970,7 @@ def additives():
     
     if search:
         query += " AND (a.name ILIKE %s OR a.code ILIKE %s)"
-        search_pattern = f'%{search}%'
+        search_pattern = f'%{like_escape(search)}%'
         params.extend([search_pattern, search_pattern])
     
     if category_id:
@@ -852,17 +987,17 @@ def additives():
         query += " AND a.is_verified = %s"
         params.append(is_verified_bool)
     
-    query += " ORDER BY a.code, a.name"
-    
-    cur.execute(query, params)
-    additives_list = cur.fetchall()
+    # Codes are unique, so (code, id) is a stable keyset order
+    additives_list, page = _keyset_page(cur, query, params,
+                                        [('a.code', 'code', ''), ('a.id', 'id', '::uuid')])
     
     cur.close()
     conn.close()
     
     return render_template('admin/additives/index.html', 
                           additives=additives_list,
-                          categories=categories)
+                          categories=categories,
+                          page=page)
 
 @admin_bp.route('/additives/add', methods=['GET', 'POST'])
 @login_required
@@ -872,8 +1007,7 @@ def add_additive():
     cur = conn.cursor()
     
     # Get all categories for the dropdown
-    cur.execute('SELECT * FROM additive_categories ORDER BY name')
-    categories = cur.fetchall()
+    categories = get_reference(cur, 'additive_categories')
     
     if request.method == 'POST':
         code = request.form.get('code')
@@ -937,8 +1071,7 @@ def edit_additive(id):
         return redirect(url_for('admin.additives'))
     
     # Get all categories for the dropdown
-    cur.execute('SELECT * FROM additive_categories ORDER BY name')
-    categories = cur.fetchall()
+    categories = get_reference(cur, 'additive_categories')
     
     if request.method == 'POST':
         code = request.form.get('code')
@@ -1045,12 +1178,14 @@ def manage_product_images(id):
         flash('Branded ingredient not found', 'danger')
         return redirect(url_for('admin.branded_ingredients'))
     
-    # Get all images for this product
+    # Get all images for this product, with the card-sized variant when ready
     cur.execute('''
-        SELECT * FROM product_images
-        WHERE branded_ingredient_id = %s
-        ORDER BY is_primary DESC, created_at DESC
-    ''', (str(id),))
+        SELECT pi.*, v.url AS thumbnail_url
+        FROM product_images pi
+        LEFT JOIN image_variants v ON v.image_url = pi.image_url AND v.variant = %s
+        WHERE pi.branded_ingredient_id = %s
+        ORDER BY pi.is_primary DESC, pi.created_at DESC
+    ''', (DEFAULT_LIST_VARIANT, str(id)))
     product_images = cur.fetchall()
     
     cur.close()
@@ -1068,23 +1203,16 @@ def add_product_image(id):
         flash('No image selected', 'danger')
         return redirect(url_for('admin.manage_product_images', id=id))
     
-    image = request.files['image']
     image_type = request.form.get('image_type', 'other')
     is_primary = 'is_primary' in request.form
     
-    # Save the image
-    filename = secure_filename(image.filename)
-    unique_filename = f"{uuid.uuid4()}_{filename}"
-    upload_path = os.path.join('static', 'uploads', 'products')
-    os.makedirs(upload_path, exist_ok=True)
-    file_path = os.path.join(upload_path, unique_filename)
-    image.save(file_path)
-    image_url = f"/static/uploads/products/{unique_filename}"
-    
     conn = get_db_connection()
     cur = conn.cursor()
     
     try:
+        # Save the image; a re-upload of a stored file writes nothing
+        image_url = store_blob(cur, request.files['image'])
+        
         # If setting as primary, update any existing primary images
         if is_primary:
             cur.execute('''
@@ -1101,9 +1229,14 @@ def add_product_image(id):
             RETURNING id
         ''', (str(id), image_url, image_type, is_primary))
         
-        image_id = cur.fetchone()[0]
+        image_id = cur.fetchone()['id']
+        # Text extraction runs in the background; the page polls for it
+        enqueue_ocr(cur, image_id)
+        enqueue_variants(cur, image_url)
         conn.commit()
-        flash('Image added successfully', 'success')
+        wake_ocr_queue()
+        wake_image_queue()
+        flash('Image added successfully, text extraction queued', 'success')
     except Exception as e:
         conn.rollback()
         flash(f'Error adding image: {str(e)}', 'danger')
@@ -1185,11 +1318,10 @@ def delete_product_image(image_id):
                 LIMIT 1
             ''', (branded_ingredient_id,))
         
+        # Delete the file from disk unless another image shares its content
+        released = release_blob(cur, image_url)
         conn.commit()
-        
-        # Delete the file from disk
-        if image_url and os.path.exists(os.path.join('static', image_url.lstrip('/'))):
-            os.remove(os.path.join('static', image_url.lstrip('/')))
+        delete_released(conn, [released])
         
         flash('Image deleted successfully', 'success')
     except Exception as e:
@@ -1201,78 +1333,54 @@ def delete_product_image(image_id):
     
     return redirect(url_for('admin.manage_product_images', id=branded_ingredient_id))
 
-@admin_bp.route('/product-images/<uuid:image_id>/extract-text')
+@admin_bp.route('/product-images/<uuid:image_id>/extract-text', methods=['POST'])
 @login_required
 @admin_required
 def extract_image_text(image_id):
-    import pytesseract
-    from PIL import Image
-    import os
-    
-    # Set the Tesseract path
-    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-    
     conn = get_db_connection()
     cur = conn.cursor()
+    branded_ingredient_id = None
     
     try:
-        # Get the image details
-        cur.execute('SELECT branded_ingredient_id, image_url FROM product_images WHERE id = %s', (str(image_id),))
+        cur.execute('SELECT branded_ingredient_id FROM product_images WHERE id = %s', (str(image_id),))
         result = cur.fetchone()
         if not result:
             raise Exception('Image not found in database')
         
         branded_ingredient_id = result['branded_ingredient_id']
-        image_url = result['image_url']
-        
-        # Print debug info
-        print(f"Image URL from database: {image_url}")
-        
-        # Try different path approaches
-        possible_paths = [
-            os.path.join('static', image_url.lstrip('/')),  # Relative to project root
-            os.path.join(os.getcwd(), 'static', image_url.lstrip('/')),  # Absolute path
-            image_url.lstrip('/'),  # Just the path part
-            os.path.abspath(os.path.join('static', image_url.lstrip('/')))  # Absolute normalized path
-        ]
-        
-        # Try to find the file
-        image_path = None
-        for path in possible_paths:
-            print(f"Trying path: {path}")
-            if os.path.exists(path):
-                image_path = path
-                print(f"Found image at: {image_path}")
-                break
-        
-        if not image_path:
-            raise Exception(f'Image file not found on disk. Tried paths: {possible_paths}')
-        
-        # Use Tesseract to extract text
-        image = Image.open(image_path)
-        extracted_text = pytesseract.image_to_string(image)
-        
-        print(f"Extracted text: {extracted_text[:100]}...")  # Print first 100 chars
-        
-        # Update the image with the extracted text
-        cur.execute('''
-            UPDATE product_images
-            SET extracted_text = %s
-            WHERE id = %s
-        ''', (extracted_text, str(image_id)))
-        
+        enqueue_ocr(cur, image_id)
         conn.commit()
-        flash('Text extracted successfully', 'success')
+        wake_ocr_queue()
+        flash('Text extraction queued', 'success')
     except Exception as e:
         conn.rollback()
-        flash(f'Error extracting text: {str(e)}', 'danger')
-        print(f"Error in OCR processing: {str(e)}")
+        flash(f'Error queueing text extraction: {str(e)}', 'danger')
     finally:
         cur.close()
         conn.close()
     
+    if not branded_ingredient_id:
+        return redirect(url_for('admin.branded_ingredients'))
     return redirect(url_for('admin.manage_product_images', id=branded_ingredient_id))
 
+# Polled by the images page while extraction is pending or running
+@admin_bp.route('/product-images/<uuid:image_id>/ocr-status')
+@login_required
+@admin_required
+def image_ocr_status(image_id):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        job = get_ocr_status(cur, image_id)
+    finally:
+        cur.close()
+        conn.close()
+    
+    if not job:
+        return jsonify({"error": "Image not found"}), 404
+    return jsonify(job)
+
 # Product Additives Management
 @admin_bp.route('/branded-ingredients/<uuid:id>/additives')
 @login_required
@@ -1531,7 +1639,7 @@ def manage_product_nutrients(id):
     
     # Get all nutrients for this product
     cur.execute('''
-        SELECT pn.id, pn.amount, pn.percent_daily_value, pn.per_serving,
+        SELECT pn.id, pn.nutrient_id, pn.amount, pn.percent_daily_value, pn.per_serving,
                n.name as nutrient_name, n.unit, nc.name as category_name
         FROM product_nutrients pn
         JOIN nutrients n ON pn.nutrient_id = n.id
@@ -1542,21 +1650,11 @@ def manage_product_nutrients(id):
     product_nutrients = cur.fetchall()
     
     # Get all available nutrients not already added to this product
-    cur.execute('''
-        SELECT n.* 
-        FROM nutrients n
-        WHERE n.id NOT IN (
-            SELECT nutrient_id 
-            FROM product_nutrients 
-            WHERE branded_ingredient_id = %s
-        )
-        ORDER BY n.name
-    ''', (str(id),))
-    available_nutrients = cur.fetchall()
+    added = {pn['nutrient_id'] for pn in product_nutrients}
+    available_nutrients = [n for n in get_reference(cur, 'nutrients') if n['id'] not in added]
     
     # Get all nutrient categories
-    cur.execute('SELECT * FROM nutrient_categories ORDER BY display_order')
-    nutrient_categories = cur.fetchall()
+    nutrient_categories = get_reference(cur, 'nutrient_categories')
     
     cur.close()
     conn.close()
@@ -1608,7 +1706,9 @@ def add_product_nutrient(id):
             per_serving
         ))
         
+        enqueue_product_nutrition(cur, id)
         conn.commit()
+        wake_nutrition_queue()
         flash('Nutrient added successfully', 'success')
     except Exception as e:
         conn.rollback()
@@ -1648,7 +1748,9 @@ def edit_product_nutrient(id):
             str(id)
         ))
         
+        enqueue_product_nutrition(cur, id)
         conn.commit()
+        wake_nutrition_queue()
         flash('Nutrient updated successfully', 'success')
     except Exception as e:
         conn.rollback()
@@ -1672,7 +1774,9 @@ def delete_product_nutrient(id, nutrient_id):
             WHERE id = %s AND branded_ingredient_id = %s
         ''', (str(nutrient_id), str(id)))
         
+        enqueue_product_nutrition(cur, id)
         conn.commit()
+        wake_nutrition_queue()
         flash('Nutrient removed successfully', 'success')
     except Exception as e:
         conn.rollback()
@@ -1711,7 +1815,9 @@ def add_serving_info(id):
                 servings_per_container if servings_per_container else None
             ))
             
+            enqueue_product_nutrition(cur, id)
             conn.commit()
+            wake_nutrition_queue()
             flash('Serving information added successfully', 'success')
             return redirect(url_for('admin.manage_product_nutrients', id=id))
         except Exception as e:
@@ -1793,7 +1899,9 @@ def edit_serving_info(id):
                 str(id)
             ))
             
+            enqueue_product_nutrition(cur, id)
             conn.commit()
+            wake_nutrition_queue()
             flash('Serving information updated successfully', 'success')
             return redirect(url_for('admin.manage_product_nutrients', id=id))
         except Exception as e:
@@ -1818,9 +1926,9 @@ def recipes():
     cur = conn.cursor()
     
     # Get filter parameters
-    title_filter = request.args.get('title', '')
-    cuisine_id = request.args.get('cuisine_id')
-    user_id = request.args.get('user_id')
+    title_filter = request.args.get('title', '').strip()
+    cuisine_id = _uuid_arg('cuisine_id')
+    user_id = _uuid_arg('user_id')
     
     # Build query based on filters
     query = '''
@@ -1837,7 +1945,7 @@ def recipes():
     
     if title_filter:
         query += " AND r.title ILIKE %s"
-        params.append(f'%{title_filter}%')
+        params.append(f'%{like_escape(title_filter)}%')
     
     if cuisine_id:
         query += " AND r.cuisine_id = %s"
@@ -1847,18 +1955,16 @@ def recipes():
         query += " AND r.created_by_user_id = %s"
         params.append(user_id)
     
-    query += " ORDER BY r.created_at DESC"
-    
-    cur.execute(query, params)
-    recipes_list = cur.fetchall()
+    recipes_list, page = _keyset_page(cur, query, params, [
+        ('r.created_at', 'created_at', '::timestamptz'),
+        ('r.id', 'id', '::uuid'),
+    ], descending=True)
     
     # Get all cuisines for filter dropdown
-    cur.execute('SELECT id, name FROM cuisines ORDER BY name')
-    cuisines = cur.fetchall()
+    cuisines = get_reference(cur, 'cuisines')
     
-    # Get all users for filter dropdown
-    cur.execute('SELECT id, first_name, last_name FROM users ORDER BY first_name, last_name')
-    users = cur.fetchall()
+    # Users are picked through the type-ahead widget
+    user_label = _lookup_label(cur, 'users', user_id)
     
     cur.close()
     conn.close()
@@ -1866,9 +1972,8 @@ def recipes():
     return render_template('admin/recipes/index.html', 
                           recipes=recipes_list,
                           cuisines=cuisines,
-                          users=users)
-
-# Update your view_recipe function in admin.py to add more logging and debugging
+                          user_label=user_label,
+                          page=page)
 
 @admin_bp.route('/recipes/<uuid:id>')
 @login_required
@@ -1896,9 +2001,6 @@ def view_recipe(id):
         flash('Recipe not found', 'danger')
         return redirect(url_for('admin.recipes'))
     
-    # Log the image URL for debugging
-    print(f"Recipe image URL: {recipe.get('image_url')}")
-    
     # Get ingredients
     cur.execute('''
         SELECT ri.id, ri.quantity, ri.notes,
@@ -1925,10 +2027,12 @@ def view_recipe(id):
     
     steps = cur.fetchall()
     
-    # Log step media URLs for debugging
-    for step in steps:
-        if step.get('media_url'):
-            print(f"Step {step.get('step_number')} media URL: {step.get('media_url')}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Recipe media", extra={
+            'recipe_id': str(id),
+            'image_url': recipe.get('image_url'),
+            'step_media': [step['media_url'] for step in steps if step.get('media_url')],
+        })
     
     cur.close()
     conn.close()
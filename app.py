@@ -1,22 +1,55 @@
-from flask import Flask, redirect, url_for, render_template, Blueprint, request, jsonify
+from flask import Flask, redirect, url_for, render_template, Blueprint, request, jsonify, Response, flash
 from flask_login import LoginManager, current_user, login_required
 import os
 import uuid
+import psycopg2
+from datetime import datetime
 from dotenv import load_dotenv
 from werkzeug.security import generate_password_hash
 from flask_cors import CORS
+import logging
 
 
 # Import the database connection from db_utils
+from log_utils import configure_logging, init_request_logging, debug_sampled, debug_payload
 from db_utils import get_db_connection
+from recipe_utils import insert_recipe_ingredients, insert_recipe_steps, apply_recipe_changes, RECIPE_DOCUMENT_SQL
+from autocomplete_utils import get_autocomplete
+from pagination_utils import encode_cursor, decode_cursor, parse_limit, like_escape
+from ocr_utils import get_ocr_queue
+from image_utils import get_image_queue, enqueue_variants, wake_image_queue, VARIANT_SIZES, DEFAULT_LIST_VARIANT
+from blob_utils import MAX_UPLOAD_BYTES
+from search_utils import search_recipes
+from family_utils import USER_FAMILIES_SQL, FAMILY_ROLE_SQL, FAMILY_MEMBERS_SQL, family_json, family_member_json
+from sharing_utils import get_shared_feed, share_recipes, unshare_recipes, MAX_SHARE_PAIRS
+from cookable_utils import find_cookable_recipes, MAX_PANTRY_SIZE
+from sql_stats_utils import init_sql_stats
+from reference_utils import start_reference_listener
+from nutrition_utils import get_recipe_nutrition, enqueue_recipe_nutrition, get_nutrition_queue, wake_nutrition_queue
+from http_cache_utils import (collection_versions, recipe_validators, make_etag, not_modified, with_validators, CACHE_CONTROL,
+                              USER_RECIPES, USER_FAMILIES, INGREDIENTS, CATALOG_NAMES, GLOBAL_OWNER)
 
 # Load environment variables
 load_dotenv()
 
+# Before anything logs: one writer thread behind a bounded queue
+configure_logging()
+logger = logging.getLogger(__name__)
+
 # Create Flask application
 app = Flask(__name__)
-CORS(app, supports_credentials=True, origins=["http://localhost:3000"], allow_headers=["Content-Type", "Authorization"])
+# The async tier (async_api.py) sends the same CORS headers from these
+CORS_ORIGINS = ["http://localhost:3000"]
+CORS_EXPOSE_HEADERS = ["X-Next-Offset", "ETag"]
+CORS(app, supports_credentials=True, origins=CORS_ORIGINS, allow_headers=["Content-Type", "Authorization", "If-None-Match"],
+     expose_headers=CORS_EXPOSE_HEADERS)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
+# Oversized uploads are refused from the Content-Length header, before the body is read
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+# Query counts and DB time per request; Server-Timing headers in debug mode
+init_sql_stats(app)
+# Request ids in every log line, echoed in X-Request-ID
+init_request_logging(app)
 
 # Setup Flask-Login
 login_manager = LoginManager()
@@ -38,19 +71,18 @@ api_bp = Blueprint('api', __name__, url_prefix='/api')
 @login_required  # Make sure this decorator is present
 def create_recipe():
     data = request.json
-    print(f"Received recipe data: {data}")
+    debug_payload(logger, "Recipe create payload", data)
     
     conn = get_db_connection()
     cur = conn.cursor()
     
     try:
         # Begin transaction
-        print("Starting transaction...")
         cur.execute("BEGIN")
         
         # Get authenticated user ID - with better error handling
         if not current_user or not current_user.is_authenticated:
-            print("WARNING: No authenticated user found, using fallback")
+            logger.warning("No authenticated user found, using fallback")
             # Optional fallback for debugging only - remove in production
             cur.execute("SELECT id FROM users WHERE role = 'user' LIMIT 1")
             user_result = cur.fetchone()
@@ -59,11 +91,8 @@ def create_recipe():
             user_id = user_result['id']
         else:
             user_id = current_user.id
-            
-        print(f"Creating recipe for user ID: {user_id}")
         
         # Insert recipe with proper user ID, including main image
-        print("Inserting recipe...")
         cur.execute("""
             INSERT INTO recipes (title, description, servings, created_by_user_id, image_url)
             VALUES (%s, %s, %s, %s, %s)
@@ -77,124 +106,21 @@ def create_recipe():
         ))
         
         recipe_id = cur.fetchone()['id']
-        print(f"Recipe created with ID: {recipe_id}")
         
-        # Insert ingredients
-        for idx, ingredient in enumerate(data.get('ingredients', [])):
-            # Get base ingredient ID by name
-            cur.execute("SELECT id FROM base_ingredients WHERE name ILIKE %s", (ingredient.get('name'),))
-            base_ingredient = cur.fetchone()
-            
-            if not base_ingredient:
-                # If ingredient doesn't exist, create it
-                cur.execute("""
-                    INSERT INTO base_ingredients (name, is_verified, added_by_user_id)
-                    VALUES (%s, %s, %s)
-                    RETURNING id
-                """, (
-                    ingredient.get('name'),
-                    False,
-                    user_id
-                ))
-                base_ingredient_id = cur.fetchone()['id']
-            else:
-                base_ingredient_id = base_ingredient['id']
-            
-            # Handle brand if provided
-            brand_id = None
-            if ingredient.get('brand'):
-                # Try to find the brand
-                cur.execute("SELECT id FROM brands WHERE name ILIKE %s", (ingredient.get('brand'),))
-                brand = cur.fetchone()
-                
-                if not brand:
-                    # Create the brand if it doesn't exist
-                    cur.execute("""
-                        INSERT INTO brands (name, is_verified, added_by_user_id)
-                        VALUES (%s, %s, %s)
-                        RETURNING id
-                    """, (
-                        ingredient.get('brand'),
-                        False,
-                        user_id
-                    ))
-                    brand_id = cur.fetchone()['id']
-                else:
-                    brand_id = brand['id']
-            else:
-                # Create or get a default "Generic" brand
-                cur.execute("SELECT id FROM brands WHERE name = 'Generic'")
-                generic_brand = cur.fetchone()
-                
-                if not generic_brand:
-                    # Create generic brand if it doesn't exist
-                    cur.execute("""
-                        INSERT INTO brands (name, is_verified, added_by_user_id)
-                        VALUES (%s, %s, %s)
-                        RETURNING id
-                    """, (
-                        'Generic',
-                        True,
-                        user_id
-                    ))
-                    brand_id = cur.fetchone()['id']
-                else:
-                    brand_id = generic_brand['id']
-            
-            # Get or create branded_ingredient entry
-            cur.execute("""
-                SELECT id FROM branded_ingredients 
-                WHERE base_ingredient_id = %s AND brand_id = %s
-            """, (base_ingredient_id, brand_id))
-            branded_ingredient = cur.fetchone()
-            
-            if not branded_ingredient:
-                # Create the branded ingredient if it doesn't exist
-                cur.execute("""
-                    INSERT INTO branded_ingredients (base_ingredient_id, brand_id, is_verified, added_by_user_id)
-                    VALUES (%s, %s, %s, %s)
-                    RETURNING id
-                """, (
-                    base_ingredient_id,
-                    brand_id,
-                    False,
-                    user_id
-                ))
-                branded_ingredient_id = cur.fetchone()['id']
-            else:
-                branded_ingredient_id = branded_ingredient['id']
-            
-            # Insert the recipe ingredient with the correct branded_ingredient_id
-            cur.execute("""
-                INSERT INTO recipe_ingredients (recipe_id, branded_ingredient_id, quantity, display_order)
-                VALUES (%s, %s, %s, %s)
-            """, (
-                recipe_id,
-                branded_ingredient_id,
-                ingredient.get('quantity', ''),
-                idx  # Use idx as display_order
-            ))
+        # Resolve and insert ingredients and steps in bulk
+        insert_recipe_ingredients(cur, recipe_id, data.get('ingredients', []), user_id)
+        insert_recipe_steps(cur, recipe_id, data.get('steps', []))
         
-        # Insert steps with updated image handling
-        for idx, step in enumerate(data.get('steps', [])):
-            # Use stepImage directly from the step object
-            step_image = step.get('stepImage')
-            media_type = 'image' if step_image else None
-            
-            cur.execute("""
-                INSERT INTO recipe_steps (recipe_id, step_number, description, media_url, media_type)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (
-                recipe_id,
-                idx + 1,
-                step.get('instruction', ''),
-                step_image,  # Use the image path directly
-                media_type
-            ))
+        # Thumbnails and WebP copies are generated in the background
+        enqueue_variants(cur, data.get('image'), *[step.get('stepImage') for step in data.get('steps', [])])
+        # So is the recipe_nutrition row
+        enqueue_recipe_nutrition(cur, recipe_id)
         
         # Commit transaction
         cur.execute("COMMIT")
-        print("Recipe transaction committed successfully")
+        logger.info("Recipe created", extra={'recipe_id': str(recipe_id), 'user_id': str(user_id)})
+        wake_image_queue()
+        wake_nutrition_queue()
         
         return jsonify({
             "status": "success", 
@@ -204,10 +130,7 @@ def create_recipe():
         
     except Exception as e:
         cur.execute("ROLLBACK")
-        print(f"Error saving recipe: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print(traceback.format_exc())  # This will print the full traceback
+        logger.exception("Error saving recipe")
         return jsonify({"status": "error", "message": f"Failed to save recipe: {str(e)}"}), 500
     
     finally:
@@ -216,18 +139,24 @@ def create_recipe():
 
 
 # Modified to use string parameter instead of UUID type converter
-@api_bp.route('/recipes/<recipe_id>', methods=['PUT'])
+# PUT replaces the recipe; PATCH changes only the fields it sends
+@api_bp.route('/recipes/<recipe_id>', methods=['PUT', 'PATCH'])
 @login_required
 def update_recipe(recipe_id):
     data = request.json
-    print(f"Received recipe update data: {data}")
+    debug_payload(logger, "Recipe update payload", data)
+    
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "Expected a JSON object"}), 400
+    if request.method == 'PUT':
+        # Fields left out of a full update take their defaults
+        data = {'name': None, 'story': '', 'servings': 2, 'image': None, 'ingredients': [], 'steps': [], **data}
     
     conn = get_db_connection()
     cur = conn.cursor()
     
     try:
         # Begin transaction
-        print("Starting transaction...")
         cur.execute("BEGIN")
         
         # Convert string to UUID for validation, then back to string for query
@@ -237,10 +166,13 @@ def update_recipe(recipe_id):
         except ValueError:
             return jsonify({"status": "error", "message": "Invalid recipe ID format"}), 400
         
-        # Use string representation in queries
+        # Use string representation in queries; the lock serializes
+        # concurrent edits of the same recipe
         cur.execute("""
-            SELECT created_by_user_id FROM recipes
+            SELECT id, created_by_user_id, title, description, servings, image_url
+            FROM recipes
             WHERE id = %s
+            FOR UPDATE
         """, (recipe_id_str,))
         
         recipe = cur.fetchone()
@@ -250,138 +182,19 @@ def update_recipe(recipe_id):
         if str(recipe['created_by_user_id']) != str(current_user.id):
             return jsonify({"status": "error", "message": "You don't have permission to edit this recipe"}), 403
         
-        # Update basic recipe information
-        cur.execute("""
-            UPDATE recipes
-            SET title = %s, description = %s, servings = %s, image_url = %s, updated_at = NOW()
-            WHERE id = %s
-        """, (
-            data.get('name'),
-            data.get('story', ''),
-            data.get('servings', 2),
-            data.get('image'),
-            recipe_id_str
-        ))
-        
-        # Delete existing ingredients and steps to replace them
-        cur.execute("DELETE FROM recipe_ingredients WHERE recipe_id = %s", (recipe_id_str,))
-        cur.execute("DELETE FROM recipe_steps WHERE recipe_id = %s", (recipe_id_str,))
-        
-        # Re-insert ingredients
-        for idx, ingredient in enumerate(data.get('ingredients', [])):
-            # Get base ingredient ID by name
-            cur.execute("SELECT id FROM base_ingredients WHERE name ILIKE %s", (ingredient.get('name'),))
-            base_ingredient = cur.fetchone()
-            
-            if not base_ingredient:
-                # If ingredient doesn't exist, create it
-                cur.execute("""
-                    INSERT INTO base_ingredients (name, is_verified, added_by_user_id)
-                    VALUES (%s, %s, %s)
-                    RETURNING id
-                """, (
-                    ingredient.get('name'),
-                    False,
-                    current_user.id
-                ))
-                base_ingredient_id = cur.fetchone()['id']
-            else:
-                base_ingredient_id = base_ingredient['id']
-            
-            # Handle brand if provided
-            brand_id = None
-            if ingredient.get('brand'):
-                # Try to find the brand
-                cur.execute("SELECT id FROM brands WHERE name ILIKE %s", (ingredient.get('brand'),))
-                brand = cur.fetchone()
-                
-                if not brand:
-                    # Create the brand if it doesn't exist
-                    cur.execute("""
-                        INSERT INTO brands (name, is_verified, added_by_user_id)
-                        VALUES (%s, %s, %s)
-                        RETURNING id
-                    """, (
-                        ingredient.get('brand'),
-                        False,
-                        current_user.id
-                    ))
-                    brand_id = cur.fetchone()['id']
-                else:
-                    brand_id = brand['id']
-            else:
-                # Create or get a default "Generic" brand
-                cur.execute("SELECT id FROM brands WHERE name = 'Generic'")
-                generic_brand = cur.fetchone()
-                
-                if not generic_brand:
-                    # Create generic brand if it doesn't exist
-                    cur.execute("""
-                        INSERT INTO brands (name, is_verified, added_by_user_id)
-                        VALUES (%s, %s, %s)
-                        RETURNING id
-                    """, (
-                        'Generic',
-                        True,
-                        current_user.id
-                    ))
-                    brand_id = cur.fetchone()['id']
-                else:
-                    brand_id = generic_brand['id']
-            
-            # Get or create branded_ingredient entry
-            cur.execute("""
-                SELECT id FROM branded_ingredients 
-                WHERE base_ingredient_id = %s AND brand_id = %s
-            """, (base_ingredient_id, brand_id))
-            branded_ingredient = cur.fetchone()
-            
-            if not branded_ingredient:
-                # Create the branded ingredient if it doesn't exist
-                cur.execute("""
-                    INSERT INTO branded_ingredients (base_ingredient_id, brand_id, is_verified, added_by_user_id)
-                    VALUES (%s, %s, %s, %s)
-                    RETURNING id
-                """, (
-                    base_ingredient_id,
-                    brand_id,
-                    False,
-                    current_user.id
-                ))
-                branded_ingredient_id = cur.fetchone()['id']
-            else:
-                branded_ingredient_id = branded_ingredient['id']
-            
-            # Insert the recipe ingredient with the correct branded_ingredient_id
-            cur.execute("""
-                INSERT INTO recipe_ingredients (recipe_id, branded_ingredient_id, quantity, display_order)
-                VALUES (%s, %s, %s, %s)
-            """, (
-                recipe_id_str,  # Use string representation
-                branded_ingredient_id,
-                ingredient.get('quantity', ''),
-                idx  # Use idx as display_order
-            ))
+        # Diff against the stored rows and write only what changed
+        changed, images = apply_recipe_changes(cur, recipe, data, current_user.id)
         
-        # Insert steps
-        for idx, step in enumerate(data.get('steps', [])):
-            step_image = step.get('stepImage')
-            media_type = 'image' if step_image else None
-            
-            cur.execute("""
-                INSERT INTO recipe_steps (recipe_id, step_number, description, media_url, media_type)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (
-                recipe_id_str,  # Use string representation
-                idx + 1,
-                step.get('instruction', ''),
-                step_image,
-                media_type
-            ))
+        # Only images not seen before are queued
+        enqueue_variants(cur, *images)
+        if changed & {'ingredients', 'servings'}:
+            enqueue_recipe_nutrition(cur, recipe_id_str)
         
         # Commit transaction
         cur.execute("COMMIT")
-        print("Recipe update transaction committed successfully")
+        logger.info("Recipe updated", extra={'recipe_id': recipe_id_str, 'changed': sorted(changed)})
+        wake_image_queue()
+        wake_nutrition_queue()
         
         return jsonify({
             "status": "success", 
@@ -391,10 +204,7 @@ def update_recipe(recipe_id):
         
     except Exception as e:
         cur.execute("ROLLBACK")
-        print(f"Error updating recipe: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Error updating recipe")
         return jsonify({"status": "error", "message": f"Failed to update recipe: {str(e)}"}), 500
     
     finally:
@@ -402,22 +212,64 @@ def update_recipe(recipe_id):
         conn.close()
 
 		
+USER_RECIPES_DEFAULT_LIMIT = 20
+USER_RECIPES_MAX_LIMIT = 100
+
+
 @api_bp.route('/user/recipes', methods=['GET'])
 @login_required
 def get_user_recipes():
+    limit = parse_limit(request.args.get('limit'), USER_RECIPES_DEFAULT_LIMIT, USER_RECIPES_MAX_LIMIT)
+    cursor = request.args.get('cursor')
+    # Which image variant the list view wants (thumb, card, large, webp)
+    image_size = request.args.get('image_size', DEFAULT_LIST_VARIANT)
+    if image_size not in VARIANT_SIZES:
+        image_size = DEFAULT_LIST_VARIANT
+    
+    after = None
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor, 2)
+            after = (datetime.fromisoformat(created_at), str(uuid.UUID(last_id)))
+        except ValueError:
+            return jsonify({"status": "error", "message": "Invalid cursor"}), 400
+    
     conn = get_db_connection()
     cur = conn.cursor()
     
     try:
-        cur.execute("""
+        # Cuisine names are part of the list too
+        versions, changed_at = collection_versions(cur, (USER_RECIPES, current_user.id), (CATALOG_NAMES, GLOBAL_OWNER))
+        etag = make_etag(current_user.id, *versions, request.query_string.decode('utf-8', 'replace'))
+        cached = not_modified(etag, changed_at)
+        if cached:
+            return cached
+        
+        # Keyset pagination on (created_at, id), served by
+        # idx_recipes_user_created_at from migrations/004
+        query = """
             SELECT r.id, r.title, r.description, r.servings, r.prep_time_minutes, 
                 r.cook_time_minutes, r.is_private, r.created_at, r.updated_at,
-                c.name as cuisine_name
+                c.name as cuisine_name,
+                COALESCE(v.url, r.image_url) AS thumbnail_url
             FROM recipes r
             LEFT JOIN cuisines c ON r.cuisine_id = c.id
+            LEFT JOIN image_variants v ON v.image_url = r.image_url AND v.variant = %s
             WHERE r.created_by_user_id = %s
-            ORDER BY r.created_at DESC
-        """, (current_user.id,))
+        """
+        params = [image_size, current_user.id]
+        
+        if after:
+            query += " AND (r.created_at, r.id) < (%s, %s::uuid)"
+            params.extend(after)
+        
+        # Fetch one extra row to know whether another page exists
+        query += " ORDER BY r.created_at DESC, r.id DESC LIMIT %s"
+        params.append(limit + 1)
+        
+        cur.execute(query, params)
+        rows = cur.fetchall()
+        page = rows[:limit]
         
         recipes = [
             {
@@ -429,57 +281,368 @@ def get_user_recipes():
                 "cook_time_minutes": row['cook_time_minutes'],
                 "is_private": row['is_private'],
                 "cuisine": row['cuisine_name'],
+                "thumbnail_url": row['thumbnail_url'],
                 "created_at": row['created_at'].isoformat() if row['created_at'] else None,
                 "updated_at": row['updated_at'].isoformat() if row['updated_at'] else None
             }
-            for row in cur.fetchall()
+            for row in page
         ]
         
-        return jsonify(recipes)
+        result = {
+            "recipes": recipes,
+            "next_cursor": encode_cursor(page[-1]['created_at'], page[-1]['id']) if len(rows) > limit else None
+        }
+        
+        # The total only matters when the list is first opened
+        if not cursor:
+            cur.execute("SELECT COUNT(*) AS count FROM recipes WHERE created_by_user_id = %s", (current_user.id,))
+            result["total"] = cur.fetchone()['count']
+        
+        return with_validators(jsonify(result), etag, changed_at)
+    except Exception as e:
+        logger.exception("Error fetching user recipes")
+        return jsonify({"recipes": [], "next_cursor": None}), 500
+    finally:
+        cur.close()
+        conn.close()
+
+
+SHARED_FEED_DEFAULT_LIMIT = 20
+SHARED_FEED_MAX_LIMIT = 100
+
+
+@api_bp.route('/recipes/shared', methods=['GET'])
+@login_required
+def get_shared_recipes():
+    limit = parse_limit(request.args.get('limit'), SHARED_FEED_DEFAULT_LIMIT, SHARED_FEED_MAX_LIMIT)
+    cursor = request.args.get('cursor')
+    
+    after = None
+    if cursor:
+        try:
+            shared_at, last_id = decode_cursor(cursor, 2)
+            after = (datetime.fromisoformat(shared_at), str(uuid.UUID(last_id)))
+        except ValueError:
+            return jsonify({"status": "error", "message": "Invalid cursor"}), 400
+    
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        # All of the user's families in one query, newest share first
+        rows = get_shared_feed(cur, current_user.id, limit + 1, after)
+        page = rows[:limit]
+        
+        result = {
+            "recipes": [
+                {
+                    "id": str(row['id']),
+                    "title": row['title'],
+                    "description": row['description'],
+                    "image_url": row['image_url'],
+                    "servings": row['servings'],
+                    "prep_time_minutes": row['prep_time_minutes'],
+                    "cook_time_minutes": row['cook_time_minutes'],
+                    "shared_at": row['shared_at'].isoformat(),
+                    "shared_by": " ".join(filter(None, [row['shared_by_first_name'], row['shared_by_last_name']])) or None,
+                    "family_id": str(row['family_id']),
+                    "family_name": row['family_name'],
+                    # Every one of the user's families it was shared into
+                    "family_names": row['family_names'],
+                }
+                for row in page
+            ],
+            "next_cursor": None,
+        }
+        if len(rows) > limit:
+            last = page[-1]
+            result["next_cursor"] = encode_cursor(last['shared_at'], last['id'])
+        
+        return jsonify(result)
+    except Exception as e:
+        logger.exception("Error fetching shared recipes")
+        return jsonify({"recipes": [], "next_cursor": None}), 500
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _uuid_list(values):
+    """Normalized, de-duplicated UUID strings in their original order."""
+    if not isinstance(values, list):
+        raise ValueError('Expected a list of IDs')
+    return list(dict.fromkeys(str(uuid.UUID(str(value))) for value in values))
+
+
+def _bulk_share(apply):
+    data = request.get_json(silent=True) or {}
+    try:
+        recipe_ids = _uuid_list(data.get('recipe_ids', []))
+        family_ids = _uuid_list(data.get('family_ids', []))
+    except ValueError:
+        return jsonify({"status": "error", "message": "recipe_ids and family_ids must be lists of IDs"}), 400
+    if not recipe_ids or not family_ids:
+        return jsonify({"status": "error", "message": "At least one recipe and one family are required"}), 400
+    if len(recipe_ids) * len(family_ids) > MAX_SHARE_PAIRS:
+        return jsonify({"status": "error", "message": f"At most {MAX_SHARE_PAIRS} recipe/family pairs per request"}), 400
+    
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        # One transaction for the whole batch
+        results = apply(cur, current_user.id, recipe_ids, family_ids)
+        conn.commit()
+        
+        summary = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        return jsonify({"status": "success", "results": results, "summary": summary})
+    except Exception as e:
+        conn.rollback()
+        logger.exception("Error updating recipe sharing")
+        return jsonify({"status": "error", "message": str(e)}), 500
+    finally:
+        cur.close()
+        conn.close()
+
+
+@api_bp.route('/recipes/share', methods=['POST'])
+@login_required
+def share_recipes_endpoint():
+    """Share each of ``recipe_ids`` with each of ``family_ids``."""
+    return _bulk_share(share_recipes)
+
+
+@api_bp.route('/recipes/unshare', methods=['POST'])
+@login_required
+def unshare_recipes_endpoint():
+    """Stop sharing each of ``recipe_ids`` with each of ``family_ids``."""
+    return _bulk_share(unshare_recipes)
+
+
+RECIPE_SEARCH_DEFAULT_LIMIT = 20
+RECIPE_SEARCH_MAX_LIMIT = 50
+
+
+@api_bp.route('/recipes/search', methods=['GET'])
+def search_recipes_endpoint():
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({"status": "error", "message": "Search text is required"}), 400
+    limit = parse_limit(request.args.get('limit'), RECIPE_SEARCH_DEFAULT_LIMIT, RECIPE_SEARCH_MAX_LIMIT)
+    cursor = request.args.get('cursor')
+    
+    after = None
+    if cursor:
+        try:
+            rank, last_id = decode_cursor(cursor, 2)
+            after = (float(rank), str(uuid.UUID(last_id)))
+        except ValueError:
+            return jsonify({"status": "error", "message": "Invalid cursor"}), 400
+    
+    # Anonymous visitors see public recipes only
+    user_id = current_user.id if current_user.is_authenticated else None
+    
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        # Ranked match on the GIN-indexed recipes.search_vector (migrations/011)
+        rows = search_recipes(cur, text, user_id, limit + 1, after)
+        page = rows[:limit]
+        
+        result = {
+            "recipes": [
+                {
+                    "id": str(row['id']),
+                    "title": row['title'],
+                    "title_highlight": row['title_highlight'],
+                    "snippet": row['snippet'],
+                    "image_url": row['image_url'],
+                    "servings": row['servings'],
+                    "prep_time_minutes": row['prep_time_minutes'],
+                    "cook_time_minutes": row['cook_time_minutes'],
+                    "cuisine": row['cuisine_name'],
+                    "is_owner": row['is_owner'],
+                    "rank": row['rank'],
+                    "created_at": row['created_at'].isoformat() if row['created_at'] else None,
+                }
+                for row in page
+            ],
+            "next_cursor": None,
+        }
+        if len(rows) > limit:
+            last = page[-1]
+            result["next_cursor"] = encode_cursor(repr(last['rank']), last['id'])
+        
+        return jsonify(result)
     except Exception as e:
-        print(f"Error fetching user recipes: {str(e)}")
-        return jsonify([]), 500
+        logger.exception("Error searching recipes")
+        return jsonify({"recipes": [], "next_cursor": None}), 500
     finally:
         cur.close()
         conn.close()
 
 # Ingredients endpoints
+INGREDIENT_SEARCH_DEFAULT_LIMIT = 20
+INGREDIENT_SEARCH_MAX_LIMIT = 50
+
+
+def _page_args(default_limit, max_limit):
+    """Read limit/offset query parameters, clamped to sane bounds."""
+    limit = parse_limit(request.args.get('limit'), default_limit, max_limit)
+    try:
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        offset = 0
+    return limit, max(0, offset)
+
+
+COOKABLE_DEFAULT_LIMIT = 20
+COOKABLE_MAX_LIMIT = 50
+
+
+@api_bp.route('/recipes/cookable', methods=['GET'])
+def get_cookable_recipes():
+    """Recipes ranked by how much of them the given base ingredients cover.
+
+    Pass each base ingredient as a repeated ``ingredient_id`` parameter;
+    ``max_missing`` optionally drops recipes needing more than that many others.
+    """
+    try:
+        ingredient_ids = [str(uuid.UUID(id)) for id in request.args.getlist('ingredient_id')]
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid ingredient ID format"}), 400
+    if not ingredient_ids:
+        return jsonify({"status": "error", "message": "At least one ingredient_id is required"}), 400
+    if len(ingredient_ids) > MAX_PANTRY_SIZE:
+        return jsonify({"status": "error", "message": f"At most {MAX_PANTRY_SIZE} ingredients are allowed"}), 400
+    
+    max_missing = request.args.get('max_missing', type=int)
+    limit, offset = _page_args(COOKABLE_DEFAULT_LIMIT, COOKABLE_MAX_LIMIT)
+    user_id = current_user.id if current_user.is_authenticated else None
+    
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        rows = find_cookable_recipes(cur, ingredient_ids, user_id, limit + 1, offset, max_missing)
+        
+        response = jsonify([
+            {
+                "id": str(row['id']),
+                "title": row['title'],
+                "image_url": row['image_url'],
+                "servings": row['servings'],
+                "prep_time_minutes": row['prep_time_minutes'],
+                "cook_time_minutes": row['cook_time_minutes'],
+                "matched_count": row['matched'],
+                "ingredient_count": row['ingredient_count'],
+                "missing_count": row['missing'],
+                "coverage": float(row['coverage']),
+            }
+            for row in rows[:limit]
+        ])
+        if len(rows) > limit:
+            response.headers['X-Next-Offset'] = str(offset + limit)
+        return response
+    except Exception as e:
+        logger.exception("Error finding cookable recipes")
+        return jsonify({"status": "error", "message": str(e)}), 500
+    finally:
+        cur.close()
+        conn.close()
+
+
 @api_bp.route('/ingredients', methods=['GET'])
 def get_ingredients():
-    search = request.args.get('search', '')
-    print(f"Searching for ingredients: '{search}'")
+    search = request.args.get('search', '').strip()
+    limit, offset = _page_args(INGREDIENT_SEARCH_DEFAULT_LIMIT, INGREDIENT_SEARCH_MAX_LIMIT)
+    
+    autocomplete = get_autocomplete()
+    if autocomplete:
+        # Answered from the in-memory index without touching PostgreSQL
+        ingredients, has_more = autocomplete.search_ingredients(search, limit, offset)
+        debug_sampled(logger, "Ingredient search", extra={'term': search, 'results': len(ingredients), 'source': 'memory'})
+        response = jsonify(ingredients)
+        if has_more:
+            response.headers['X-Next-Offset'] = str(offset + limit)
+        # Each process has its own index, so tag the body itself; building
+        # it costs less than a version lookup would
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        response.add_etag(weak=True)
+        return response.make_conditional(request)
     
     conn = get_db_connection()
     cur = conn.cursor()
     
+    versions, changed_at = collection_versions(cur, (INGREDIENTS, GLOBAL_OWNER))
+    etag = make_etag(*versions, request.query_string.decode('utf-8', 'replace'))
+    cached = not_modified(etag, changed_at)
+    if cached:
+        cur.close()
+        conn.close()
+        return cached
+    
+    # Fetch one extra row to know whether another page exists
     if search:
+        # Served by the pg_trgm GIN indexes from migrations/003: substring
+        # matches on every language column plus fuzzy matches on the name.
+        # Prefix matches rank first, then trigram similarity.
         cur.execute("""
-            SELECT id, name FROM base_ingredients 
-            WHERE name ILIKE %s 
-            ORDER BY name
-        """, (f'%{search}%',))
+            SELECT id, name
+            FROM base_ingredients
+            WHERE name ILIKE %(contains)s
+                OR name_hindi ILIKE %(contains)s
+                OR name_gujarati ILIKE %(contains)s
+                OR name_marathi ILIKE %(contains)s
+                OR name_tamil ILIKE %(contains)s
+                OR name %% %(term)s
+            ORDER BY name ILIKE %(prefix)s DESC,
+                GREATEST(
+                    similarity(name, %(term)s),
+                    similarity(COALESCE(name_hindi, ''), %(term)s),
+                    similarity(COALESCE(name_gujarati, ''), %(term)s),
+                    similarity(COALESCE(name_marathi, ''), %(term)s),
+                    similarity(COALESCE(name_tamil, ''), %(term)s)
+                ) DESC,
+                name, id
+            LIMIT %(limit)s OFFSET %(offset)s
+        """, {
+            'term': search,
+            'contains': f'%{like_escape(search)}%',
+            'prefix': f'{like_escape(search)}%',
+            'limit': limit + 1,
+            'offset': offset
+        })
     else:
         cur.execute("""
             SELECT id, name FROM base_ingredients 
-            ORDER BY name LIMIT 50
-        """)
+            ORDER BY name, id
+            LIMIT %s OFFSET %s
+        """, (limit + 1, offset))
     
-    ingredients = [{"id": str(row['id']), "name": row['name']} for row in cur.fetchall()]
+    rows = cur.fetchall()
     cur.close()
     conn.close()
     
-    print(f"Found {len(ingredients)} ingredients")
-    return jsonify(ingredients)
+    ingredients = [{"id": str(row['id']), "name": row['name']} for row in rows[:limit]]
+    debug_sampled(logger, "Ingredient search", extra={'term': search, 'results': len(ingredients), 'source': 'db'})
+    
+    response = jsonify(ingredients)
+    if len(rows) > limit:
+        response.headers['X-Next-Offset'] = str(offset + limit)
+    return with_validators(response, etag, changed_at)
 
 @api_bp.route('/ingredients', methods=['POST'])
 def add_ingredient():
     data = request.json
-    print(f"Received add ingredient request with data: {data}")
+    debug_payload(logger, "Add ingredient payload", data)
     
     name = data.get('name')
     
     if not name:
-        print("Error: Ingredient name is required")
         return jsonify({"status": "error", "message": "Ingredient name is required"}), 400
     
     conn = get_db_connection()
@@ -497,7 +660,7 @@ def add_ingredient():
             if user_result:
                 user_id = user_result['id']
             else:
-                print("No users available in the database")
+                logger.error("No users available in the database")
                 return jsonify({"status": "error", "message": "No users available"}), 500
         
         # Insert the new base ingredient
@@ -510,12 +673,14 @@ def add_ingredient():
         new_id = cur.fetchone()['id']
         conn.commit()
         
+        autocomplete = get_autocomplete()
+        if autocomplete:
+            autocomplete.ingredient_saved(new_id, name)
+        
         return jsonify({"status": "success", "message": "Ingredient added", "id": str(new_id)})
     except Exception as e:
         conn.rollback()
-        print(f"Error adding ingredient: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Error adding ingredient")
         return jsonify({"status": "error", "message": str(e)}), 500
     finally:
         cur.close()
@@ -525,34 +690,51 @@ def add_ingredient():
 @api_bp.route('/brands', methods=['GET'])
 def get_brands():
     ingredient_id = request.args.get('ingredient_id')
-    search = request.args.get('search', '')
+    search = request.args.get('search', '').strip()
     
     if not ingredient_id:
         return jsonify({"status": "error", "message": "ingredient_id is required"}), 400
     
+    # The picker shows a whole page without asking for one, so the default is the cap
+    limit, offset = _page_args(INGREDIENT_SEARCH_MAX_LIMIT, INGREDIENT_SEARCH_MAX_LIMIT)
+    
+    autocomplete = get_autocomplete()
+    if autocomplete:
+        brands, has_more = autocomplete.search_brands(ingredient_id, search, limit, offset)
+        response = jsonify(brands)
+        if has_more:
+            response.headers['X-Next-Offset'] = str(offset + limit)
+        return response
+    
     conn = get_db_connection()
     cur = conn.cursor()
     
     try:
+        # Fetch one extra row to know whether another page exists
         if search:
             cur.execute("""
                 SELECT b.id, b.name 
                 FROM brands b
                 JOIN branded_ingredients bi ON b.id = bi.brand_id
                 WHERE bi.base_ingredient_id = %s AND b.name ILIKE %s
-                ORDER BY b.name
-            """, (ingredient_id, f'%{search}%'))
+                ORDER BY b.name, b.id
+                LIMIT %s OFFSET %s
+            """, (ingredient_id, f'%{like_escape(search)}%', limit + 1, offset))
         else:
             cur.execute("""
                 SELECT b.id, b.name 
                 FROM brands b
                 JOIN branded_ingredients bi ON b.id = bi.brand_id
                 WHERE bi.base_ingredient_id = %s
-                ORDER BY b.name
-            """, (ingredient_id,))
-            
-        brands = [{"id": str(row['id']), "name": row['name']} for row in cur.fetchall()]
-        return jsonify(brands)
+                ORDER BY b.name, b.id
+                LIMIT %s OFFSET %s
+            """, (ingredient_id, limit + 1, offset))
+        
+        rows = cur.fetchall()
+        response = jsonify([{"id": str(row['id']), "name": row['name']} for row in rows[:limit]])
+        if len(rows) > limit:
+            response.headers['X-Next-Offset'] = str(offset + limit)
+        return response
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
     finally:
@@ -562,13 +744,12 @@ def get_brands():
 @api_bp.route('/brands', methods=['POST'])
 def add_brand():
     data = request.json
-    print(f"Received add brand request with data: {data}")
+    debug_payload(logger, "Add brand payload", data)
     
     name = data.get('name')
     ingredient_id = data.get('ingredient_id')
     
     if not name or not ingredient_id:
-        print("Error: Name and ingredient_id are required")
         return jsonify({"status": "error", "message": "Name and ingredient_id are required"}), 400
     
     conn = get_db_connection()
@@ -585,7 +766,7 @@ def add_brand():
             if user_result:
                 user_id = user_result['id']
             else:
-                print("No users available in the database")
+                logger.error("No users available in the database")
                 return jsonify({"status": "error", "message": "No users available"}), 500
         
         # Create or find the brand
@@ -594,7 +775,6 @@ def add_brand():
         
         if brand:
             brand_id = brand['id']
-            print(f"Found existing brand: {name}, id: {brand_id}")
         else:
             cur.execute("""
                 INSERT INTO brands (name, added_by_user_id, is_verified)
@@ -602,7 +782,7 @@ def add_brand():
                 RETURNING id
             """, (name, user_id, False))
             brand_id = cur.fetchone()['id']
-            print(f"Created new brand: {name}, id: {brand_id}")
+            logger.info("Created brand", extra={'brand_id': str(brand_id), 'brand': name})
         
         # Create the branded ingredient
         cur.execute("""
@@ -614,17 +794,24 @@ def add_brand():
         branded_ingredient_id = cur.fetchone()['id']
         conn.commit()
         
+        autocomplete = get_autocomplete()
+        if autocomplete:
+            autocomplete.brand_saved(brand_id, autocomplete.brands.name(brand_id) or name)
+            autocomplete.branded_saved(branded_ingredient_id, ingredient_id, brand_id)
+        
         return jsonify({
             "status": "success",
             "message": "Brand and branded ingredient created",
             "brand_id": str(brand_id),
             "branded_ingredient_id": str(branded_ingredient_id)
         })
+    except psycopg2.errors.ForeignKeyViolation:
+        # The base ingredient is checked by its foreign key rather than a lookup first
+        conn.rollback()
+        return jsonify({"status": "error", "message": "Ingredient not found"}), 404
     except Exception as e:
         conn.rollback()
-        print(f"Error adding brand: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Error adding brand")
         return jsonify({"status": "error", "message": str(e)}), 500
     finally:
         cur.close()
@@ -672,7 +859,6 @@ def create_admin_user():
     if count == 0:
         # Create a fresh password hash for 'admin123'
         password_hash = generate_password_hash('admin123')
-        print(f"Generated new password hash: {password_hash}")
         
         try:
             cur.execute(
@@ -684,10 +870,10 @@ def create_admin_user():
                 ('admin@recipekeeper.com', '+910000000000', password_hash, 'Admin', 'User', 'admin', 'en')
             )
             conn.commit()
-            print("Admin user created successfully with email: admin@recipekeeper.com and password: admin123")
-        except Exception as e:
+            logger.warning("Admin user admin@recipekeeper.com created with the default password; change it")
+        except Exception:
             conn.rollback()
-            print(f"Error creating admin user: {str(e)}")
+            logger.exception("Error creating admin user")
     
     cur.close()
     conn.close()
@@ -700,29 +886,22 @@ def get_families():
     conn = get_db_connection()
     cur = conn.cursor()
     
-    # Get all families where the current user is a member
-    cur.execute("""
-        SELECT f.id, f.name, f.created_at, fm.role as user_role
-        FROM families f
-        JOIN family_members fm ON f.id = fm.family_id
-        WHERE fm.user_id = %s AND fm.is_active = true
-        ORDER BY f.created_at DESC
-    """, (current_user.id,))
+    versions, changed_at = collection_versions(cur, (USER_FAMILIES, current_user.id))
+    etag = make_etag(current_user.id, *versions)
+    cached = not_modified(etag, changed_at)
+    if cached:
+        cur.close()
+        conn.close()
+        return cached
     
-    families = [
-        {
-            "id": str(row['id']),
-            "name": row['name'],
-            "created_at": row['created_at'].isoformat() if row['created_at'] else None,
-            "user_role": row['user_role']
-        }
-        for row in cur.fetchall()
-    ]
+    # Get all families where the current user is a member
+    cur.execute(USER_FAMILIES_SQL, (current_user.id,))
+    families = [family_json(row) for row in cur.fetchall()]
     
     cur.close()
     conn.close()
     
-    return jsonify(families)
+    return with_validators(jsonify(families), etag, changed_at)
 	
 	
 @api_bp.route('/families/<family_id>/members', methods=['POST'])
@@ -939,37 +1118,15 @@ def get_family_members(family_id):
             return jsonify({"status": "error", "message": "Invalid family ID format"}), 400
         
         # First verify user is a member of this family
-        cur.execute("""
-            SELECT role FROM family_members
-            WHERE family_id = %s AND user_id = %s AND is_active = true
-        """, (family_id_str, current_user.id))
+        cur.execute(FAMILY_ROLE_SQL, (family_id_str, current_user.id))
         
         user_role = cur.fetchone()
         if not user_role:
             return jsonify({"status": "error", "message": "Unauthorized access"}), 403
         
         # Get all members of the family
-        cur.execute("""
-            SELECT fm.id, fm.user_id, fm.role, fm.joined_at,
-                u.email, u.first_name, u.last_name
-            FROM family_members fm
-            JOIN users u ON fm.user_id = u.id
-            WHERE fm.family_id = %s AND fm.is_active = true
-            ORDER BY fm.joined_at
-        """, (family_id_str,))
-        
-        members = [
-            {
-                "id": str(row['id']),
-                "user_id": str(row['user_id']),
-                "role": row['role'],
-                "joined_at": row['joined_at'].isoformat() if row['joined_at'] else None,
-                "email": row['email'],
-                "first_name": row['first_name'],
-                "last_name": row['last_name']
-            }
-            for row in cur.fetchall()
-        ]
+        cur.execute(FAMILY_MEMBERS_SQL, (family_id_str,))
+        members = [family_member_json(row) for row in cur.fetchall()]
         
         return jsonify(members)
     except Exception as e:
@@ -992,81 +1149,63 @@ def get_recipe(recipe_id):
             recipe_id_str = str(uuid_obj)
         except ValueError:
             return jsonify({"status": "error", "message": "Invalid recipe ID format"}), 400
-            
-        # Get basic recipe info using the string representation
-        cur.execute("""
-            SELECT r.id, r.title, r.description, r.servings, r.prep_time_minutes, 
-                r.cook_time_minutes, r.is_private, r.created_at, r.updated_at,
-                c.name as cuisine_name, r.image_url
-            FROM recipes r
-            LEFT JOIN cuisines c ON r.cuisine_id = c.id
-            WHERE r.id = %s
-        """, (recipe_id_str,))
         
-        recipe = cur.fetchone()
-        
-        if not recipe:
+        validators = recipe_validators(cur, recipe_id_str)
+        if validators is None:
             return jsonify({"status": "error", "message": "Recipe not found"}), 404
+        cached = not_modified(*validators)
+        if cached:
+            return cached
+        cur.close()
         
-        # Get ingredients using the same string representation
-        cur.execute("""
-            SELECT ri.quantity, bi.id as branded_ingredient_id, 
-                bi.base_ingredient_id, b.id as brand_id, b.name as brand_name,
-                i.name as ingredient_name, ri.display_order
-            FROM recipe_ingredients ri
-            JOIN branded_ingredients bi ON ri.branded_ingredient_id = bi.id
-            JOIN base_ingredients i ON bi.base_ingredient_id = i.id
-            LEFT JOIN brands b ON bi.brand_id = b.id
-            WHERE ri.recipe_id = %s
-            ORDER BY ri.display_order
-        """, (recipe_id_str,))
-        
-        ingredients = []
-        for row in cur.fetchall():
-            ingredients.append({
-                "id": str(row['branded_ingredient_id']),
-                "name": row['ingredient_name'],
-                "quantity": row['quantity'],
-                "brand": row['brand_name']
-            })
+        # Plain cursor: the only column is the ready-made JSON text
+        cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
         
-        # Get steps using the same string representation
-        cur.execute("""
-            SELECT step_number, description, media_url, media_type
-            FROM recipe_steps
-            WHERE recipe_id = %s
-            ORDER BY step_number
-        """, (recipe_id_str,))
+        # Build the whole document in PostgreSQL and pass the JSON text
+        # through untouched instead of rebuilding it row by row in Python
+        cur.execute(RECIPE_DOCUMENT_SQL, (recipe_id_str,))
         
-        steps = []
-        for row in cur.fetchall():
-            steps.append({
-                "step_number": row['step_number'],
-                "description": row['description'],
-                "media_url": row['media_url'],
-                "media_type": row['media_type']
-            })
+        row = cur.fetchone()
         
-        # Construct the full recipe object - always convert UUIDs to strings
-        recipe_data = {
-            "id": str(recipe['id']),
-            "title": recipe['title'],
-            "description": recipe['description'],
-            "servings": recipe['servings'],
-            "prep_time_minutes": recipe['prep_time_minutes'],
-            "cook_time_minutes": recipe['cook_time_minutes'],
-            "is_private": recipe['is_private'],
-            "cuisine": recipe['cuisine_name'],
-            "image_url": recipe['image_url'],
-            "created_at": recipe['created_at'].isoformat() if recipe['created_at'] else None,
-            "updated_at": recipe['updated_at'].isoformat() if recipe['updated_at'] else None,
-            "ingredients": ingredients,
-            "steps": steps
-        }
+        if not row:
+            return jsonify({"status": "error", "message": "Recipe not found"}), 404
         
-        return jsonify(recipe_data)
+        return with_validators(Response(row[0], mimetype='application/json'), *validators)
     except Exception as e:
-        print(f"Error fetching recipe: {str(e)}")
+        logger.exception("Error fetching recipe")
+        return jsonify({"status": "error", "message": str(e)}), 500
+    finally:
+        cur.close()
+        conn.close()
+
+
+@api_bp.route('/recipes/<recipe_id>/nutrition', methods=['GET'])
+def get_recipe_nutrition_facts(recipe_id):
+    try:
+        recipe_id_str = str(uuid.UUID(recipe_id))
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid recipe ID format"}), 400
+    
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        # Precomputed by the nutrition queue; a single primary-key lookup
+        row = get_recipe_nutrition(cur, recipe_id_str)
+        if row is None:
+            cur.execute("SELECT 1 FROM recipes WHERE id = %s", (recipe_id_str,))
+            if not cur.fetchone():
+                return jsonify({"status": "error", "message": "Recipe not found"}), 404
+            # Not computed yet; the client can retry shortly
+            return jsonify({"status": "pending"}), 202
+        
+        nutrition = row['nutrition']
+        nutrition['computed_at'] = row['computed_at'].isoformat()
+        # Set while a newer refresh is queued or running
+        nutrition['refresh_status'] = row['refresh_status']
+        return jsonify(nutrition)
+    except Exception as e:
+        logger.exception("Error fetching recipe nutrition")
         return jsonify({"status": "error", "message": str(e)}), 500
     finally:
         cur.close()
@@ -1172,7 +1311,7 @@ def delete_recipe(recipe_id):
         return jsonify({"status": "success", "message": "Recipe deleted successfully"})
     except Exception as e:
         conn.rollback()
-        print(f"Error deleting recipe: {str(e)}")
+        logger.exception("Error deleting recipe")
         return jsonify({"status": "error", "message": str(e)}), 500
     finally:
         cur.close()
@@ -1201,9 +1340,30 @@ def page_not_found(e):
 def server_error(e):
     return render_template('errors/500.html'), 500
 
+@app.errorhandler(413)
+def upload_too_large(e):
+    message = f'Uploads must be {MAX_UPLOAD_BYTES // (1024 * 1024)} MB or smaller'
+    if request.path.startswith('/api/'):
+        return jsonify({"status": "error", "message": message}), 413
+    flash(message, 'danger')
+    return redirect(request.referrer or url_for('admin.dashboard'))
+
 # Create admin user before starting app
 create_admin_user()
 
+# Warm the in-memory autocomplete index when it is enabled
+if get_autocomplete():
+    get_autocomplete().load()
+
+# Resume background jobs left queued by earlier runs (no-op when the
+# worker count is 0)
+get_ocr_queue().start()
+get_image_queue().start()
+get_nutrition_queue().start()
+
+# Drop cached reference data when another process changes it
+start_reference_listener()
+
 # For development
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
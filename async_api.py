@@ -0,0 +1,223 @@
+# async_api.py
+# ASGI serving mode for the API. The pure-I/O reads below run as coroutines
+# on psycopg 3's async pool, so a slow query waits without holding a worker
+# thread. Every other route, writes and admin pages included, is handed to
+# the Flask app unchanged, so URLs, JSON and sessions match the sync tier.
+#
+# Run with: uvicorn async_api:app --port 5000  (or: python async_api.py)
+import os
+import json
+import logging
+from functools import wraps
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from itsdangerous import BadSignature
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route, Mount
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:
+    from starlette.middleware.wsgi import WSGIMiddleware  # Deprecated upstream in favour of a2wsgi
+
+from app import app as flask_app, CORS_ORIGINS, CORS_EXPOSE_HEADERS
+from auth import User, USER_BY_ID_SQL
+from family_utils import USER_FAMILIES_SQL, FAMILY_ROLE_SQL, FAMILY_MEMBERS_SQL, family_json, family_member_json
+from recipe_utils import RECIPE_DOCUMENT_SQL
+from http_cache_utils import (COLLECTION_VERSIONS_SQL, collection_versions_params, collection_versions_from_rows,
+                              RECIPE_VALIDATORS_SQL, recipe_validators_params, recipe_validators_from_row,
+                              make_etag, is_fresh, validator_headers, USER_FAMILIES)
+from log_utils import configure_logging, bind_request_id, reset_request_id, REQUEST_ID_HEADER
+
+# Load environment variables
+load_dotenv()
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# One event loop serves every request, so the pool rather than a thread
+# count bounds concurrent queries
+ASYNC_DB_POOL_MIN = int(os.getenv('ASYNC_DB_POOL_MIN', '1'))
+ASYNC_DB_POOL_MAX = int(os.getenv('ASYNC_DB_POOL_MAX', '20'))
+
+_pool = AsyncConnectionPool(
+    make_conninfo(
+        host=os.getenv('DB_HOST', 'localhost'),
+        dbname=os.getenv('DB_NAME', 'recipe_keeper'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', 'password'),
+    ),
+    min_size=ASYNC_DB_POOL_MIN,
+    max_size=ASYNC_DB_POOL_MAX,
+    max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+    timeout=float(os.getenv('DB_POOL_TIMEOUT', '30')),
+    check=AsyncConnectionPool.check_connection if os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true' else None,
+    kwargs={'row_factory': dict_row},
+    open=False,
+)
+
+# Requests the async handlers don't answer themselves
+_flask = WSGIMiddleware(flask_app)
+_session_serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+
+
+def _json(data, status=200, headers=None):
+    # Encoded like Flask's jsonify so both tiers send identical bodies
+    body = json.dumps(data, separators=(',', ':'), sort_keys=True) + '\n'
+    return Response(body, status_code=status, headers=headers, media_type='application/json')
+
+
+def _with_validators(response, validators):
+    response.headers.update(validator_headers(*validators))
+    response.headers.append('Vary', 'Cookie')
+    return response
+
+
+def _not_modified(request, etag, last_modified=None):
+    if not is_fresh(request.headers.get('if-none-match'), request.headers.get('if-modified-since'), etag, last_modified):
+        return None
+    return _with_validators(Response(status_code=304), (etag, last_modified))
+
+
+async def _current_user(request, cur):
+    """The logged-in User from the Flask session cookie, or None."""
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie or _session_serializer is None:
+        return None
+    try:
+        session = _session_serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return None
+    user_id = session.get('_user_id')
+    if not user_id:
+        return None
+
+    user = User.from_cache(user_id)
+    if user is None:
+        await cur.execute(USER_BY_ID_SQL, (user_id,))
+        row = await cur.fetchone()
+        user = User.remember(row) if row else None
+    return user
+
+
+def _endpoint(handler):
+    """Add the request id and CORS headers the sync tier adds."""
+    @wraps(handler)
+    async def wrapper(request):
+        request_id, token = bind_request_id(request.headers.get(REQUEST_ID_HEADER))
+        try:
+            response = await handler(request)
+        finally:
+            reset_request_id(token)
+        if response is _flask:
+            # Flask binds its own id from the same header
+            return response
+        response.headers[REQUEST_ID_HEADER] = request_id
+        origin = request.headers.get('origin')
+        if origin in CORS_ORIGINS:
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers['Access-Control-Allow-Credentials'] = 'true'
+            response.headers['Access-Control-Expose-Headers'] = ', '.join(CORS_EXPOSE_HEADERS)
+            response.headers.append('Vary', 'Origin')
+        return response
+    return wrapper
+
+
+@_endpoint
+async def get_recipe(request):
+    recipe_id = str(request.path_params['recipe_id'])
+    try:
+        async with _pool.connection() as conn:
+            cur = conn.cursor()
+            await cur.execute(RECIPE_VALIDATORS_SQL, recipe_validators_params(recipe_id))
+            validators = recipe_validators_from_row(recipe_id, await cur.fetchone())
+            if validators is None:
+                return _json({"status": "error", "message": "Recipe not found"}, 404)
+            cached = _not_modified(request, *validators)
+            if cached:
+                return cached
+
+            await cur.execute(RECIPE_DOCUMENT_SQL, (recipe_id,))
+            row = await cur.fetchone()
+    except Exception as e:
+        logger.exception("Error fetching recipe")
+        return _json({"status": "error", "message": str(e)}, 500)
+
+    if not row:
+        return _json({"status": "error", "message": "Recipe not found"}, 404)
+    return _with_validators(Response(row['document'], media_type='application/json'), validators)
+
+
+@_endpoint
+async def get_families(request):
+    async with _pool.connection() as conn:
+        cur = conn.cursor()
+        user = await _current_user(request, cur)
+        if user is None:
+            # Flask-Login decides what an anonymous caller gets
+            return _flask
+
+        await cur.execute(COLLECTION_VERSIONS_SQL, collection_versions_params([(USER_FAMILIES, user.id)]))
+        versions, changed_at = collection_versions_from_rows([(USER_FAMILIES, user.id)], await cur.fetchall())
+        etag = make_etag(user.id, *versions)
+        cached = _not_modified(request, etag, changed_at)
+        if cached:
+            return cached
+
+        await cur.execute(USER_FAMILIES_SQL, (user.id,))
+        families = [family_json(row) for row in await cur.fetchall()]
+    return _with_validators(_json(families), (etag, changed_at))
+
+
+@_endpoint
+async def get_family_members(request):
+    family_id = str(request.path_params['family_id'])
+    try:
+        async with _pool.connection() as conn:
+            cur = conn.cursor()
+            user = await _current_user(request, cur)
+            if user is None:
+                return _flask
+
+            # First verify user is a member of this family
+            await cur.execute(FAMILY_ROLE_SQL, (family_id, user.id))
+            if not await cur.fetchone():
+                return _json({"status": "error", "message": "Unauthorized access"}, 403)
+
+            await cur.execute(FAMILY_MEMBERS_SQL, (family_id,))
+            members = [family_member_json(row) for row in await cur.fetchall()]
+    except Exception as e:
+        logger.exception("Error fetching family members")
+        return _json({"status": "error", "message": str(e)}, 500)
+    return _json(members)
+
+
+@asynccontextmanager
+async def _lifespan(app):
+    await _pool.open()
+    try:
+        yield
+    finally:
+        await _pool.close()
+
+
+# Ids that are not UUIDs fall through to Flask, which owns the 400 responses
+# and the fixed paths such as /api/recipes/search
+app = Starlette(
+    routes=[
+        Route('/api/recipes/{recipe_id:uuid}', get_recipe, methods=['GET']),
+        Route('/api/families', get_families, methods=['GET']),
+        Route('/api/families/{family_id:uuid}/members', get_family_members, methods=['GET']),
+        Mount('', app=_flask),
+    ],
+    lifespan=_lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host=os.getenv('ASYNC_API_HOST', '127.0.0.1'), port=int(os.getenv('ASYNC_API_PORT', '5000')))
@@ -1,12 +1,27 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, login_required, logout_user, current_user
+import os
 import uuid
+import logging
 
 # Import from db_utils instead of app
 from db_utils import get_db_connection
+from cache_utils import make_cache
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
+logger = logging.getLogger(__name__)
+
+# Session hydration runs on every authenticated request, so user rows are
+# cached by id. Call User.invalidate() whenever a users row changes.
+_user_cache = make_cache(
+    'users',
+    maxsize=int(os.getenv('USER_CACHE_SIZE', '4096')),
+    ttl=float(os.getenv('USER_CACHE_TTL', '300'))
+)
+
+# Session hydration lookup; async_api.py runs it on its own driver
+USER_BY_ID_SQL = 'SELECT id, email, phone, first_name, last_name, role FROM users WHERE id = %s'
 
 # User class for flask-login
 class User:
@@ -29,23 +44,47 @@ class User:
     
     @staticmethod
     def get(user_id):
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute('SELECT id, email, phone, first_name, last_name, role FROM users WHERE id = %s', (user_id,))
-        user_data = cur.fetchone()
-        cur.close()
-        conn.close()
+        user = User.from_cache(user_id)
+        
+        if user is None:
+            conn = get_db_connection()
+            cur = conn.cursor()
+            cur.execute(USER_BY_ID_SQL, (user_id,))
+            row = cur.fetchone()
+            cur.close()
+            conn.close()
+            
+            if not row:
+                return None
+            user = User.remember(row)
         
-        if user_data:
-            return User(
-                id=user_data['id'],
-                email=user_data['email'],
-                phone=user_data['phone'],
-                first_name=user_data['first_name'],
-                last_name=user_data['last_name'],
-                role=user_data['role']
-            )
-        return None
+        return user
+    
+    @staticmethod
+    def from_cache(user_id):
+        """The cached user, or None on a miss; never touches the database."""
+        user_data = _user_cache.get(str(user_id))
+        # Build a fresh object per request so handlers never share state
+        return User(**user_data) if user_data is not None else None
+    
+    @staticmethod
+    def remember(row):
+        """Cache a USER_BY_ID_SQL row and return it as a User."""
+        # Store plain values so the entry also fits a shared backend
+        user_data = {
+            'id': str(row['id']),
+            'email': row['email'],
+            'phone': row['phone'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'role': row['role']
+        }
+        _user_cache.set(user_data['id'], user_data)
+        return User(**user_data)
+    
+    @staticmethod
+    def invalidate(user_id):
+        _user_cache.delete(str(user_id))
     
     @staticmethod
     def get_by_email(email):
@@ -186,6 +225,7 @@ def api_register():
         """, (family_id, user_id, 'admin'))
         
         conn.commit()
+        User.invalidate(user_id)
         
         # Create a user object and log them in
         user = User(
@@ -212,7 +252,7 @@ def api_register():
         
     except Exception as e:
         conn.rollback()
-        print(f"Registration error: {str(e)}")  # Add debug print
+        logger.exception("Registration error")
         return jsonify({'status': 'error', 'message': str(e)}), 500
     finally:
         cur.close()
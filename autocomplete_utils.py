@@ -0,0 +1,332 @@
+# autocomplete_utils.py
+import os
+import time
+import bisect
+import logging
+import itertools
+import threading
+from collections import Counter, defaultdict
+from dotenv import load_dotenv
+
+from db_utils import get_db_connection
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: each process keeps its own copy of the catalog in memory
+AUTOCOMPLETE_ENABLED = os.getenv('AUTOCOMPLETE_IN_MEMORY', 'false').lower() == 'true'
+# Full reload interval; also picks up rows written by other processes
+AUTOCOMPLETE_REFRESH_SECONDS = float(os.getenv('AUTOCOMPLETE_REFRESH_SECONDS', '300'))
+
+FUZZY_THRESHOLD = 0.3
+# Below this many candidates a linear scan beats walking the sorted keys
+SCAN_THRESHOLD = 256
+
+
+def _normalize(text):
+    return ' '.join(text.casefold().split()) if text else ''
+
+
+def _trigrams(text):
+    """Trigrams in the style of pg_trgm: each word padded with two leading blanks and one trailing."""
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class PrefixIndex:
+    """Names searchable by prefix (bisect over sorted keys) and by trigram similarity."""
+
+    def __init__(self):
+        self._keys = []                   # sorted (key, id); one per word start of every variant
+        self._names = {}                  # id -> display name
+        self._by_name = []                # sorted (display name, id), for empty terms
+        self._entries = {}                # id -> list of (key, id) held in _keys
+        self._grams = {}                  # id -> trigram set of the primary name
+        self._postings = defaultdict(set)  # trigram -> ids
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._names)
+
+    @classmethod
+    def build(cls, items):
+        """An index over (id, name, *aliases) tuples, sorted once at the end.
+
+        Use for bulk loads: add() keeps the keys sorted with an insertion
+        per entry, which is quadratic over a whole catalog.
+        """
+        index = cls()
+        for id, name, *aliases in items:
+            index._store(str(id), name, aliases)
+        index._keys = sorted(entry for entries in index._entries.values() for entry in entries)
+        index._by_name = sorted((name, id) for id, name in index._names.items())
+        return index
+
+    def _store(self, id, name, aliases):
+        # Everything but the two sorted lists, which the caller maintains
+        self._names[id] = name
+        entries = []
+        for variant in (name,) + tuple(aliases):
+            words = _normalize(variant).split()
+            # Index every word start so "basmati rice" is found by "rice"
+            for i in range(len(words)):
+                entries.append((' '.join(words[i:]), id))
+        self._entries[id] = entries
+        grams = _trigrams(_normalize(name))
+        self._grams[id] = grams
+        for gram in grams:
+            self._postings[gram].add(id)
+        return entries
+
+    def add(self, id, name, *aliases):
+        id = str(id)
+        with self._lock:
+            self.remove(id)
+            for entry in self._store(id, name, aliases):
+                bisect.insort(self._keys, entry)
+            bisect.insort(self._by_name, (name, id))
+
+    def remove(self, id):
+        id = str(id)
+        with self._lock:
+            if id not in self._names:
+                return
+            name = self._names.pop(id)
+            for entry in self._entries.pop(id):
+                pos = bisect.bisect_left(self._keys, entry)
+                if pos < len(self._keys) and self._keys[pos] == entry:
+                    del self._keys[pos]
+            pos = bisect.bisect_left(self._by_name, (name, id))
+            if pos < len(self._by_name) and self._by_name[pos] == (name, id):
+                del self._by_name[pos]
+            for gram in self._grams.pop(id):
+                self._postings[gram].discard(id)
+                if not self._postings[gram]:
+                    del self._postings[gram]
+
+    def name(self, id):
+        return self._names.get(str(id))
+
+    def _by_display_name(self, allowed):
+        # Small allowed sets are sorted directly, otherwise the sorted list is filtered
+        if allowed is not None and len(allowed) <= SCAN_THRESHOLD:
+            return iter(sorted((i for i in allowed if i in self._names), key=lambda i: (self._names[i], i)))
+        return (id for _, id in self._by_name if allowed is None or id in allowed)
+
+    def _prefix(self, term, want, allowed):
+        found = []
+        seen = set()
+        if allowed is not None and len(allowed) <= SCAN_THRESHOLD:
+            for id in self._by_display_name(allowed):
+                if any(key.startswith(term) for key, _ in self._entries[id]):
+                    found.append(id)
+                    if len(found) >= want:
+                        break
+            return found
+
+        pos = bisect.bisect_left(self._keys, (term,))
+        while pos < len(self._keys) and len(found) < want:
+            key, id = self._keys[pos]
+            if not key.startswith(term):
+                break
+            if id not in seen and (allowed is None or id in allowed):
+                seen.add(id)
+                found.append(id)
+            pos += 1
+        return found
+
+    def _fuzzy(self, term, want, allowed, exclude):
+        grams = _trigrams(term)
+        if not grams:
+            return []
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        scored = []
+        for id, common in shared.items():
+            if id in exclude or (allowed is not None and id not in allowed):
+                continue
+            score = common / (len(grams) + len(self._grams[id]) - common)
+            if score >= FUZZY_THRESHOLD:
+                scored.append((-score, self._names[id], id))
+        scored.sort()
+        return [id for _, _, id in scored[:want]]
+
+    def search(self, term, limit, offset=0, allowed=None):
+        """Return (ids, has_more): prefix matches first, then fuzzy matches."""
+        term = _normalize(term)
+        want = offset + limit + 1
+        with self._lock:
+            if not term:
+                ids = list(itertools.islice(self._by_display_name(allowed), want))
+            else:
+                ids = self._prefix(term, want, allowed)
+                if len(ids) < want:
+                    ids += self._fuzzy(term, want - len(ids), allowed, set(ids))
+        return ids[offset:offset + limit], len(ids) > offset + limit
+
+
+class AutocompleteService:
+    """In-process autocomplete over base ingredients, brands and their pairings."""
+
+    def __init__(self, refresh_interval=AUTOCOMPLETE_REFRESH_SECONDS):
+        self.refresh_interval = refresh_interval
+        self.ingredients = PrefixIndex()
+        self.brands = PrefixIndex()
+        self._branded = {}                       # branded id -> (base id, brand id)
+        self._brands_by_ingredient = defaultdict(set)
+        self._loaded_at = None
+        self._reloading = False
+        self._recorders = []                     # change logs of loads in progress
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Rebuild every index from PostgreSQL and swap it in.
+
+        Changes reported through the write hooks while the snapshot is read
+        are replayed onto the new indexes, so the swap does not undo them.
+        """
+        changes = []
+        with self._lock:
+            self._recorders.append(changes)
+        try:
+            ingredients, brands, branded, by_ingredient = self._read_snapshot()
+        finally:
+            with self._lock:
+                self._recorders.remove(changes)
+
+        with self._lock:
+            self.ingredients = ingredients
+            self.brands = brands
+            self._branded = branded
+            self._brands_by_ingredient = by_ingredient
+            for apply, args in changes:
+                apply(self, *args)
+            self._loaded_at = time.monotonic()
+
+    def _read_snapshot(self):
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute('''
+                SELECT id, name, name_hindi, name_gujarati, name_marathi, name_tamil
+                FROM base_ingredients
+            ''')
+            ingredients = PrefixIndex.build(
+                (row['id'], row['name'],
+                 *[row[col] for col in ('name_hindi', 'name_gujarati', 'name_marathi', 'name_tamil') if row[col]])
+                for row in cur.fetchall()
+            )
+
+            cur.execute('SELECT id, name FROM brands')
+            brands = PrefixIndex.build((row['id'], row['name']) for row in cur.fetchall())
+
+            cur.execute('SELECT id, base_ingredient_id, brand_id FROM branded_ingredients')
+            branded = {}
+            by_ingredient = defaultdict(set)
+            for row in cur.fetchall():
+                pair = (str(row['base_ingredient_id']), str(row['brand_id']))
+                branded[str(row['id'])] = pair
+                by_ingredient[pair[0]].add(pair[1])
+        finally:
+            cur.close()
+            conn.close()
+        return ingredients, brands, branded, by_ingredient
+
+    def _reload_in_background(self):
+        try:
+            self.load()
+        except Exception:
+            logger.exception("Autocomplete reload failed")
+        finally:
+            self._reloading = False
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None:
+            self.load()
+            return
+        with self._lock:
+            stale = time.monotonic() - self._loaded_at > self.refresh_interval
+            if not stale or self._reloading:
+                return
+            self._reloading = True
+        # Keep answering from the current indexes while the new ones build
+        threading.Thread(target=self._reload_in_background, daemon=True).start()
+
+    def search_ingredients(self, term, limit, offset=0):
+        self._ensure_fresh()
+        index = self.ingredients
+        ids, has_more = index.search(term, limit, offset)
+        return [{"id": id, "name": index.name(id)} for id in ids], has_more
+
+    def search_brands(self, ingredient_id, term, limit, offset=0):
+        self._ensure_fresh()
+        with self._lock:
+            index = self.brands
+            # A copy: the write hooks change these sets while searches iterate them
+            allowed = frozenset(self._brands_by_ingredient.get(str(ingredient_id), ()))
+        ids, has_more = index.search(term, limit, offset, allowed=allowed)
+        return [{"id": id, "name": index.name(id)} for id in ids], has_more
+
+    # Incremental updates from the write paths. Each change is applied to
+    # the current indexes and logged for any load() reading a snapshot.
+
+    def _change(self, apply, *args):
+        with self._lock:
+            apply(self, *args)
+            for changes in self._recorders:
+                changes.append((apply, args))
+
+    def ingredient_saved(self, id, name, *aliases):
+        self._change(AutocompleteService._add_ingredient, id, name, *[alias for alias in aliases if alias])
+
+    def ingredient_deleted(self, id):
+        self._change(AutocompleteService._remove_ingredient, id)
+
+    def brand_saved(self, id, name):
+        self._change(AutocompleteService._add_brand, id, name)
+
+    def brand_deleted(self, id):
+        self._change(AutocompleteService._remove_brand, id)
+
+    def branded_saved(self, id, base_ingredient_id, brand_id):
+        self._change(AutocompleteService._add_branded, str(id), (str(base_ingredient_id), str(brand_id)))
+
+    def branded_deleted(self, id):
+        self._change(AutocompleteService._remove_branded, str(id))
+
+    # Appliers; called with the service lock held
+
+    def _add_ingredient(self, id, name, *aliases):
+        self.ingredients.add(id, name, *aliases)
+
+    def _remove_ingredient(self, id):
+        self.ingredients.remove(id)
+
+    def _add_brand(self, id, name):
+        self.brands.add(id, name)
+
+    def _remove_brand(self, id):
+        self.brands.remove(id)
+
+    def _add_branded(self, id, pair):
+        self._branded[id] = pair
+        self._brands_by_ingredient[pair[0]].add(pair[1])
+
+    def _remove_branded(self, id):
+        pair = self._branded.pop(id, None)
+        if pair:
+            self._brands_by_ingredient[pair[0]].discard(pair[1])
+
+
+_service = AutocompleteService() if AUTOCOMPLETE_ENABLED else None
+
+
+def get_autocomplete():
+    """The process-wide service, or None when AUTOCOMPLETE_IN_MEMORY is off."""
+    return _service
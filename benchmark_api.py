@@ -0,0 +1,168 @@
+# benchmark_api.py
+# Throughput and latency of the API tiers under concurrent load. Start the
+# servers under test against the same database, then point this at them:
+#
+#   gunicorn -w 1 --threads 16 -b :5000 app:app     # sync Flask tier
+#   uvicorn async_api:app --port 5001                # async tier
+#   python benchmark_api.py -t sync=http://localhost:5000 -t async=http://localhost:5001 \
+#       -p /api/recipes/<id> -p /api/families --cookie "session=..." -c 200 -d 15
+#
+# Use one process per server so the numbers compare one worker each. Only
+# the standard library is needed: every simulated client is a coroutine on
+# its own keep-alive HTTP/1.1 connection, so the client is not the bottleneck.
+import time
+import asyncio
+import argparse
+import statistics
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+class TargetStats:
+    """Responses collected for one target after the warm-up period."""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = 0
+
+    def record(self, status, elapsed):
+        self.statuses[status] += 1
+        self.latencies.append(elapsed)
+
+    def summary(self, seconds):
+        latencies = sorted(self.latencies)
+        if len(latencies) >= 2:
+            cuts = statistics.quantiles(latencies, n=100)
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = latencies[0] if latencies else 0.0
+        return {
+            'requests': len(latencies),
+            'errors': self.errors,
+            'rps': len(latencies) / seconds,
+            'p50_ms': p50 * 1000,
+            'p95_ms': p95 * 1000,
+            'p99_ms': p99 * 1000,
+            'statuses': dict(sorted(self.statuses.items())),
+        }
+
+
+async def _read_body(reader, headers, status):
+    """Consume the response body; returns True if the server will close the connection."""
+    if status in (204, 304) or 100 <= status < 200:
+        return headers['connection'] == 'close'
+    if 'chunked' in headers.get('transfer-encoding', ''):
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                # Trailers, then the blank line ending the message
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                break
+            await reader.readexactly(size + 2)
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        return True
+    return headers['connection'] == 'close'
+
+
+async def _request(reader, writer, request):
+    writer.write(request)
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('server closed the connection')
+    version, status = status_line.split()[:2]
+    status = int(status)
+
+    # HTTP/1.0 closes after every response unless told otherwise
+    headers = {'connection': 'keep-alive' if version == b'HTTP/1.1' else 'close'}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    return status, await _read_body(reader, headers, status)
+
+
+async def _client(url, requests, stats, measure_from, deadline, offset):
+    host, port = url.hostname, url.port or 80
+    reader = writer = None
+    i = offset
+    while time.monotonic() < deadline:
+        request = requests[i % len(requests)]
+        i += 1
+        start = time.monotonic()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            status, close = await _request(reader, writer, request)
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            if start >= measure_from:
+                stats.errors += 1
+            close = True
+        else:
+            if start >= measure_from:
+                stats.record(status, time.monotonic() - start)
+        if close and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+def _build_requests(url, paths, headers):
+    lines = [f'Host: {url.netloc}', 'Connection: keep-alive'] + headers
+    return [
+        (f'GET {path} HTTP/1.1\r\n' + ''.join(f'{line}\r\n' for line in lines) + '\r\n').encode('latin-1')
+        for path in paths
+    ]
+
+
+async def run_target(base_url, paths, headers, concurrency, duration, warmup):
+    url = urlsplit(base_url)
+    requests = _build_requests(url, paths, headers)
+    stats = TargetStats()
+    measure_from = time.monotonic() + warmup
+    deadline = measure_from + duration
+    await asyncio.gather(*[
+        _client(url, requests, stats, measure_from, deadline, offset)
+        for offset in range(concurrency)
+    ])
+    return stats.summary(duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare API throughput of the sync and async tiers.')
+    parser.add_argument('-t', '--target', action='append', required=True,
+                        help='name=base URL, e.g. async=http://localhost:5001; repeat to compare')
+    parser.add_argument('-p', '--path', action='append', required=True,
+                        help='path to request; repeat to cycle through several')
+    parser.add_argument('-c', '--concurrency', type=int, default=100, help='simultaneous clients')
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='measured seconds per target')
+    parser.add_argument('-w', '--warmup', type=float, default=2.0, help='unmeasured seconds before that')
+    parser.add_argument('--cookie', help='Cookie header value, for endpoints that need a login')
+    parser.add_argument('-H', '--header', action='append', default=[], help='extra request header')
+    args = parser.parse_args()
+
+    headers = list(args.header)
+    if args.cookie:
+        headers.append(f'Cookie: {args.cookie}')
+
+    print(f"{'target':<12}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses")
+    # Targets run one after another so they don't compete for the database
+    for target in args.target:
+        name, _, base_url = target.partition('=')
+        if not base_url:
+            name, base_url = target, target
+        result = asyncio.run(run_target(base_url, args.path, headers, args.concurrency, args.duration, args.warmup))
+        print(f"{name:<12}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10.1f}"
+              f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}  {result['statuses']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+# blob_utils.py
+import os
+import re
+import hashlib
+import logging
+import tempfile
+from dotenv import load_dotenv
+
+from image_utils import delete_variants, remove_variant_files
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Uploaded files are stored once per distinct content, named by SHA-256 and
+# sharded two levels deep: <root>/ab/cd/abcd...ef.png
+BLOB_ROOT = os.getenv('BLOB_ROOT', os.path.join('static', 'uploads', 'blobs'))
+BLOB_URL_PREFIX = os.getenv('BLOB_URL_PREFIX', '/static/uploads/blobs')
+# Files saved before the blob store existed; these always had a single owner
+LEGACY_URL_PREFIX = '/static/uploads/'
+# Also Flask's MAX_CONTENT_LENGTH, which rejects larger bodies before reading
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+
+CHUNK_SIZE = 64 * 1024
+# Enough leading bytes to recognise every accepted format
+HEADER_BYTES = 12
+
+_BLOB_NAME = re.compile(r'^([0-9a-f]{64})(\.[a-z0-9]{1,5})?$')
+
+
+class InvalidUpload(ValueError):
+    """Raised for uploads that are too large or not a supported image."""
+
+
+def sniff_image(header):
+    """File extension for the image format in ``header``, or None."""
+    if header.startswith(b'\xff\xd8\xff'):
+        return '.jpg'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return '.png'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return '.gif'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+
+def _scan_upload(stream):
+    """Hash and measure an upload in one pass, checking it is an image we accept.
+
+    Raises InvalidUpload as soon as the header or the size rules it out.
+    """
+    sha = hashlib.sha256()
+    size = 0
+    extension = None
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        if extension is None:
+            extension = sniff_image(chunk[:HEADER_BYTES])
+            if extension is None:
+                raise InvalidUpload('Only JPEG, PNG, GIF and WebP images are allowed')
+        size += len(chunk)
+        if size > MAX_UPLOAD_BYTES:
+            raise InvalidUpload(f'Images must be {MAX_UPLOAD_BYTES // (1024 * 1024)} MB or smaller')
+        sha.update(chunk)
+    if extension is None:
+        raise InvalidUpload('The uploaded file is empty')
+    return sha.hexdigest(), size, extension
+
+
+def blob_path(digest, extension):
+    return os.path.join(BLOB_ROOT, digest[:2], digest[2:4], digest + extension)
+
+
+def blob_url(digest, extension):
+    return f"{BLOB_URL_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def _digest_from_url(url):
+    if not url.startswith(BLOB_URL_PREFIX + '/'):
+        return None
+    match = _BLOB_NAME.match(url.rsplit('/', 1)[-1])
+    return match.group(1) if match else None
+
+
+def local_blob_path(url):
+    """Where the file behind a blob URL is stored."""
+    match = _BLOB_NAME.match(url.rsplit('/', 1)[-1])
+    return blob_path(match.group(1), match.group(2) or '')
+
+
+def _write_atomic(stream, path):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                tmp.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _unlink(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _lock_content(cur, digest):
+    # Held to the end of the transaction; orders uploads of the same content
+    # against the removal of its file after a release
+    cur.execute('SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))', (digest,))
+
+
+def store_blob(cur, upload):
+    """Take a reference to an uploaded file's content and return its URL.
+
+    ``upload`` is a werkzeug FileStorage, already spooled to a temporary file
+    by werkzeug when it is large. It is validated and hashed before anything
+    is written, so rejected files and files already stored cost no writes.
+    The extension comes from the content, not the client's filename.
+    """
+    stream = upload.stream
+    stream.seek(0)
+    digest, size, extension = _scan_upload(stream)
+
+    _lock_content(cur, digest)
+    cur.execute('''
+        INSERT INTO blobs (sha256, extension, size_bytes, ref_count)
+        VALUES (%s, %s, %s, 1)
+        ON CONFLICT (sha256) DO UPDATE SET ref_count = blobs.ref_count + 1
+        RETURNING extension
+    ''', (digest, extension, size))
+    extension = cur.fetchone()['extension']
+
+    path = blob_path(digest, extension)
+    if not os.path.exists(path):
+        # New content, or a file removed after its last reference went
+        stream.seek(0)
+        _write_atomic(stream, path)
+    return blob_url(digest, extension)
+
+
+def release_blob(cur, url):
+    """Drop one reference to a stored file.
+
+    Returns the URL when that was the last reference, otherwise None.
+    Nothing is deleted from disk here: pass the URLs to delete_released()
+    once the transaction has committed, so a rollback never leaves rows
+    pointing at missing files.
+    """
+    if not url:
+        return None
+
+    digest = _digest_from_url(url)
+    if digest is None:
+        if url.startswith(LEGACY_URL_PREFIX):
+            delete_variants(cur, url)
+            return url
+        return None
+
+    cur.execute('''
+        UPDATE blobs SET ref_count = ref_count - 1
+        WHERE sha256 = %s
+        RETURNING ref_count
+    ''', (digest,))
+    row = cur.fetchone()
+    if row and row['ref_count'] <= 0:
+        cur.execute('DELETE FROM blobs WHERE sha256 = %s', (digest,))
+        delete_variants(cur, url)
+        return url
+    return None
+
+
+def delete_released(conn, urls):
+    """Remove the files of URLs release_blob() returned, after the commit.
+
+    Content uploaded again since then is kept: the check runs under the
+    lock store_blob() takes, so an upload either committed first and is
+    seen here, or waits and rewrites the missing file. Failures are only
+    logged, since the change they belong to is already committed.
+    """
+    cur = conn.cursor()
+    try:
+        for url in filter(None, urls):
+            digest = _digest_from_url(url)
+            if digest is None:
+                # Files saved before the blob store always had a single owner
+                path = url.lstrip('/')
+            else:
+                _lock_content(cur, digest)
+                cur.execute('SELECT 1 FROM blobs WHERE sha256 = %s', (digest,))
+                stored_again = cur.fetchone() is not None
+                path = None if stored_again else local_blob_path(url)
+            if path:
+                remove_variant_files(url)
+                _unlink(path)
+            # Ends the transaction, releasing the lock
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        logger.exception("Error removing released files")
+    finally:
+        cur.close()
@@ -0,0 +1,88 @@
+# cache_utils.py
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+try:
+    import redis
+except ImportError:  # redis is only needed for the shared backend
+    redis = None
+
+# Load environment variables
+load_dotenv()
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """Cache shared between processes. Values must be JSON serializable."""
+
+    def __init__(self, url, namespace, ttl=300):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+
+    def _key(self, key):
+        return f'{self.namespace}:{key}'
+
+    def get(self, key, default=None):
+        raw = self._client.get(self._key(key))
+        return default if raw is None else json.loads(raw)
+
+    def set(self, key, value):
+        self._client.set(self._key(key), json.dumps(value), ex=int(self.ttl))
+
+    def delete(self, key):
+        self._client.delete(self._key(key))
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self._key('*')):
+            self._client.delete(key)
+
+
+def make_cache(namespace, maxsize=1024, ttl=300):
+    """Return a shared Redis cache when CACHE_REDIS_URL is set, else a local TTLCache."""
+    url = os.getenv('CACHE_REDIS_URL')
+    if url:
+        if redis is None:
+            raise RuntimeError('CACHE_REDIS_URL is set but the redis package is not installed')
+        return RedisCache(url, namespace, ttl=ttl)
+    return TTLCache(maxsize=maxsize, ttl=ttl)
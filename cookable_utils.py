@@ -0,0 +1,51 @@
+# cookable_utils.py
+from recipe_utils import VISIBLE_RECIPE_SQL
+
+# Upper bound on how many ingredients one "what can I cook" query may list
+MAX_PANTRY_SIZE = 200
+
+
+def find_cookable_recipes(cur, base_ingredient_ids, user_id, limit, offset=0, max_missing=None):
+    """Recipes using any of ``base_ingredient_ids``, best coverage first.
+
+    Candidates come straight from the GIN index on
+    recipe_ingredient_sets.base_ingredient_ids (migrations/012); only their
+    stored arrays are intersected with the supplied set, so the cost follows
+    the number of matching recipes rather than the size of
+    recipe_ingredients. Recipes needing nothing else come first, then by
+    the share of their ingredients on hand and the fewest missing.
+
+    Pass one more than the page size as ``limit`` to tell whether another
+    page exists.
+    """
+    params = {
+        'ids': sorted({str(id) for id in base_ingredient_ids}),
+        'user_id': str(user_id) if user_id else None,
+        'max_missing': max_missing,
+        'limit': limit,
+        'offset': offset,
+    }
+    missing_filter = ''
+    if max_missing is not None:
+        missing_filter = 'AND m.ingredient_count - m.matched <= %(max_missing)s'
+
+    cur.execute(f'''
+        WITH matches AS (
+            SELECT s.recipe_id, s.ingredient_count,
+                   (SELECT count(*) FROM unnest(s.base_ingredient_ids) AS i(id)
+                    WHERE i.id = ANY(%(ids)s::uuid[])) AS matched
+            FROM recipe_ingredient_sets s
+            WHERE s.base_ingredient_ids && %(ids)s::uuid[]
+        )
+        SELECT r.id, r.title, r.image_url, r.servings, r.prep_time_minutes, r.cook_time_minutes,
+               m.matched, m.ingredient_count,
+               m.ingredient_count - m.matched AS missing,
+               round(m.matched::numeric / m.ingredient_count, 4) AS coverage
+        FROM matches m
+        JOIN recipes r ON r.id = m.recipe_id
+        WHERE {VISIBLE_RECIPE_SQL}
+          {missing_filter}
+        ORDER BY coverage DESC, missing, m.matched DESC, r.id
+        LIMIT %(limit)s OFFSET %(offset)s
+    ''', params)
+    return cur.fetchall()
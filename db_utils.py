@@ -1,24 +1,261 @@
 # db_utils.py
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2 import extensions
 import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from functools import wraps
 from flask import redirect, url_for, flash
 from flask_login import current_user
 
+from sql_stats_utils import SQL_STATS_ENABLED, instrumented
+
 # Load environment variables
 load_dotenv()
 
-def get_db_connection():
-    conn = psycopg2.connect(
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection became available in time."""
+
+
+def _connect():
+    return psycopg2.connect(
         host=os.getenv('DB_HOST', 'localhost'),
         database=os.getenv('DB_NAME', 'recipe_keeper'),
         user=os.getenv('DB_USER', 'postgres'),
         password=os.getenv('DB_PASSWORD', 'password'),
         cursor_factory=RealDictCursor
     )
-    return conn
+
+
+class PooledConnection:
+    """Wraps a psycopg2 connection borrowed from a ConnectionPool.
+
+    Behaves like the raw connection, except that close() hands it back to
+    the pool instead of tearing down the backend, so existing
+    ``conn.close()`` call sites keep working unchanged.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get('_raw')
+        if raw is None:
+            raise psycopg2.InterfaceError('connection already returned to pool')
+        return getattr(raw, name)
+
+    def cursor(self, *args, **kwargs):
+        raw = self.__dict__.get('_raw')
+        if raw is None:
+            raise psycopg2.InterfaceError('connection already returned to pool')
+        if SQL_STATS_ENABLED:
+            # Time every statement for the per-request stats in sql_stats_utils
+            factory = kwargs.get('cursor_factory') or raw.cursor_factory or extensions.cursor
+            kwargs['cursor_factory'] = instrumented(factory)
+        return raw.cursor(*args, **kwargs)
+
+    @property
+    def closed(self):
+        raw = self.__dict__.get('_raw')
+        return 1 if raw is None else raw.closed
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.putconn(raw, self._created_at)
+
+    def __del__(self):
+        # Some handlers return early without closing; don't leak the slot
+        if self.__dict__.get('_raw') is not None:
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        raw = self._raw
+        if raw is not None and not raw.closed:
+            if exc_type is None:
+                raw.commit()
+            else:
+                raw.rollback()
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """Process-wide, thread-safe pool of PostgreSQL connections.
+
+    - ``minconn`` connections are opened eagerly, at most ``maxconn`` exist.
+    - Connections older than ``max_lifetime`` seconds are recycled.
+    - Idle connections are pinged on checkout when ``pre_ping`` is set.
+    - Borrowers wait up to ``timeout`` seconds before PoolTimeout is raised.
+    """
+
+    def __init__(self, minconn=1, maxconn=10, max_lifetime=1800, timeout=30,
+                 pre_ping=True, connect=_connect):
+        if maxconn < 1 or minconn < 0 or minconn > maxconn:
+            raise ValueError('invalid pool size: min=%s max=%s' % (minconn, maxconn))
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self._connect = connect
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _expired(self, created_at):
+        return bool(self.max_lifetime) and time.monotonic() - created_at > self.max_lifetime
+
+    def _healthy(self, raw, created_at):
+        if raw.closed or self._expired(created_at):
+            return False
+        if raw.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if self.pre_ping:
+            try:
+                cur = raw.cursor()
+                cur.execute('SELECT 1')
+                cur.close()
+                raw.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise psycopg2.InterfaceError('connection pool is closed')
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout('no database connection available after %ss' % self.timeout)
+                    self._cond.wait(remaining)
+                if self._idle:
+                    raw, created_at = self._idle.pop()
+                else:
+                    raw, created_at = None, None
+                    self._size += 1
+
+            if raw is None:
+                try:
+                    raw = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                return PooledConnection(self, raw, time.monotonic())
+
+            if self._healthy(raw, created_at):
+                return PooledConnection(self, raw, created_at)
+
+            # Stale or broken: drop it and try again with a fresh slot
+            self._discard(raw)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+
+    def putconn(self, raw, created_at):
+        keep = not raw.closed and not self._expired(created_at)
+        if keep and raw.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            # Never hand the next borrower a half-finished transaction
+            try:
+                raw.rollback()
+            except psycopg2.Error:
+                keep = False
+        with self._cond:
+            if keep and not self._closed:
+                self._idle.append((raw, created_at))
+            else:
+                self._size -= 1
+                self._discard(raw)
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                raw, _ = self._idle.pop()
+                self._size -= 1
+                self._discard(raw)
+            self._cond.notify_all()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use (and after fork)."""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                # Sockets inherited from a parent process must not be reused
+                _pool = ConnectionPool(
+                    minconn=int(os.getenv('DB_POOL_MIN', '1')),
+                    maxconn=int(os.getenv('DB_POOL_MAX', '10')),
+                    max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+                    timeout=float(os.getenv('DB_POOL_TIMEOUT', '30')),
+                    pre_ping=os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+                )
+                _pool_pid = pid
+    return _pool
+
+
+def open_connection():
+    """A dedicated connection outside the pool, e.g. for LISTEN. Caller closes it."""
+    return _connect()
+
+
+def get_db_connection():
+    """Borrow a connection from the pool. Call close() to give it back."""
+    return get_pool().getconn()
+
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled connection for the duration of a ``with`` block.
+
+    Commits on a clean exit, rolls back if the block raises, and always
+    returns the connection to the pool.
+    """
+    conn = get_db_connection()
+    try:
+        yield conn
+        if not conn.closed:
+            conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+
 
 # Admin required decorator
 def admin_required(f):
@@ -28,4 +265,4 @@ def admin_required(f):
             flash('You do not have permission to access this page.', 'danger')
             return redirect(url_for('auth.login'))
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
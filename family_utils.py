@@ -0,0 +1,49 @@
+# family_utils.py
+# Queries and JSON shapes of the family read endpoints, shared by the Flask
+# and async API tiers so both return identical documents
+
+# Families the user is an active member of, newest first. One %s: the user id.
+USER_FAMILIES_SQL = '''
+    SELECT f.id, f.name, f.created_at, fm.role as user_role
+    FROM families f
+    JOIN family_members fm ON f.id = fm.family_id
+    WHERE fm.user_id = %s AND fm.is_active = true
+    ORDER BY f.created_at DESC
+'''
+
+# The user's role in a family, if they are an active member. Params: family id, user id.
+FAMILY_ROLE_SQL = '''
+    SELECT role FROM family_members
+    WHERE family_id = %s AND user_id = %s AND is_active = true
+'''
+
+# Active members of a family in joining order. One %s: the family id.
+FAMILY_MEMBERS_SQL = '''
+    SELECT fm.id, fm.user_id, fm.role, fm.joined_at,
+        u.email, u.first_name, u.last_name
+    FROM family_members fm
+    JOIN users u ON fm.user_id = u.id
+    WHERE fm.family_id = %s AND fm.is_active = true
+    ORDER BY fm.joined_at
+'''
+
+
+def family_json(row):
+    return {
+        "id": str(row['id']),
+        "name": row['name'],
+        "created_at": row['created_at'].isoformat() if row['created_at'] else None,
+        "user_role": row['user_role']
+    }
+
+
+def family_member_json(row):
+    return {
+        "id": str(row['id']),
+        "user_id": str(row['user_id']),
+        "role": row['role'],
+        "joined_at": row['joined_at'].isoformat() if row['joined_at'] else None,
+        "email": row['email'],
+        "first_name": row['first_name'],
+        "last_name": row['last_name']
+    }
@@ -0,0 +1,136 @@
+# http_cache_utils.py
+import hashlib
+from flask import request, Response
+from werkzeug.http import parse_etags, parse_date, quote_etag, http_date
+
+# Clients may keep a copy but must revalidate it before every use
+CACHE_CONTROL = 'private, no-cache'
+
+# Scopes maintained by the triggers in migrations/015
+USER_RECIPES = 'user_recipes'
+USER_FAMILIES = 'user_families'
+INGREDIENTS = 'ingredients'
+# Cuisine, ingredient and brand names shown inside recipes
+CATALOG_NAMES = 'catalog_names'
+# Owner of the global scopes
+GLOBAL_OWNER = '00000000-0000-0000-0000-000000000000'
+
+
+def make_etag(*parts):
+    """Opaque tag over the values a response was built from."""
+    text = '\x1f'.join('' if part is None else str(part) for part in parts)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:32]
+
+
+# The queries below are split from their result handling so the async
+# tier (async_api.py) can run them on its own driver
+COLLECTION_VERSIONS_SQL = '''
+    SELECT scope, owner_id, version, changed_at
+    FROM collection_versions
+    WHERE (scope, owner_id) IN (SELECT * FROM unnest(%s::text[], %s::uuid[]))
+'''
+
+
+def collection_versions_params(keys):
+    return [scope for scope, _ in keys], [str(owner_id) for _, owner_id in keys]
+
+
+def collection_versions_from_rows(keys, rows):
+    rows = {(row['scope'], str(row['owner_id'])): row for row in rows}
+
+    versions = []
+    changed_at = None
+    for scope, owner_id in keys:
+        row = rows.get((scope, str(owner_id)))
+        versions.append(row['version'] if row else 0)
+        if row and (changed_at is None or row['changed_at'] > changed_at):
+            changed_at = row['changed_at']
+    return versions, changed_at
+
+
+def collection_versions(cur, *keys):
+    """Current versions of (scope, owner_id) collections, in one query.
+
+    Returns (versions, changed_at): the versions in ``keys`` order, 0 for a
+    collection unchanged since the migration, and the latest change time of
+    any of them, or None. Read the versions before the data they describe:
+    a change committed in between then costs the client one extra download
+    rather than leaving it with a stale copy.
+    """
+    cur.execute(COLLECTION_VERSIONS_SQL, collection_versions_params(keys))
+    return collection_versions_from_rows(keys, cur.fetchall())
+
+
+# Everything in the recipe document bumps one of these: recipes.updated_at
+# follows edits to the recipe and its ingredients and steps, the next two
+# follow the nutrition and image-variant workers, and catalog_names follows
+# renamed cuisines, ingredients and brands
+RECIPE_VALIDATORS_SQL = '''
+    SELECT r.updated_at,
+           (SELECT n.computed_at FROM recipe_nutrition n WHERE n.recipe_id = r.id) AS nutrition_at,
+           (SELECT max(v.created_at) FROM image_variants v
+            WHERE v.image_url IN (
+                SELECT r.image_url
+                UNION ALL
+                SELECT s.media_url FROM recipe_steps s WHERE s.recipe_id = r.id
+            )) AS variants_at,
+           (SELECT cv.version FROM collection_versions cv
+            WHERE cv.scope = %s AND cv.owner_id = %s::uuid) AS names_version
+    FROM recipes r
+    WHERE r.id = %s
+'''
+
+
+def recipe_validators_params(recipe_id):
+    return CATALOG_NAMES, GLOBAL_OWNER, recipe_id
+
+
+def recipe_validators_from_row(recipe_id, row):
+    if row is None:
+        return None
+    etag = make_etag(recipe_id, row['updated_at'], row['nutrition_at'], row['variants_at'], row['names_version'])
+    last_modified = max(filter(None, (row['updated_at'], row['nutrition_at'], row['variants_at'])), default=None)
+    return etag, last_modified
+
+
+def recipe_validators(cur, recipe_id):
+    """(etag, last_modified) for GET /api/recipes/<id>, or None if there is no such recipe."""
+    cur.execute(RECIPE_VALIDATORS_SQL, recipe_validators_params(recipe_id))
+    return recipe_validators_from_row(recipe_id, cur.fetchone())
+
+
+def is_fresh(if_none_match, if_modified_since, etag, last_modified=None):
+    """Whether the raw conditional request headers match the current validators."""
+    # If-None-Match wins over If-Modified-Since when both are sent
+    if if_none_match:
+        return parse_etags(if_none_match).contains_weak(etag)
+    since = parse_date(if_modified_since)
+    if last_modified is not None and since is not None:
+        # HTTP dates have whole seconds
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def validator_headers(etag, last_modified=None):
+    """ETag, Last-Modified and Cache-Control for a response built from these validators."""
+    headers = {'ETag': quote_etag(etag, weak=True), 'Cache-Control': CACHE_CONTROL}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+
+def with_validators(response, etag, last_modified=None):
+    """Attach the validator headers to ``response``."""
+    response.headers.update(validator_headers(etag, last_modified))
+    response.vary.add('Cookie')
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    """A 304 response when the client's copy is current, otherwise None.
+
+    Call before running the queries that build the body.
+    """
+    if not is_fresh(request.headers.get('If-None-Match'), request.headers.get('If-Modified-Since'), etag, last_modified):
+        return None
+    return with_validators(Response(status=304), etag, last_modified)
@@ -0,0 +1,218 @@
+# image_utils.py
+import os
+import time
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # variants are optional; jobs fail and views use originals
+    Image = None
+    ImageOps = None
+
+from job_utils import JobQueue
+
+# Load environment variables
+load_dotenv()
+
+# Resize processes per web process; 0 leaves the queue to `python image_utils.py`
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '1'))
+IMAGE_POLL_SECONDS = float(os.getenv('IMAGE_POLL_SECONDS', '5'))
+IMAGE_JOB_TIMEOUT = int(os.getenv('IMAGE_JOB_TIMEOUT', '300'))
+IMAGE_MAX_ATTEMPTS = int(os.getenv('IMAGE_MAX_ATTEMPTS', '3'))
+# The Next.js public/ directory; recipe uploads are served from /uploads/...
+NEXT_PUBLIC_DIR = os.getenv('NEXT_PUBLIC_DIR', 'public')
+
+# Variant name -> longest edge in pixels, all encoded as WebP. None keeps the
+# original dimensions. Images are never upscaled, so small originals simply
+# have fewer variants and views fall back to the original.
+VARIANT_SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'large': 1280,
+    'webp': None,
+}
+DEFAULT_LIST_VARIANT = 'card'
+WEBP_QUALITY = 80
+
+STATUS_PENDING = 'pending'
+STATUS_PROCESSING = 'processing'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def local_image_path(image_url):
+    """Where an uploaded image lives on disk, or None for external URLs.
+
+    Image URLs come from clients, so anything resolving outside the upload
+    directories (``..`` segments, symlinks) is treated as external too.
+    """
+    if not image_url:
+        return None
+    if image_url.startswith('/static/'):
+        root = 'static'
+    elif image_url.startswith('/uploads/'):
+        root = os.path.join(NEXT_PUBLIC_DIR, 'uploads')
+    else:
+        return None
+    root = os.path.realpath(root)
+    relative = image_url.split('/', 2)[2]
+    path = os.path.realpath(os.path.join(root, relative))
+    if path == root or os.path.commonpath([root, path]) != root:
+        return None
+    return path
+
+
+def variant_url(image_url, variant):
+    return f"{os.path.splitext(image_url)[0]}-{variant}.webp"
+
+
+def _make_variants(image_url):
+    # Runs in a worker process, so it must not touch the database
+    if Image is None:
+        raise RuntimeError('Pillow is not installed')
+
+    variants = []
+    with Image.open(local_image_path(image_url)) as source:
+        original = ImageOps.exif_transpose(source)
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA' if 'transparency' in original.info or 'A' in original.mode else 'RGB')
+
+        for variant, edge in VARIANT_SIZES.items():
+            if edge is not None and max(original.size) <= edge:
+                continue
+            image = original.copy()
+            if edge is not None:
+                image.thumbnail((edge, edge), Image.LANCZOS)
+
+            url = variant_url(image_url, variant)
+            path = local_image_path(url)
+            tmp_path = f"{path}.tmp"
+            image.save(tmp_path, 'WEBP', quality=WEBP_QUALITY)
+            os.replace(tmp_path, path)
+            variants.append({
+                'variant': variant,
+                'url': url,
+                'width': image.width,
+                'height': image.height,
+                'size_bytes': os.path.getsize(path),
+            })
+    return variants
+
+
+def enqueue_variants(cur, *image_urls):
+    """Queue variant generation for uploaded images in the caller's transaction.
+
+    External URLs and paths escaping the upload directories are skipped, as
+    are images already queued or processed.
+    """
+    urls = sorted({url for url in image_urls if local_image_path(url)})
+    if not urls:
+        return
+    cur.execute('''
+        INSERT INTO image_variant_jobs (image_url)
+        SELECT unnest(%s::text[])
+        ON CONFLICT (image_url) DO NOTHING
+    ''', (urls,))
+
+
+def delete_variants(cur, image_url):
+    """Forget an image's variants; remove_variant_files() deletes the files after commit."""
+    cur.execute('DELETE FROM image_variant_jobs WHERE image_url = %s', (image_url,))
+    cur.execute('DELETE FROM image_variants WHERE image_url = %s', (image_url,))
+
+
+def remove_variant_files(image_url):
+    for variant in VARIANT_SIZES:
+        path = local_image_path(variant_url(image_url, variant))
+        if path is None:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class ImageVariantQueue(JobQueue):
+    """Thumbnail and WebP generation, queued in image_variant_jobs."""
+
+    name = 'image-variants'
+    max_attempts = IMAGE_MAX_ATTEMPTS
+
+    def __init__(self, workers=IMAGE_WORKERS, poll_interval=IMAGE_POLL_SECONDS):
+        super().__init__(workers, poll_interval)
+
+    def claim(self, cur):
+        cur.execute('''
+            UPDATE image_variant_jobs
+            SET status = %(processing)s, started_at = now(), attempts = attempts + 1
+            WHERE image_url = (
+                SELECT image_url FROM image_variant_jobs
+                WHERE status = %(pending)s
+                   OR (status = %(processing)s
+                       AND started_at < now() - make_interval(secs => %(timeout)s))
+                ORDER BY queued_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING image_url, attempts
+        ''', {'processing': STATUS_PROCESSING, 'pending': STATUS_PENDING, 'timeout': IMAGE_JOB_TIMEOUT})
+        job = cur.fetchone()
+        if job and job['attempts'] > IMAGE_MAX_ATTEMPTS:
+            self.fail(cur, job, f"Gave up after {IMAGE_MAX_ATTEMPTS} attempts")
+            return None
+        return job
+
+    def task(self, job):
+        return _make_variants, (job['image_url'],)
+
+    def complete(self, cur, job, variants):
+        cur.execute('DELETE FROM image_variants WHERE image_url = %s', (job['image_url'],))
+        if variants:
+            execute_values(cur, '''
+                INSERT INTO image_variants (image_url, variant, url, width, height, size_bytes)
+                VALUES %s
+            ''', [
+                (job['image_url'], v['variant'], v['url'], v['width'], v['height'], v['size_bytes'])
+                for v in variants
+            ])
+        self._record(cur, job['image_url'], STATUS_DONE)
+
+    def fail(self, cur, job, error):
+        self._record(cur, job['image_url'], STATUS_FAILED, error)
+
+    def attempts(self, job):
+        return job['attempts']
+
+    def retry(self, cur, job, error):
+        self._record(cur, job['image_url'], STATUS_PENDING, error)
+
+    @staticmethod
+    def _record(cur, image_url, status, error=None):
+        cur.execute('''
+            UPDATE image_variant_jobs
+            SET status = %s, error = %s, finished_at = now()
+            WHERE image_url = %s AND status = %s
+        ''', (status, error, image_url, STATUS_PROCESSING))
+
+
+_queue = ImageVariantQueue()
+
+
+def get_image_queue():
+    return _queue
+
+
+def wake_image_queue():
+    """Make sure this process is dispatching and tell it new work is waiting."""
+    _queue.wake()
+
+
+if __name__ == '__main__':
+    # Standalone runner for deployments that set IMAGE_WORKERS=0 on the web tier
+    from log_utils import configure_logging
+    configure_logging()
+    runner = ImageVariantQueue(workers=int(os.getenv('IMAGE_RUNNER_WORKERS', str(os.cpu_count() or 1))))
+    runner.start()
+    while True:
+        time.sleep(3600)
@@ -0,0 +1,125 @@
+# job_utils.py
+import os
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from db_utils import db_connection
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Runs jobs queued in a database table in a bounded process pool.
+
+    The table is the queue: subclasses claim rows with FOR UPDATE SKIP LOCKED
+    so any number of web processes and standalone runners can share it.
+    Subclasses implement:
+
+    * ``claim(cur)`` - mark the next job as running and return it, or None
+    * ``task(job)`` - (function, args) to run in a worker process; the
+      function must be module level and must not touch the database
+    * ``complete(cur, job, result)`` / ``fail(cur, job, error)``
+    * ``attempts(job)`` - runs started so far, counting this one
+    * ``retry(cur, job, error)`` - put a job that raised back to pending
+
+    A job that raises is retried until it has run ``max_attempts`` times,
+    then failed. That includes jobs whose worker process died.
+    """
+
+    name = 'jobs'
+    max_attempts = 1
+
+    def __init__(self, workers, poll_interval):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._slots = threading.BoundedSemaphore(max(workers, 1))
+        self._wake = threading.Event()
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the dispatcher thread once per process; no-op when workers is 0."""
+        with self._lock:
+            if self.workers <= 0 or self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            threading.Thread(target=self._run, name=f'{self.name}-dispatcher', daemon=True).start()
+
+    def notify(self):
+        """Wake an idle dispatcher after a job has been committed."""
+        self._wake.set()
+
+    def wake(self):
+        self.start()
+        self.notify()
+
+    def _run(self):
+        while True:
+            self._slots.acquire()
+            try:
+                job = self._claim()
+            except Exception:
+                logger.exception("Error claiming %s job", self.name)
+                job = None
+            if job is None:
+                self._slots.release()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._submit(job)
+
+    def _claim(self):
+        with db_connection() as conn, conn.cursor() as cur:
+            return self.claim(cur)
+
+    def _submit(self, job):
+        fn, args = self.task(job)
+        try:
+            future = self._executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda f: self._finish(job, f))
+
+    def _finish(self, job, future):
+        try:
+            with db_connection() as conn, conn.cursor() as cur:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if self.attempts(job) < self.max_attempts:
+                        logger.warning("Error in %s job, retrying (attempt %d of %d): %s",
+                                       self.name, self.attempts(job), self.max_attempts, e, exc_info=e)
+                        self.retry(cur, job, str(e))
+                    else:
+                        logger.error("Error in %s job: %s", self.name, e, exc_info=e)
+                        self.fail(cur, job, str(e))
+                else:
+                    self.complete(cur, job, result)
+        except Exception:
+            logger.exception("Error saving %s result", self.name)
+        finally:
+            self._slots.release()
+
+    def claim(self, cur):
+        raise NotImplementedError
+
+    def task(self, job):
+        raise NotImplementedError
+
+    def complete(self, cur, job, result):
+        raise NotImplementedError
+
+    def fail(self, cur, job, error):
+        raise NotImplementedError
+
+    def attempts(self, job):
+        raise NotImplementedError
+
+    def retry(self, cur, job, error):
+        raise NotImplementedError
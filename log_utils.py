@@ -0,0 +1,249 @@
+# log_utils.py
+import os
+import sys
+import json
+import time
+import queue
+import random
+import atexit
+import logging
+import threading
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from dotenv import load_dotenv
+from flask import request, g
+
+# Load environment variables
+load_dotenv()
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# 'text' for humans, 'json' for log shippers
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+# Records waiting for the writer thread; beyond this they are dropped, not waited on
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# Share of high-volume debug events that are kept (see debug_sampled)
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '0.01'))
+# Whole request bodies in the debug log; may contain personal data
+LOG_DEBUG_PAYLOADS = os.getenv('LOG_DEBUG_PAYLOADS', 'false').lower() == 'true'
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_MAX_REQUEST_ID = 64
+
+# Id of the request being handled in this context; '-' outside requests
+_request_id = ContextVar('request_id', default='-')
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+logger = logging.getLogger(__name__)
+
+
+def _fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class TextFormatter(logging.Formatter):
+    """One line per record, ``extra`` fields appended as key=value."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value!r}' for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, ``extra`` fields as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': record.request_id,
+            'message': record.getMessage(),
+        }
+        entry.update(_fields(record))
+        # Rendered by the queue handler before the record was queued
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _RequestIdFilter(logging.Filter):
+    # Runs in the thread that logged, where the request's context is visible
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the writer thread; drops them when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Render the message and traceback now, while the arguments are
+        # still what the caller meant, but leave the layout to the writer
+        record = logging.makeLogRecord(vars(record))
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Writer(logging.StreamHandler):
+    """Writes on the listener thread, noting records the queue had to drop."""
+
+    def __init__(self, queue_handler):
+        super().__init__(sys.stdout)
+        self._queue_handler = queue_handler
+        self._reported = 0
+
+    def handle(self, record):
+        dropped = self._queue_handler.dropped
+        if dropped > self._reported:
+            super().handle(logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f'Log queue full, dropped {dropped - self._reported} records',
+                'request_id': '-',
+            }))
+            self._reported = dropped
+        return super().handle(record)
+
+
+_listener = None
+_configured_pid = None
+_configure_lock = threading.Lock()
+
+
+def _install():
+    global _listener, _configured_pid
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = _NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(_RequestIdFilter())
+
+    writer = _Writer(queue_handler)
+    writer.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else TextFormatter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, _NonBlockingQueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, writer, respect_handler_level=True)
+    _listener.start()
+    _configured_pid = os.getpid()
+
+
+def _after_fork():
+    # The writer thread does not survive fork(); worker processes get their own
+    if _configured_pid is not None:
+        _install()
+
+
+def configure_logging():
+    """Route all logging through a bounded queue and one writer thread.
+
+    Request threads only format the message and enqueue it, never block on
+    stdout. Call once at startup; later calls in the same process are
+    no-ops.
+    """
+    with _configure_lock:
+        if _configured_pid == os.getpid():
+            return
+        _install()
+
+
+def _stop_listener():
+    if _listener is not None and _configured_pid == os.getpid():
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+def bind_request_id(incoming=None):
+    """Make ``incoming`` (if usable) or a fresh id the current request's id.
+
+    Returns (request_id, token); pass the token to reset_request_id().
+    """
+    if incoming and len(incoming) <= _MAX_REQUEST_ID and incoming.isprintable():
+        request_id = incoming
+    else:
+        request_id = uuid.uuid4().hex
+    return request_id, _request_id.set(request_id)
+
+
+def reset_request_id(token):
+    try:
+        _request_id.reset(token)
+    except ValueError:
+        # Set in another context, e.g. by a server that switched threads
+        _request_id.set('-')
+
+
+def init_request_logging(app):
+    """Give every request handled by ``app`` an id, echoed in X-Request-ID."""
+
+    @app.before_request
+    def _bind_request_id():
+        g.request_id, g.request_id_token = bind_request_id(request.headers.get(REQUEST_ID_HEADER))
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _send_request_id(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+            debug_sampled(logger, '%s %s -> %s', request.method, request.path, response.status_code,
+                          extra={'duration_ms': round((time.perf_counter() - g.request_started) * 1000, 1)})
+        return response
+
+    @app.teardown_request
+    def _reset_request_id(exc):
+        token = g.pop('request_id_token', None)
+        if token is not None:
+            reset_request_id(token)
+
+
+def debug_sampled(log, msg, *args, rate=None, **kwargs):
+    """Log a high-volume DEBUG event for only a random share of calls.
+
+    Costs one level check when DEBUG is off. Kept records carry their
+    sample rate so counts can be scaled back up.
+    """
+    if not log.isEnabledFor(logging.DEBUG):
+        return
+    rate = LOG_SAMPLE_RATE if rate is None else rate
+    if rate < 1 and random.random() >= rate:
+        return
+    kwargs['extra'] = dict(kwargs.get('extra') or {}, sample_rate=rate)
+    log.debug(msg, *args, **kwargs)
+
+
+def debug_payload(log, label, payload):
+    """Dump a request body at DEBUG, only when LOG_DEBUG_PAYLOADS is set."""
+    if LOG_DEBUG_PAYLOADS and log.isEnabledFor(logging.DEBUG):
+        log.debug('%s: %s', label, payload)
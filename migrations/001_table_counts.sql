@@ -0,0 +1,64 @@
+-- 001_table_counts.sql
+-- Row counters for the admin dashboard header, kept exact by statement-level
+-- triggers so the dashboard never has to run COUNT(*) over large tables.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/001_table_counts.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.table_counts (
+    table_name character varying(63) PRIMARY KEY,
+    row_count bigint DEFAULT 0 NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION public.maintain_table_count() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+DECLARE
+    delta bigint;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT COUNT(*) INTO delta FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT -COUNT(*) INTO delta FROM old_rows;
+    ELSE
+        -- TRUNCATE
+        UPDATE public.table_counts SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+        RETURN NULL;
+    END IF;
+
+    IF delta <> 0 THEN
+        UPDATE public.table_counts
+        SET row_count = row_count + delta
+        WHERE table_name = TG_TABLE_NAME;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['users', 'recipes', 'base_ingredients', 'brands', 'additives', 'branded_ingredients']
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', t || '_count_insert', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', t || '_count_delete', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', t || '_count_truncate', t);
+
+        EXECUTE format('CREATE TRIGGER %I AFTER INSERT ON public.%I REFERENCING NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION public.maintain_table_count()', t || '_count_insert', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER DELETE ON public.%I REFERENCING OLD TABLE AS old_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION public.maintain_table_count()', t || '_count_delete', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER TRUNCATE ON public.%I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION public.maintain_table_count()', t || '_count_truncate', t);
+
+        -- Seed (or resync) the counter inside the same transaction as the triggers
+        EXECUTE format('LOCK TABLE public.%I IN SHARE MODE', t);
+        EXECUTE format('INSERT INTO public.table_counts (table_name, row_count) SELECT %L, COUNT(*) FROM public.%I '
+                       'ON CONFLICT (table_name) DO UPDATE SET row_count = EXCLUDED.row_count', t, t);
+    END LOOP;
+END;
+$$;
+
+COMMIT;
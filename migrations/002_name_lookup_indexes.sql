@@ -0,0 +1,8 @@
+-- 002_name_lookup_indexes.sql
+-- Case-insensitive name lookups used by the bulk ingredient resolver
+-- (recipe_utils.resolve_branded_ingredients) and the admin duplicate checks.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/002_name_lookup_indexes.sql
+
+CREATE INDEX IF NOT EXISTS idx_base_ingredients_lower_name ON public.base_ingredients USING btree (lower((name)::text));
+CREATE INDEX IF NOT EXISTS idx_brands_lower_name ON public.brands USING btree (lower((name)::text));
@@ -0,0 +1,13 @@
+-- 003_ingredient_trigram_search.sql
+-- Trigram indexes for the /api/ingredients typeahead. A btree index cannot
+-- serve ILIKE '%term%', so without these every keystroke scans the table.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/003_ingredient_trigram_search.sql
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
+
+CREATE INDEX IF NOT EXISTS idx_base_ingredients_name_trgm ON public.base_ingredients USING gin (name public.gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_base_ingredients_name_hindi_trgm ON public.base_ingredients USING gin (name_hindi public.gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_base_ingredients_name_gujarati_trgm ON public.base_ingredients USING gin (name_gujarati public.gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_base_ingredients_name_marathi_trgm ON public.base_ingredients USING gin (name_marathi public.gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_base_ingredients_name_tamil_trgm ON public.base_ingredients USING gin (name_tamil public.gin_trgm_ops);
@@ -0,0 +1,8 @@
+-- 004_recipes_user_keyset_index.sql
+-- Serves keyset pagination of GET /api/user/recipes:
+--   WHERE created_by_user_id = $1 AND (created_at, id) < ($2, $3)
+--   ORDER BY created_at DESC, id DESC
+--
+-- Apply with: psql -d recipe_keeper -f migrations/004_recipes_user_keyset_index.sql
+
+CREATE INDEX IF NOT EXISTS idx_recipes_user_created_at ON public.recipes USING btree (created_by_user_id, created_at DESC, id DESC);
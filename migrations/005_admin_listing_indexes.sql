@@ -0,0 +1,23 @@
+-- 005_admin_listing_indexes.sql
+-- Serves the paginated admin list pages and their type-ahead filters.
+--
+-- Keyset order of /admin/base-ingredients, /admin/branded-ingredients
+-- (brand name first) and /admin/recipes:
+--   WHERE (name, id) > ($1, $2) ORDER BY name, id
+--   WHERE (created_at, id) < ($1, $2) ORDER BY created_at DESC, id DESC
+-- /admin/additives pages on the existing unique index on code.
+--
+-- /admin/lookup/<kind> matches with ILIKE '%term%'; base_ingredients.name is
+-- already covered by migrations/003_ingredient_trigram_search.sql.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/005_admin_listing_indexes.sql
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
+
+CREATE INDEX IF NOT EXISTS idx_base_ingredients_name_id ON public.base_ingredients USING btree (name, id);
+CREATE INDEX IF NOT EXISTS idx_brands_name_id ON public.brands USING btree (name, id);
+CREATE INDEX IF NOT EXISTS idx_recipes_created_at_id ON public.recipes USING btree (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_brands_name_trgm ON public.brands USING gin (name public.gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_full_name_trgm ON public.users USING gin ((first_name || ' ' || last_name) public.gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON public.users USING gin (email public.gin_trgm_ops);
@@ -0,0 +1,20 @@
+-- 006_product_image_ocr_jobs.sql
+-- Job state for background text extraction (ocr_utils.py). product_images is
+-- the queue: workers claim the oldest pending row with FOR UPDATE SKIP LOCKED.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/006_product_image_ocr_jobs.sql
+
+ALTER TABLE public.product_images
+    ADD COLUMN IF NOT EXISTS ocr_status character varying(20),
+    ADD COLUMN IF NOT EXISTS ocr_error text,
+    ADD COLUMN IF NOT EXISTS ocr_attempts integer DEFAULT 0 NOT NULL,
+    ADD COLUMN IF NOT EXISTS ocr_queued_at timestamp with time zone,
+    ADD COLUMN IF NOT EXISTS ocr_started_at timestamp with time zone,
+    ADD COLUMN IF NOT EXISTS ocr_finished_at timestamp with time zone;
+
+-- Images whose text was extracted by the old synchronous route
+UPDATE public.product_images SET ocr_status = 'done' WHERE extracted_text IS NOT NULL AND ocr_status IS NULL;
+
+-- Only unfinished jobs are indexed, so the index stays tiny
+CREATE INDEX IF NOT EXISTS idx_product_images_ocr_queue ON public.product_images USING btree (ocr_queued_at)
+    WHERE ocr_status IN ('pending', 'processing');
@@ -0,0 +1,17 @@
+-- 007_blob_store.sql
+-- Reference counts for the content-addressed upload store (blob_utils.py).
+-- One row per distinct file content; the file lives at
+-- <BLOB_ROOT>/<sha256[0:2]>/<sha256[2:4]>/<sha256><extension> and is deleted
+-- when ref_count drops to zero. Files uploaded before this migration keep
+-- their old paths and are not counted.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/007_blob_store.sql
+
+CREATE TABLE IF NOT EXISTS public.blobs (
+    sha256 character(64) NOT NULL,
+    extension character varying(6) DEFAULT ''::character varying NOT NULL,
+    size_bytes bigint NOT NULL,
+    ref_count integer DEFAULT 0 NOT NULL,
+    created_at timestamp with time zone DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT blobs_pkey PRIMARY KEY (sha256)
+);
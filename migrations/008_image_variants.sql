@@ -0,0 +1,42 @@
+-- 008_image_variants.sql
+-- Resized WebP copies of uploaded images (image_utils.py). image_variant_jobs
+-- is the work queue, one row per original image URL; image_variants records
+-- what the worker produced so list and detail views can pick a size.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/008_image_variants.sql
+
+CREATE TABLE IF NOT EXISTS public.image_variant_jobs (
+    image_url text NOT NULL,
+    status character varying(20) DEFAULT 'pending'::character varying NOT NULL,
+    attempts integer DEFAULT 0 NOT NULL,
+    error text,
+    queued_at timestamp with time zone DEFAULT CURRENT_TIMESTAMP,
+    started_at timestamp with time zone,
+    finished_at timestamp with time zone,
+    CONSTRAINT image_variant_jobs_pkey PRIMARY KEY (image_url)
+);
+
+CREATE INDEX IF NOT EXISTS idx_image_variant_jobs_queue ON public.image_variant_jobs USING btree (queued_at)
+    WHERE status IN ('pending', 'processing');
+
+CREATE TABLE IF NOT EXISTS public.image_variants (
+    image_url text NOT NULL,
+    variant character varying(20) NOT NULL,
+    url text NOT NULL,
+    width integer NOT NULL,
+    height integer NOT NULL,
+    size_bytes bigint NOT NULL,
+    created_at timestamp with time zone DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT image_variants_pkey PRIMARY KEY (image_url, variant)
+);
+
+-- Queue images uploaded before this migration
+INSERT INTO public.image_variant_jobs (image_url)
+SELECT image_url FROM public.recipes WHERE image_url LIKE '/uploads/%' OR image_url LIKE '/static/%'
+UNION
+SELECT media_url FROM public.recipe_steps WHERE media_url LIKE '/uploads/%' OR media_url LIKE '/static/%'
+UNION
+SELECT image_url FROM public.product_images WHERE image_url LIKE '/static/%'
+UNION
+SELECT image_url FROM public.branded_ingredients WHERE image_url LIKE '/static/%'
+ON CONFLICT (image_url) DO NOTHING;
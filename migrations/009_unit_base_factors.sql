@@ -0,0 +1,43 @@
+-- 009_unit_base_factors.sql
+-- Conversion factors for recipe nutrition (nutrition_utils.py). base_factor
+-- is grams per unit for weights and millilitres per unit for volumes; it
+-- stays NULL for counts such as "piece", which are read as product servings.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/009_unit_base_factors.sql
+
+ALTER TABLE public.units ADD COLUMN IF NOT EXISTS base_factor numeric(12,4);
+
+-- Common units, added only where no unit with that short name exists yet
+INSERT INTO public.units (name, short_name, unit_type)
+SELECT v.name, v.short_name, v.unit_type
+FROM (VALUES
+    ('gram', 'g', 'weight'),
+    ('kilogram', 'kg', 'weight'),
+    ('milligram', 'mg', 'weight'),
+    ('ounce', 'oz', 'weight'),
+    ('pound', 'lb', 'weight'),
+    ('millilitre', 'ml', 'volume'),
+    ('litre', 'l', 'volume'),
+    ('teaspoon', 'tsp', 'volume'),
+    ('tablespoon', 'tbsp', 'volume'),
+    ('cup', 'cup', 'volume'),
+    ('piece', 'pc', 'count')
+) AS v(name, short_name, unit_type)
+WHERE NOT EXISTS (
+    SELECT 1 FROM public.units u WHERE lower(u.short_name) = v.short_name
+);
+
+UPDATE public.units
+SET base_factor = CASE lower(short_name)
+    WHEN 'g' THEN 1
+    WHEN 'kg' THEN 1000
+    WHEN 'mg' THEN 0.001
+    WHEN 'oz' THEN 28.3495
+    WHEN 'lb' THEN 453.5924
+    WHEN 'ml' THEN 1
+    WHEN 'l' THEN 1000
+    WHEN 'tsp' THEN 5
+    WHEN 'tbsp' THEN 15
+    WHEN 'cup' THEN 240
+END
+WHERE base_factor IS NULL;
@@ -0,0 +1,40 @@
+-- 010_recipe_nutrition.sql
+-- Precomputed nutrition per recipe (nutrition_utils.py), so reads are a
+-- primary-key lookup. recipe_nutrition_jobs is the change queue: a row is
+-- upserted whenever a recipe or one of its products' nutrients changes, and
+-- the background worker recomputes only those recipes.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/010_recipe_nutrition.sql
+
+CREATE TABLE IF NOT EXISTS public.recipe_nutrition (
+    recipe_id uuid NOT NULL,
+    nutrition jsonb NOT NULL,
+    source_queued_at timestamp with time zone NOT NULL,
+    computed_at timestamp with time zone DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    CONSTRAINT recipe_nutrition_pkey PRIMARY KEY (recipe_id),
+    CONSTRAINT recipe_nutrition_recipe_id_fkey FOREIGN KEY (recipe_id)
+        REFERENCES public.recipes(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS public.recipe_nutrition_jobs (
+    recipe_id uuid NOT NULL,
+    status character varying(20) DEFAULT 'pending'::character varying NOT NULL,
+    attempts integer DEFAULT 0 NOT NULL,
+    error text,
+    -- Also the job's version; clock_timestamp() so re-queues in one
+    -- transaction still move it forward
+    queued_at timestamp with time zone DEFAULT clock_timestamp() NOT NULL,
+    started_at timestamp with time zone,
+    finished_at timestamp with time zone,
+    CONSTRAINT recipe_nutrition_jobs_pkey PRIMARY KEY (recipe_id),
+    CONSTRAINT recipe_nutrition_jobs_recipe_id_fkey FOREIGN KEY (recipe_id)
+        REFERENCES public.recipes(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_recipe_nutrition_jobs_queue ON public.recipe_nutrition_jobs USING btree (queued_at)
+    WHERE status IN ('pending', 'processing');
+
+-- Queue every existing recipe once
+INSERT INTO public.recipe_nutrition_jobs (recipe_id)
+SELECT id FROM public.recipes
+ON CONFLICT (recipe_id) DO NOTHING;
@@ -0,0 +1,97 @@
+-- 011_recipe_search.sql
+-- Full-text search over recipes (search_utils.py). recipes.search_vector
+-- holds the title (weight A), ingredient names (B), description (C) and
+-- step text (D), kept current by triggers on recipes, recipe_ingredients
+-- and recipe_steps, and indexed with GIN.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/011_recipe_search.sql
+
+ALTER TABLE public.recipes ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION public.recipe_search_vector(p_recipe_id uuid, p_title text, p_description text)
+RETURNS tsvector LANGUAGE sql STABLE AS $$
+    SELECT setweight(to_tsvector('english', coalesce(p_title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce((
+               SELECT string_agg(i.name, ' ')
+               FROM public.recipe_ingredients ri
+               JOIN public.branded_ingredients bi ON ri.branded_ingredient_id = bi.id
+               JOIN public.base_ingredients i ON bi.base_ingredient_id = i.id
+               WHERE ri.recipe_id = p_recipe_id
+           ), '')), 'B')
+        || setweight(to_tsvector('english', coalesce(p_description, '')), 'C')
+        || setweight(to_tsvector('english', coalesce((
+               SELECT string_agg(s.description, ' ')
+               FROM public.recipe_steps s
+               WHERE s.recipe_id = p_recipe_id
+           ), '')), 'D')
+$$;
+
+-- Title or description changed
+CREATE OR REPLACE FUNCTION public.recipes_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := public.recipe_search_vector(NEW.id, NEW.title, NEW.description);
+    RETURN NEW;
+END
+$$;
+
+-- Ingredients or steps changed; statement level, so a bulk insert of a
+-- recipe's rows recomputes each recipe once
+CREATE OR REPLACE FUNCTION public.refresh_recipe_search_new_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE public.recipes r
+    SET search_vector = public.recipe_search_vector(r.id, r.title, r.description)
+    WHERE r.id IN (SELECT DISTINCT recipe_id FROM new_rows);
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION public.refresh_recipe_search_old_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE public.recipes r
+    SET search_vector = public.recipe_search_vector(r.id, r.title, r.description)
+    WHERE r.id IN (SELECT DISTINCT recipe_id FROM old_rows);
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS recipes_search_vector ON public.recipes;
+CREATE TRIGGER recipes_search_vector BEFORE INSERT OR UPDATE OF title, description ON public.recipes
+    FOR EACH ROW EXECUTE FUNCTION public.recipes_search_vector_trigger();
+
+-- Transition tables allow only one event per trigger
+DROP TRIGGER IF EXISTS recipe_ingredients_search_insert ON public.recipe_ingredients;
+CREATE TRIGGER recipe_ingredients_search_insert AFTER INSERT ON public.recipe_ingredients
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_recipe_search_new_rows();
+DROP TRIGGER IF EXISTS recipe_ingredients_search_update ON public.recipe_ingredients;
+CREATE TRIGGER recipe_ingredients_search_update AFTER UPDATE ON public.recipe_ingredients
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_recipe_search_new_rows();
+DROP TRIGGER IF EXISTS recipe_ingredients_search_delete ON public.recipe_ingredients;
+CREATE TRIGGER recipe_ingredients_search_delete AFTER DELETE ON public.recipe_ingredients
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_recipe_search_old_rows();
+
+DROP TRIGGER IF EXISTS recipe_steps_search_insert ON public.recipe_steps;
+CREATE TRIGGER recipe_steps_search_insert AFTER INSERT ON public.recipe_steps
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_recipe_search_new_rows();
+DROP TRIGGER IF EXISTS recipe_steps_search_update ON public.recipe_steps;
+CREATE TRIGGER recipe_steps_search_update AFTER UPDATE ON public.recipe_steps
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_recipe_search_new_rows();
+DROP TRIGGER IF EXISTS recipe_steps_search_delete ON public.recipe_steps;
+CREATE TRIGGER recipe_steps_search_delete AFTER DELETE ON public.recipe_steps
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_recipe_search_old_rows();
+
+-- Fill existing rows without touching updated_at
+ALTER TABLE public.recipes DISABLE TRIGGER update_recipes_modtime;
+UPDATE public.recipes SET search_vector = public.recipe_search_vector(id, title, description);
+ALTER TABLE public.recipes ENABLE TRIGGER update_recipes_modtime;
+
+CREATE INDEX IF NOT EXISTS idx_recipes_search_vector ON public.recipes USING gin (search_vector);
+
+-- Visibility checks: "is this recipe shared into a family I belong to"
+CREATE INDEX IF NOT EXISTS idx_family_members_user_active ON public.family_members USING btree (user_id, family_id)
+    WHERE is_active;
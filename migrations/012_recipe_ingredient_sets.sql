@@ -0,0 +1,77 @@
+-- 012_recipe_ingredient_sets.sql
+-- "What can I cook" matching (cookable_utils.py). Each recipe's distinct
+-- base ingredients are stored once as a sorted array, and a GIN index over
+-- the arrays serves as the inverted index from base ingredient to recipes.
+-- Queries need no joins through recipe_ingredients and branded_ingredients.
+-- Triggers keep the sets current whenever a recipe's ingredients are saved.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/012_recipe_ingredient_sets.sql
+
+CREATE TABLE IF NOT EXISTS public.recipe_ingredient_sets (
+    recipe_id uuid NOT NULL,
+    base_ingredient_ids uuid[] NOT NULL,
+    ingredient_count integer NOT NULL,
+    CONSTRAINT recipe_ingredient_sets_pkey PRIMARY KEY (recipe_id),
+    CONSTRAINT recipe_ingredient_sets_recipe_id_fkey FOREIGN KEY (recipe_id)
+        REFERENCES public.recipes(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_recipe_ingredient_sets_ids ON public.recipe_ingredient_sets USING gin (base_ingredient_ids);
+
+CREATE OR REPLACE FUNCTION public.refresh_recipe_ingredient_sets(p_recipe_ids uuid[]) RETURNS void LANGUAGE sql AS $$
+    DELETE FROM public.recipe_ingredient_sets WHERE recipe_id = ANY(p_recipe_ids);
+    INSERT INTO public.recipe_ingredient_sets (recipe_id, base_ingredient_ids, ingredient_count)
+    SELECT ri.recipe_id,
+           array_agg(DISTINCT bi.base_ingredient_id ORDER BY bi.base_ingredient_id),
+           count(DISTINCT bi.base_ingredient_id)
+    FROM public.recipe_ingredients ri
+    JOIN public.branded_ingredients bi ON ri.branded_ingredient_id = bi.id
+    JOIN public.recipes r ON r.id = ri.recipe_id
+    WHERE ri.recipe_id = ANY(p_recipe_ids)
+    GROUP BY ri.recipe_id;
+$$;
+
+CREATE OR REPLACE FUNCTION public.refresh_recipe_ingredient_sets_new_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.refresh_recipe_ingredient_sets(ARRAY(SELECT DISTINCT recipe_id FROM new_rows));
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION public.refresh_recipe_ingredient_sets_old_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.refresh_recipe_ingredient_sets(ARRAY(SELECT DISTINCT recipe_id FROM old_rows));
+    RETURN NULL;
+END
+$$;
+
+-- A product moved to another base ingredient changes every recipe using it
+CREATE OR REPLACE FUNCTION public.refresh_recipe_ingredient_sets_for_product() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.refresh_recipe_ingredient_sets(ARRAY(
+        SELECT DISTINCT recipe_id FROM public.recipe_ingredients WHERE branded_ingredient_id = NEW.id
+    ));
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS recipe_ingredients_sets_insert ON public.recipe_ingredients;
+CREATE TRIGGER recipe_ingredients_sets_insert AFTER INSERT ON public.recipe_ingredients
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_recipe_ingredient_sets_new_rows();
+DROP TRIGGER IF EXISTS recipe_ingredients_sets_update ON public.recipe_ingredients;
+CREATE TRIGGER recipe_ingredients_sets_update AFTER UPDATE ON public.recipe_ingredients
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_recipe_ingredient_sets_new_rows();
+DROP TRIGGER IF EXISTS recipe_ingredients_sets_delete ON public.recipe_ingredients;
+CREATE TRIGGER recipe_ingredients_sets_delete AFTER DELETE ON public.recipe_ingredients
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_recipe_ingredient_sets_old_rows();
+
+DROP TRIGGER IF EXISTS branded_ingredients_sets_update ON public.branded_ingredients;
+CREATE TRIGGER branded_ingredients_sets_update AFTER UPDATE OF base_ingredient_id ON public.branded_ingredients
+    FOR EACH ROW WHEN (OLD.base_ingredient_id IS DISTINCT FROM NEW.base_ingredient_id)
+    EXECUTE FUNCTION public.refresh_recipe_ingredient_sets_for_product();
+
+-- Existing recipes
+SELECT public.refresh_recipe_ingredient_sets(ARRAY(SELECT id FROM public.recipes));
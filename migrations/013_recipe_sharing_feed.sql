@@ -0,0 +1,15 @@
+-- 013_recipe_sharing_feed.sql
+-- Index for the "Shared with me" feed (sharing_utils.get_shared_feed). Each
+-- family's shares are read newest first straight from the index, with the
+-- sharer included so recipe_sharing rows need not be fetched. The feed still
+-- looks up each candidate's recipe to leave out the user's own recipes.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/013_recipe_sharing_feed.sql
+
+-- shared_at is the feed's sort key; rows inserted with an explicit NULL
+-- would otherwise sort ahead of everything
+UPDATE public.recipe_sharing SET shared_at = CURRENT_TIMESTAMP WHERE shared_at IS NULL;
+ALTER TABLE public.recipe_sharing ALTER COLUMN shared_at SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_recipe_sharing_family_feed ON public.recipe_sharing
+    USING btree (family_id, shared_at DESC, recipe_id DESC) INCLUDE (shared_by_user_id);
@@ -0,0 +1,38 @@
+-- 014_reference_data_notify.sql
+-- Cross-process invalidation for the reference-data cache (reference_utils.py).
+-- Any change to one of these tables sends its name on the reference_data
+-- channel when the transaction commits, whoever made it: the admin pages,
+-- a migration or psql.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/014_reference_data_notify.sql
+
+CREATE OR REPLACE FUNCTION public.notify_reference_data_change() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('reference_data', TG_TABLE_NAME);
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS cuisines_reference_notify ON public.cuisines;
+CREATE TRIGGER cuisines_reference_notify AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.cuisines
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_reference_data_change();
+
+DROP TRIGGER IF EXISTS units_reference_notify ON public.units;
+CREATE TRIGGER units_reference_notify AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.units
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_reference_data_change();
+
+DROP TRIGGER IF EXISTS nutrients_reference_notify ON public.nutrients;
+CREATE TRIGGER nutrients_reference_notify AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.nutrients
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_reference_data_change();
+
+DROP TRIGGER IF EXISTS nutrient_categories_reference_notify ON public.nutrient_categories;
+CREATE TRIGGER nutrient_categories_reference_notify AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.nutrient_categories
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_reference_data_change();
+
+DROP TRIGGER IF EXISTS additive_categories_reference_notify ON public.additive_categories;
+CREATE TRIGGER additive_categories_reference_notify AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.additive_categories
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_reference_data_change();
+
+DROP TRIGGER IF EXISTS tags_reference_notify ON public.tags;
+CREATE TRIGGER tags_reference_notify AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.tags
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_reference_data_change();
@@ -0,0 +1,189 @@
+-- 015_collection_versions.sql
+-- Validators for conditional GETs (http_cache_utils.py). collection_versions
+-- keeps one version number per cached collection: a user's recipe list,
+-- a user's families, the ingredient catalog. Triggers bump the number
+-- whenever a write changes what the collection's endpoint would return, so
+-- an If-None-Match check costs one primary-key lookup instead of the
+-- listing query. Global collections use the nil UUID as their owner.
+--
+-- Apply with: psql -d recipe_keeper -f migrations/015_collection_versions.sql
+
+CREATE SEQUENCE IF NOT EXISTS public.collection_version_seq;
+
+CREATE TABLE IF NOT EXISTS public.collection_versions (
+    scope character varying(30) NOT NULL,
+    owner_id uuid NOT NULL,
+    version bigint NOT NULL,
+    changed_at timestamp with time zone DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    CONSTRAINT collection_versions_pkey PRIMARY KEY (scope, owner_id)
+);
+
+-- Versions come from a sequence rather than version + 1, so a number is
+-- never reused, even for a collection whose row was deleted and recreated.
+-- Owners are locked in id order to keep concurrent bumps from deadlocking.
+CREATE OR REPLACE FUNCTION public.bump_collection_versions(p_scope text, p_owner_ids uuid[]) RETURNS void LANGUAGE sql AS $$
+    INSERT INTO public.collection_versions (scope, owner_id, version, changed_at)
+    SELECT p_scope, o.id, nextval('public.collection_version_seq'), CURRENT_TIMESTAMP
+    FROM (
+        SELECT DISTINCT id FROM unnest(p_owner_ids) AS u(id) WHERE id IS NOT NULL ORDER BY id
+    ) o
+    ON CONFLICT (scope, owner_id) DO UPDATE
+    SET version = EXCLUDED.version, changed_at = EXCLUDED.changed_at;
+$$;
+
+-- A user's recipe list (/api/user/recipes). Child-row changes reach it
+-- through the UPDATE of recipes made by the search triggers (migrations/011).
+CREATE OR REPLACE FUNCTION public.bump_user_recipes_new_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.bump_collection_versions('user_recipes', ARRAY(SELECT created_by_user_id FROM new_rows));
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION public.bump_user_recipes_old_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.bump_collection_versions('user_recipes', ARRAY(SELECT created_by_user_id FROM old_rows));
+    RETURN NULL;
+END
+$$;
+
+-- Both owners when a recipe changes hands
+CREATE OR REPLACE FUNCTION public.bump_user_recipes_changed_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.bump_collection_versions('user_recipes', ARRAY(
+        SELECT created_by_user_id FROM new_rows
+        UNION
+        SELECT created_by_user_id FROM old_rows
+    ));
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS recipes_collection_version_insert ON public.recipes;
+CREATE TRIGGER recipes_collection_version_insert AFTER INSERT ON public.recipes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_user_recipes_new_rows();
+DROP TRIGGER IF EXISTS recipes_collection_version_update ON public.recipes;
+CREATE TRIGGER recipes_collection_version_update AFTER UPDATE ON public.recipes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_user_recipes_changed_rows();
+DROP TRIGGER IF EXISTS recipes_collection_version_delete ON public.recipes;
+CREATE TRIGGER recipes_collection_version_delete AFTER DELETE ON public.recipes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_user_recipes_old_rows();
+
+-- New or removed image variants change the list's thumbnails
+CREATE INDEX IF NOT EXISTS idx_recipes_image_url ON public.recipes USING btree (image_url)
+    WHERE image_url IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION public.bump_user_recipes_for_variants_new_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.bump_collection_versions('user_recipes', ARRAY(
+        SELECT r.created_by_user_id FROM public.recipes r
+        WHERE r.image_url IN (SELECT image_url FROM new_rows)
+    ));
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION public.bump_user_recipes_for_variants_old_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.bump_collection_versions('user_recipes', ARRAY(
+        SELECT r.created_by_user_id FROM public.recipes r
+        WHERE r.image_url IN (SELECT image_url FROM old_rows)
+    ));
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS image_variants_collection_version_insert ON public.image_variants;
+CREATE TRIGGER image_variants_collection_version_insert AFTER INSERT ON public.image_variants
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_user_recipes_for_variants_new_rows();
+DROP TRIGGER IF EXISTS image_variants_collection_version_delete ON public.image_variants;
+CREATE TRIGGER image_variants_collection_version_delete AFTER DELETE ON public.image_variants
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_user_recipes_for_variants_old_rows();
+
+-- A user's families (/api/families): their memberships, and the families
+-- themselves for everyone in them
+CREATE OR REPLACE FUNCTION public.bump_user_families_new_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.bump_collection_versions('user_families', ARRAY(SELECT user_id FROM new_rows));
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION public.bump_user_families_old_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.bump_collection_versions('user_families', ARRAY(SELECT user_id FROM old_rows));
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION public.bump_user_families_changed_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.bump_collection_versions('user_families', ARRAY(
+        SELECT user_id FROM new_rows
+        UNION
+        SELECT user_id FROM old_rows
+    ));
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION public.bump_user_families_for_families() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.bump_collection_versions('user_families', ARRAY(
+        SELECT fm.user_id FROM public.family_members fm
+        WHERE fm.family_id IN (SELECT id FROM old_rows)
+    ));
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS family_members_collection_version_insert ON public.family_members;
+CREATE TRIGGER family_members_collection_version_insert AFTER INSERT ON public.family_members
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_user_families_new_rows();
+DROP TRIGGER IF EXISTS family_members_collection_version_update ON public.family_members;
+CREATE TRIGGER family_members_collection_version_update AFTER UPDATE ON public.family_members
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_user_families_changed_rows();
+DROP TRIGGER IF EXISTS family_members_collection_version_delete ON public.family_members;
+CREATE TRIGGER family_members_collection_version_delete AFTER DELETE ON public.family_members
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_user_families_old_rows();
+
+-- Deleted families take their members with them, which the delete
+-- trigger above already covers
+DROP TRIGGER IF EXISTS families_collection_version_update ON public.families;
+CREATE TRIGGER families_collection_version_update AFTER UPDATE ON public.families
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_user_families_for_families();
+
+-- Global collections: the ingredient catalog (/api/ingredients), and the
+-- names shown inside recipes, which only change on UPDATE or DELETE
+CREATE OR REPLACE FUNCTION public.bump_global_collection_version() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.bump_collection_versions(TG_ARGV[0], ARRAY['00000000-0000-0000-0000-000000000000'::uuid]);
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS base_ingredients_collection_version ON public.base_ingredients;
+CREATE TRIGGER base_ingredients_collection_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.base_ingredients
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_global_collection_version('ingredients');
+
+DROP TRIGGER IF EXISTS base_ingredients_catalog_names_version ON public.base_ingredients;
+CREATE TRIGGER base_ingredients_catalog_names_version AFTER UPDATE OR DELETE OR TRUNCATE ON public.base_ingredients
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_global_collection_version('catalog_names');
+DROP TRIGGER IF EXISTS brands_catalog_names_version ON public.brands;
+CREATE TRIGGER brands_catalog_names_version AFTER UPDATE OR DELETE OR TRUNCATE ON public.brands
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_global_collection_version('catalog_names');
+DROP TRIGGER IF EXISTS branded_ingredients_catalog_names_version ON public.branded_ingredients;
+CREATE TRIGGER branded_ingredients_catalog_names_version AFTER UPDATE OR DELETE OR TRUNCATE ON public.branded_ingredients
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_global_collection_version('catalog_names');
+DROP TRIGGER IF EXISTS cuisines_catalog_names_version ON public.cuisines;
+CREATE TRIGGER cuisines_catalog_names_version AFTER UPDATE OR DELETE OR TRUNCATE ON public.cuisines
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_global_collection_version('catalog_names');
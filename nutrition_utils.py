@@ -0,0 +1,377 @@
+# nutrition_utils.py
+import os
+import re
+import time
+import numpy as np
+from dotenv import load_dotenv
+from psycopg2.extras import Json
+
+from reference_utils import get_reference
+from job_utils import JobQueue
+
+# Load environment variables
+load_dotenv()
+
+# Refresh processes per web process; 0 leaves the queue to `python nutrition_utils.py`
+NUTRITION_WORKERS = int(os.getenv('NUTRITION_WORKERS', '1'))
+NUTRITION_POLL_SECONDS = float(os.getenv('NUTRITION_POLL_SECONDS', '5'))
+NUTRITION_JOB_TIMEOUT = int(os.getenv('NUTRITION_JOB_TIMEOUT', '120'))
+NUTRITION_MAX_ATTEMPTS = int(os.getenv('NUTRITION_MAX_ATTEMPTS', '3'))
+
+STATUS_PENDING = 'pending'
+STATUS_PROCESSING = 'processing'
+STATUS_FAILED = 'failed'
+
+# product_nutrients rows with per_serving = false are per 100 g/ml
+REFERENCE_AMOUNT = 100.0
+
+_UNICODE_FRACTIONS = {'½': ' 1/2', '⅓': ' 1/3', '⅔': ' 2/3', '¼': ' 1/4', '¾': ' 3/4', '⅛': ' 1/8'}
+# "2", "1.5", "1 1/2", "3/4", optionally followed by the unit ("200g", "2 cups")
+_QUANTITY = re.compile(r'^\s*(?:(\d+)/(\d+)|(\d+(?:\.\d+)?)(?:\s+(\d+)/(\d+))?)\s*(.*?)\s*$')
+
+
+def parse_quantity(text):
+    """Split a free-text quantity such as "1 1/2 cups" into (amount, unit text).
+
+    Returns (None, '') when no leading number can be read.
+    """
+    if not text:
+        return None, ''
+    for symbol, fraction in _UNICODE_FRACTIONS.items():
+        text = text.replace(symbol, fraction)
+    match = _QUANTITY.match(text)
+    if not match:
+        return None, ''
+    frac_num, frac_den, whole, num, den, unit = match.groups()
+    if whole is not None:
+        amount = float(whole)
+        if num and int(den):
+            amount += int(num) / int(den)
+    elif int(frac_den):
+        amount = int(frac_num) / int(frac_den)
+    else:
+        return None, ''
+    return amount, unit.lower().rstrip('.')
+
+
+def _load_units(cur):
+    # Unit -> grams/ml per unit, or None for counts ("piece", "pinch")
+    units = {'by_id': {}, 'by_name': {}}
+    for row in get_reference(cur, 'units'):
+        factor = float(row['base_factor']) if row['base_factor'] is not None else None
+        units['by_id'][str(row['id'])] = factor
+        for name in (row['short_name'], row['name']):
+            if name:
+                units['by_name'][name.lower()] = factor
+    return units
+
+
+_UNKNOWN = object()
+
+
+def _lookup_unit(units, text):
+    """base_factor for a unit name, None for counts, _UNKNOWN if not a unit."""
+    by_name = units['by_name']
+    # Accept simple plurals: "cups", "tbsps"
+    for name in (text, text.rstrip('s')):
+        if name and name in by_name:
+            return by_name[name]
+    return _UNKNOWN
+
+
+def load_nutrition_inputs(cur, recipe_id):
+    """Everything calculate_nutrition() needs for a recipe, as plain data.
+
+    Returns None if the recipe does not exist.
+    """
+    cur.execute('SELECT servings FROM recipes WHERE id = %s', (str(recipe_id),))
+    recipe = cur.fetchone()
+    if not recipe:
+        return None
+
+    cur.execute('''
+        SELECT ri.branded_ingredient_id, ri.quantity, ri.unit_id,
+               i.name AS ingredient_name, si.serving_size, si.serving_unit
+        FROM recipe_ingredients ri
+        JOIN branded_ingredients bi ON ri.branded_ingredient_id = bi.id
+        JOIN base_ingredients i ON bi.base_ingredient_id = i.id
+        LEFT JOIN LATERAL (
+            SELECT serving_size, serving_unit FROM serving_info
+            WHERE branded_ingredient_id = ri.branded_ingredient_id
+            LIMIT 1
+        ) si ON true
+        WHERE ri.recipe_id = %s
+        ORDER BY ri.display_order
+    ''', (str(recipe_id),))
+    ingredients = cur.fetchall()
+
+    product_ids = sorted({str(row['branded_ingredient_id']) for row in ingredients})
+    cur.execute('''
+        SELECT pn.branded_ingredient_id, pn.nutrient_id, pn.amount, pn.per_serving,
+               n.name, n.unit, n.daily_value, n.display_order
+        FROM product_nutrients pn
+        JOIN nutrients n ON pn.nutrient_id = n.id
+        WHERE pn.branded_ingredient_id = ANY(%s::uuid[])
+    ''', (product_ids,))
+    nutrient_rows = cur.fetchall()
+
+    return {
+        "recipe_id": str(recipe_id),
+        "servings": recipe['servings'],
+        "ingredients": [dict(row) for row in ingredients],
+        "nutrient_rows": [dict(row) for row in nutrient_rows],
+        "units": _load_units(cur),
+    }
+
+
+def calculate_nutrition(inputs):
+    """Total and per-serving nutrients for one recipe.
+
+    Every ingredient is reduced to an amount in grams/ml and in product
+    servings (converted through serving_info where needed), and the
+    products' nutrient rows are laid out as two matrices, per 100 g/ml and
+    per serving. The totals are then two matrix-vector products, however
+    many ingredients and nutrients the recipe has.
+
+    Pure computation, so it can run in a worker process.
+    """
+    if inputs is None:
+        return None
+    ingredients = inputs['ingredients']
+    nutrient_rows = inputs['nutrient_rows']
+    product_ids = sorted({str(row['branded_ingredient_id']) for row in ingredients})
+
+    # Column per nutrient, in display order
+    meta = {}
+    for row in nutrient_rows:
+        meta.setdefault(str(row['nutrient_id']), row)
+    nutrient_ids = sorted(meta, key=lambda n: (meta[n]['display_order'], meta[n]['name']))
+    column = {nutrient_id: j for j, nutrient_id in enumerate(nutrient_ids)}
+    product_row = {product_id: p for p, product_id in enumerate(product_ids)}
+
+    # Product x nutrient amounts, split by measurement basis
+    per_reference = np.zeros((len(product_ids), len(nutrient_ids)))
+    per_serving = np.zeros((len(product_ids), len(nutrient_ids)))
+    for row in nutrient_rows:
+        target = per_serving if row['per_serving'] else per_reference
+        target[product_row[str(row['branded_ingredient_id'])], column[str(row['nutrient_id'])]] = float(row['amount'])
+
+    # Each ingredient's quantity in grams/ml and in servings of its product
+    units = inputs['units']
+    grams = np.full(len(ingredients), np.nan)
+    servings = np.full(len(ingredients), np.nan)
+    for i, row in enumerate(ingredients):
+        amount, unit_text = parse_quantity(row['quantity'])
+        if amount is None:
+            continue
+        if row['unit_id']:
+            factor = units['by_id'].get(str(row['unit_id']), _UNKNOWN)
+        else:
+            factor = _lookup_unit(units, unit_text) if unit_text else None
+        serving_base = None
+        if row['serving_size'] is not None:
+            serving_factor = _lookup_unit(units, (row['serving_unit'] or '').strip().lower())
+            if serving_factor not in (None, _UNKNOWN):
+                serving_base = float(row['serving_size']) * serving_factor
+
+        if factor is _UNKNOWN:
+            continue
+        if factor is not None:
+            # Weights and volumes; ml are taken as grams, as the labels do
+            grams[i] = amount * factor
+            if serving_base:
+                servings[i] = grams[i] / serving_base
+        else:
+            # "2" or "2 pieces" of a product means two of its servings
+            servings[i] = amount
+            if serving_base:
+                grams[i] = amount * serving_base
+
+    rows = np.array([product_row[str(row['branded_ingredient_id'])] for row in ingredients], dtype=int)
+    reference_matrix = per_reference[rows]
+    serving_matrix = per_serving[rows]
+
+    totals = (np.nan_to_num(grams) / REFERENCE_AMOUNT) @ reference_matrix + np.nan_to_num(servings) @ serving_matrix
+
+    # Ingredients whose amounts could not be converted to what their data needs
+    needs_grams = reference_matrix.any(axis=1)
+    needs_servings = serving_matrix.any(axis=1)
+    has_data = needs_grams | needs_servings
+    unconverted = (needs_grams & np.isnan(grams)) | (needs_servings & np.isnan(servings))
+    unresolved = [
+        {
+            "name": row['ingredient_name'],
+            "quantity": row['quantity'],
+            "reason": "no nutrition data" if not has_data[i] else "quantity could not be converted",
+        }
+        for i, row in enumerate(ingredients)
+        if unconverted[i] or not has_data[i]
+    ]
+
+    recipe_servings = inputs['servings'] or 1
+    nutrients = []
+    for nutrient_id, total in zip(nutrient_ids, totals):
+        row = meta[nutrient_id]
+        per_recipe_serving = total / recipe_servings
+        nutrients.append({
+            "id": nutrient_id,
+            "name": row['name'],
+            "unit": row['unit'],
+            "total": round(float(total), 2),
+            "per_serving": round(float(per_recipe_serving), 2),
+            "percent_daily_value": round(float(per_recipe_serving / float(row['daily_value']) * 100), 1)
+            if row['daily_value'] else None,
+        })
+
+    return {
+        "recipe_id": inputs['recipe_id'],
+        "servings": recipe_servings,
+        "nutrients": nutrients,
+        "unresolved": unresolved,
+    }
+
+
+def compute_recipe_nutrition(cur, recipe_id):
+    """Nutrition for a recipe computed now, or None if it does not exist."""
+    inputs = load_nutrition_inputs(cur, recipe_id)
+    return calculate_nutrition(inputs) if inputs is not None else None
+
+
+def enqueue_recipe_nutrition(cur, *recipe_ids):
+    """Queue a refresh of recipe_nutrition in the caller's transaction."""
+    ids = sorted({str(recipe_id) for recipe_id in recipe_ids if recipe_id})
+    if not ids:
+        return
+    cur.execute('''
+        INSERT INTO recipe_nutrition_jobs (recipe_id)
+        SELECT unnest(%s::uuid[])
+        ON CONFLICT (recipe_id) DO UPDATE
+        SET status = %s, attempts = 0, error = NULL, queued_at = clock_timestamp()
+    ''', (ids, STATUS_PENDING))
+
+
+def enqueue_product_nutrition(cur, branded_ingredient_id):
+    """Queue a refresh for every recipe that uses a product."""
+    cur.execute('''
+        INSERT INTO recipe_nutrition_jobs (recipe_id)
+        SELECT DISTINCT recipe_id FROM recipe_ingredients
+        WHERE branded_ingredient_id = %s
+        ON CONFLICT (recipe_id) DO UPDATE
+        SET status = %s, attempts = 0, error = NULL, queued_at = clock_timestamp()
+    ''', (str(branded_ingredient_id), STATUS_PENDING))
+
+
+def get_recipe_nutrition(cur, recipe_id):
+    """The stored nutrition document for a recipe, or None if not computed yet.
+
+    One primary-key lookup; the document is refreshed in the background
+    whenever the recipe or one of its products changes.
+    """
+    cur.execute('''
+        SELECT n.nutrition, n.computed_at, j.status AS refresh_status
+        FROM recipe_nutrition n
+        LEFT JOIN recipe_nutrition_jobs j ON j.recipe_id = n.recipe_id
+        WHERE n.recipe_id = %s
+    ''', (str(recipe_id),))
+    return cur.fetchone()
+
+
+class NutritionQueue(JobQueue):
+    """Refreshes of recipe_nutrition, queued in recipe_nutrition_jobs.
+
+    A job's queued_at is its version: a recipe changed again while its job
+    runs is re-queued with a later queued_at, and results computed from
+    older data never overwrite newer ones.
+    """
+
+    name = 'nutrition'
+    max_attempts = NUTRITION_MAX_ATTEMPTS
+
+    def __init__(self, workers=NUTRITION_WORKERS, poll_interval=NUTRITION_POLL_SECONDS):
+        super().__init__(workers, poll_interval)
+
+    def claim(self, cur):
+        cur.execute('''
+            UPDATE recipe_nutrition_jobs
+            SET status = %(processing)s, started_at = now(), attempts = attempts + 1
+            WHERE recipe_id = (
+                SELECT recipe_id FROM recipe_nutrition_jobs
+                WHERE status = %(pending)s
+                   OR (status = %(processing)s
+                       AND started_at < now() - make_interval(secs => %(timeout)s))
+                ORDER BY queued_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING recipe_id, queued_at, attempts
+        ''', {'processing': STATUS_PROCESSING, 'pending': STATUS_PENDING, 'timeout': NUTRITION_JOB_TIMEOUT})
+        job = cur.fetchone()
+        if job and job['attempts'] > NUTRITION_MAX_ATTEMPTS:
+            self.fail(cur, job, f"Gave up after {NUTRITION_MAX_ATTEMPTS} attempts")
+            return None
+        if job:
+            # Read in the dispatcher; the worker only does the arithmetic
+            job['inputs'] = load_nutrition_inputs(cur, job['recipe_id'])
+        return job
+
+    def task(self, job):
+        return calculate_nutrition, (job['inputs'],)
+
+    def complete(self, cur, job, nutrition):
+        if nutrition is not None:
+            self._store(cur, job, nutrition)
+        # Keep the job if the recipe was re-queued while this one ran
+        cur.execute('''
+            DELETE FROM recipe_nutrition_jobs
+            WHERE recipe_id = %s AND queued_at = %s
+        ''', (str(job['recipe_id']), job['queued_at']))
+
+    def fail(self, cur, job, error):
+        self._record(cur, job, STATUS_FAILED, error)
+
+    def attempts(self, job):
+        return job['attempts']
+
+    def retry(self, cur, job, error):
+        self._record(cur, job, STATUS_PENDING, error)
+
+    @staticmethod
+    def _record(cur, job, status, error):
+        cur.execute('''
+            UPDATE recipe_nutrition_jobs
+            SET status = %s, error = %s, finished_at = now()
+            WHERE recipe_id = %s AND queued_at = %s
+        ''', (status, error, str(job['recipe_id']), job['queued_at']))
+
+    @staticmethod
+    def _store(cur, job, nutrition):
+        cur.execute('''
+            INSERT INTO recipe_nutrition (recipe_id, nutrition, source_queued_at, computed_at)
+            VALUES (%s, %s, %s, now())
+            ON CONFLICT (recipe_id) DO UPDATE
+            SET nutrition = EXCLUDED.nutrition, source_queued_at = EXCLUDED.source_queued_at,
+                computed_at = EXCLUDED.computed_at
+            WHERE recipe_nutrition.source_queued_at <= EXCLUDED.source_queued_at
+        ''', (str(job['recipe_id']), Json(nutrition), job['queued_at']))
+
+
+_queue = NutritionQueue()
+
+
+def get_nutrition_queue():
+    return _queue
+
+
+def wake_nutrition_queue():
+    """Make sure this process is dispatching and tell it new work is waiting."""
+    _queue.wake()
+
+
+if __name__ == '__main__':
+    # Standalone runner for deployments that set NUTRITION_WORKERS=0 on the web tier
+    from log_utils import configure_logging
+    configure_logging()
+    runner = NutritionQueue(workers=int(os.getenv('NUTRITION_RUNNER_WORKERS', str(os.cpu_count() or 1))))
+    runner.start()
+    while True:
+        time.sleep(3600)
@@ -0,0 +1,156 @@
+# ocr_utils.py
+import os
+import time
+from dotenv import load_dotenv
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:  # OCR is optional; jobs fail with a clear error instead
+    pytesseract = None
+    Image = None
+
+from job_utils import JobQueue
+
+# Load environment variables
+load_dotenv()
+
+# OCR processes per web process; 0 leaves the queue to `python ocr_utils.py`
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', '2'))
+# Path to the tesseract binary when it is not on PATH
+TESSERACT_CMD = os.getenv('TESSERACT_CMD')
+# How often an idle dispatcher looks for jobs queued by other processes
+OCR_POLL_SECONDS = float(os.getenv('OCR_POLL_SECONDS', '5'))
+# A job still processing after this long is assumed lost with its worker
+OCR_JOB_TIMEOUT = int(os.getenv('OCR_JOB_TIMEOUT', '300'))
+OCR_MAX_ATTEMPTS = int(os.getenv('OCR_MAX_ATTEMPTS', '3'))
+
+STATUS_PENDING = 'pending'
+STATUS_PROCESSING = 'processing'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def resolve_image_path(image_url):
+    """Find a stored image on disk from its /static/... URL."""
+    candidates = [
+        image_url.lstrip('/'),
+        os.path.join('static', image_url.lstrip('/')),
+    ]
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f'Image file not found on disk. Tried paths: {candidates}')
+
+
+def _extract_text(image_url):
+    # Runs in a worker process, so it must not touch the database
+    if pytesseract is None:
+        raise RuntimeError('pytesseract is not installed')
+    if TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    with Image.open(resolve_image_path(image_url)) as image:
+        return pytesseract.image_to_string(image)
+
+
+def enqueue_ocr(cur, image_id):
+    """Queue text extraction for an image as part of the caller's transaction."""
+    cur.execute('''
+        UPDATE product_images
+        SET ocr_status = %s, ocr_error = NULL, ocr_attempts = 0,
+            ocr_queued_at = now(), ocr_started_at = NULL, ocr_finished_at = NULL
+        WHERE id = %s
+    ''', (STATUS_PENDING, str(image_id)))
+
+
+def get_ocr_status(cur, image_id):
+    """Job state for the admin page to poll, or None if the image is gone."""
+    cur.execute('''
+        SELECT p.ocr_status AS status, p.ocr_error AS error, p.extracted_text,
+               CASE WHEN p.ocr_status = %s THEN (
+                   SELECT count(*) FROM product_images q
+                   WHERE q.ocr_status = %s AND q.ocr_queued_at < p.ocr_queued_at
+               ) END AS jobs_ahead
+        FROM product_images p
+        WHERE p.id = %s
+    ''', (STATUS_PENDING, STATUS_PENDING, str(image_id)))
+    return cur.fetchone()
+
+
+class OCRQueue(JobQueue):
+    """Text extraction jobs, queued on product_images.ocr_status."""
+
+    name = 'ocr'
+    max_attempts = OCR_MAX_ATTEMPTS
+
+    def __init__(self, workers=OCR_WORKERS, poll_interval=OCR_POLL_SECONDS):
+        super().__init__(workers, poll_interval)
+
+    def claim(self, cur):
+        # Oldest pending job, or one whose worker vanished mid-run
+        cur.execute('''
+            UPDATE product_images
+            SET ocr_status = %(processing)s, ocr_started_at = now(), ocr_attempts = ocr_attempts + 1
+            WHERE id = (
+                SELECT id FROM product_images
+                WHERE ocr_status = %(pending)s
+                   OR (ocr_status = %(processing)s
+                       AND ocr_started_at < now() - make_interval(secs => %(timeout)s))
+                ORDER BY ocr_queued_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, image_url, ocr_attempts
+        ''', {'processing': STATUS_PROCESSING, 'pending': STATUS_PENDING, 'timeout': OCR_JOB_TIMEOUT})
+        job = cur.fetchone()
+        if job and job['ocr_attempts'] > OCR_MAX_ATTEMPTS:
+            self.fail(cur, job, f"Gave up after {OCR_MAX_ATTEMPTS} attempts")
+            return None
+        return job
+
+    def task(self, job):
+        return _extract_text, (job['image_url'],)
+
+    def complete(self, cur, job, text):
+        self._record(cur, job['id'], STATUS_DONE, text=text)
+
+    def fail(self, cur, job, error):
+        self._record(cur, job['id'], STATUS_FAILED, error=error)
+
+    def attempts(self, job):
+        return job['ocr_attempts']
+
+    def retry(self, cur, job, error):
+        self._record(cur, job['id'], STATUS_PENDING, error=error)
+
+    @staticmethod
+    def _record(cur, image_id, status, text=None, error=None):
+        # Ignore results for jobs that were re-queued while running
+        cur.execute('''
+            UPDATE product_images
+            SET ocr_status = %s, extracted_text = COALESCE(%s, extracted_text),
+                ocr_error = %s, ocr_finished_at = now()
+            WHERE id = %s AND ocr_status = %s
+        ''', (status, text, error, str(image_id), STATUS_PROCESSING))
+
+
+_queue = OCRQueue()
+
+
+def get_ocr_queue():
+    return _queue
+
+
+def wake_ocr_queue():
+    """Make sure this process is dispatching and tell it new work is waiting."""
+    _queue.wake()
+
+
+if __name__ == '__main__':
+    # Standalone runner for deployments that set OCR_WORKERS=0 on the web tier
+    from log_utils import configure_logging
+    configure_logging()
+    runner = OCRQueue(workers=int(os.getenv('OCR_RUNNER_WORKERS', str(os.cpu_count() or 1))))
+    runner.start()
+    while True:
+        time.sleep(3600)
@@ -0,0 +1,41 @@
+# pagination_utils.py
+import json
+import base64
+import binascii
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue."""
+
+
+def encode_cursor(*values):
+    """Pack the sort key of the last row on a page into an opaque token."""
+    payload = [value.isoformat() if isinstance(value, datetime) else str(value) for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Unpack a token from encode_cursor() into a list of ``size`` strings."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error):
+        raise InvalidCursor('Malformed cursor')
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, str) for v in values):
+        raise InvalidCursor('Malformed cursor')
+    return values
+
+
+def parse_limit(value, default, maximum):
+    """Page size from a query parameter, clamped to 1..maximum."""
+    try:
+        limit = int(value) if value is not None else default
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def like_escape(term):
+    """Escape LIKE/ILIKE wildcards so user input matches literally."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
@@ -0,0 +1,435 @@
+# recipe_utils.py
+from psycopg2.extras import execute_values
+
+GENERIC_BRAND = 'Generic'
+
+# WHERE clause fragment for the recipes a user may see: their own, public
+# ones, and those shared into a family they are an active member of. Needs
+# recipes aliased as r and a %(user_id)s parameter (None for anonymous).
+VISIBLE_RECIPE_SQL = '''(
+    r.is_private = false
+    OR r.created_by_user_id = %(user_id)s::uuid
+    OR EXISTS (
+        SELECT 1 FROM recipe_sharing rs
+        JOIN family_members fm ON fm.family_id = rs.family_id
+        WHERE rs.recipe_id = r.id AND fm.user_id = %(user_id)s::uuid AND fm.is_active
+    )
+)'''
+
+# GET /api/recipes/<id> as ready-made JSON text, built entirely in
+# PostgreSQL; shared by the Flask and async API tiers. One %s: the recipe id.
+RECIPE_DOCUMENT_SQL = '''
+    SELECT json_build_object(
+        'id', r.id,
+        'title', r.title,
+        'description', r.description,
+        'servings', r.servings,
+        'prep_time_minutes', r.prep_time_minutes,
+        'cook_time_minutes', r.cook_time_minutes,
+        'is_private', r.is_private,
+        'cuisine', c.name,
+        'image_url', r.image_url,
+        'image_variants', (
+            SELECT json_object_agg(v.variant, v.url)
+            FROM image_variants v
+            WHERE v.image_url = r.image_url
+        ),
+        'created_at', r.created_at,
+        'updated_at', r.updated_at,
+        'nutrition', (
+            SELECT n.nutrition FROM recipe_nutrition n WHERE n.recipe_id = r.id
+        ),
+        'ingredients', COALESCE((
+            SELECT json_agg(json_build_object(
+                'id', bi.id,
+                'name', i.name,
+                'quantity', ri.quantity,
+                'brand', b.name
+            ) ORDER BY ri.display_order)
+            FROM recipe_ingredients ri
+            JOIN branded_ingredients bi ON ri.branded_ingredient_id = bi.id
+            JOIN base_ingredients i ON bi.base_ingredient_id = i.id
+            LEFT JOIN brands b ON bi.brand_id = b.id
+            WHERE ri.recipe_id = r.id
+        ), '[]'::json),
+        'steps', COALESCE((
+            SELECT json_agg(json_build_object(
+                'step_number', s.step_number,
+                'description', s.description,
+                'media_url', s.media_url,
+                'media_variants', (
+                    SELECT json_object_agg(v.variant, v.url)
+                    FROM image_variants v
+                    WHERE v.image_url = s.media_url
+                ),
+                'media_type', s.media_type
+            ) ORDER BY s.step_number)
+            FROM recipe_steps s
+            WHERE s.recipe_id = r.id
+        ), '[]'::json)
+    )::text AS document
+    FROM recipes r
+    LEFT JOIN cuisines c ON r.cuisine_id = c.id
+    WHERE r.id = %s
+'''
+
+
+def _get_or_create_named(cur, table, names, verified, user_id):
+    """Map each name to an id, inserting the rows that don't exist yet.
+
+    One statement regardless of how many names are passed. Matching is
+    case-insensitive, like the ILIKE lookups it replaces, and done entirely
+    in PostgreSQL so results are keyed by the name exactly as submitted.
+    """
+    if not names:
+        return {}
+
+    cur.execute(f'''
+        WITH submitted AS (
+            SELECT n.name, n.is_verified
+            FROM unnest(%s::text[], %s::boolean[]) AS n(name, is_verified)
+        ),
+        input AS (
+            SELECT DISTINCT ON (lower(name)) name, is_verified
+            FROM submitted
+            ORDER BY lower(name)
+        ),
+        existing AS (
+            SELECT DISTINCT ON (lower(t.name)) t.id, lower(t.name) AS key
+            FROM {table} t
+            JOIN input i ON lower(t.name) = lower(i.name)
+            ORDER BY lower(t.name), t.created_at
+        ),
+        inserted AS (
+            INSERT INTO {table} (name, is_verified, added_by_user_id)
+            SELECT i.name, i.is_verified, %s::uuid
+            FROM input i
+            WHERE lower(i.name) NOT IN (SELECT key FROM existing)
+            ON CONFLICT DO NOTHING
+            RETURNING id, lower(name) AS key
+        )
+        SELECT DISTINCT s.name, COALESCE(e.id, ins.id) AS id
+        FROM submitted s
+        LEFT JOIN existing e ON e.key = lower(s.name)
+        LEFT JOIN inserted ins ON ins.key = lower(s.name)
+    ''', (list(names), list(verified), user_id))
+    ids = {row['name']: row['id'] for row in cur.fetchall()}
+
+    missing = [name for name, id in ids.items() if id is None]
+    if missing:
+        # Lost an insert race to a concurrent request; the row exists now
+        cur.execute(f'''
+            SELECT DISTINCT ON (m.name) m.name, t.id
+            FROM unnest(%s::text[]) AS m(name)
+            JOIN {table} t ON lower(t.name) = lower(m.name)
+            ORDER BY m.name, t.created_at
+        ''', (missing,))
+        ids.update({row['name']: row['id'] for row in cur.fetchall()})
+    return ids
+
+
+def _get_or_create_branded(cur, pairs, user_id):
+    """Map (base_ingredient_id, brand_id) -> branded_ingredients.id in one statement."""
+    if not pairs:
+        return {}
+
+    base_ids = [base_id for base_id, _ in pairs]
+    brand_ids = [brand_id for _, brand_id in pairs]
+    cur.execute('''
+        WITH input AS (
+            SELECT DISTINCT p.base_ingredient_id, p.brand_id
+            FROM unnest(%s::uuid[], %s::uuid[]) AS p(base_ingredient_id, brand_id)
+        ),
+        inserted AS (
+            INSERT INTO branded_ingredients (base_ingredient_id, brand_id, is_verified, added_by_user_id)
+            SELECT i.base_ingredient_id, i.brand_id, false, %s::uuid
+            FROM input i
+            ON CONFLICT (base_ingredient_id, brand_id) DO NOTHING
+            RETURNING id, base_ingredient_id, brand_id
+        )
+        SELECT id, base_ingredient_id, brand_id FROM inserted
+        UNION ALL
+        SELECT bi.id, bi.base_ingredient_id, bi.brand_id
+        FROM branded_ingredients bi
+        JOIN input i ON bi.base_ingredient_id = i.base_ingredient_id AND bi.brand_id = i.brand_id
+    ''', (base_ids, brand_ids, user_id))
+    # The final SELECT cannot see rows inserted by the same statement, so each
+    # pair comes back exactly once: from "inserted" if new, else from the join
+    ids = {(str(row['base_ingredient_id']), str(row['brand_id'])): row['id'] for row in cur.fetchall()}
+
+    missing = [pair for pair in pairs if pair not in ids]
+    if missing:
+        # Conflicted with a row committed after our snapshot was taken
+        cur.execute('''
+            SELECT bi.id, bi.base_ingredient_id, bi.brand_id
+            FROM branded_ingredients bi
+            JOIN unnest(%s::uuid[], %s::uuid[]) AS p(base_ingredient_id, brand_id)
+                ON bi.base_ingredient_id = p.base_ingredient_id AND bi.brand_id = p.brand_id
+        ''', ([base_id for base_id, _ in missing], [brand_id for _, brand_id in missing]))
+        ids.update({(str(row['base_ingredient_id']), str(row['brand_id'])): row['id'] for row in cur.fetchall()})
+    return ids
+
+
+def resolve_branded_ingredients(cur, ingredients, user_id):
+    """Return the branded_ingredients id for each submitted ingredient, in order.
+
+    Base ingredients, brands and branded ingredients that don't exist yet are
+    created; ingredients without a brand use the "Generic" brand. Costs three
+    statements however many ingredients there are.
+    """
+    if not ingredients:
+        return []
+
+    names = [ingredient.get('name') for ingredient in ingredients]
+    if not all(names):
+        raise ValueError('Every ingredient needs a name')
+    base_ids = _get_or_create_named(cur, 'base_ingredients', names, [False] * len(names), user_id)
+
+    brand_names = [ingredient.get('brand') or GENERIC_BRAND for ingredient in ingredients]
+    brand_verified = [not ingredient.get('brand') for ingredient in ingredients]
+    brand_ids = _get_or_create_named(cur, 'brands', brand_names, brand_verified, user_id)
+
+    pairs = [
+        (str(base_ids[name]), str(brand_ids[brand]))
+        for name, brand in zip(names, brand_names)
+    ]
+    branded_ids = _get_or_create_branded(cur, pairs, user_id)
+    return [branded_ids[pair] for pair in pairs]
+
+
+def insert_recipe_ingredients(cur, recipe_id, ingredients, user_id):
+    """Resolve and bulk-insert a recipe's ingredients, keeping submission order."""
+    branded_ids = resolve_branded_ingredients(cur, ingredients, user_id)
+    if not branded_ids:
+        return
+
+    rows = [
+        (recipe_id, branded_ingredient_id, ingredient.get('quantity', ''), idx)
+        for idx, (ingredient, branded_ingredient_id) in enumerate(zip(ingredients, branded_ids))
+    ]
+    execute_values(cur, '''
+        INSERT INTO recipe_ingredients (recipe_id, branded_ingredient_id, quantity, display_order)
+        VALUES %s
+    ''', rows, template='(%s::uuid, %s::uuid, %s, %s)', page_size=len(rows))
+
+
+def insert_recipe_steps(cur, recipe_id, steps):
+    """Bulk-insert a recipe's steps, numbered from 1 in submission order."""
+    if not steps:
+        return
+
+    rows = []
+    for idx, step in enumerate(steps):
+        step_image = step.get('stepImage')
+        rows.append((
+            recipe_id,
+            idx + 1,
+            step.get('instruction', ''),
+            step_image,
+            'image' if step_image else None
+        ))
+    execute_values(cur, '''
+        INSERT INTO recipe_steps (recipe_id, step_number, description, media_url, media_type)
+        VALUES %s
+    ''', rows, template='(%s::uuid, %s, %s, %s, %s)', page_size=len(rows))
+
+
+# API field -> recipes column, for the fields an update may change
+RECIPE_FIELDS = {
+    'name': 'title',
+    'story': 'description',
+    'servings': 'servings',
+    'image': 'image_url',
+}
+
+
+def _diff_rows(stored, wanted, fields):
+    """Pair stored child rows with the submitted ones.
+
+    Rows whose ``fields`` are identical are paired first, so moving a row
+    only changes its position. Leftovers are paired in order and rewritten
+    in place, which turns an edited row into one UPDATE. Whatever is still
+    unpaired is inserted or deleted. ``stored`` rows carry an ``id`` and
+    come in display order; each row also has a ``position`` column.
+
+    Returns (updates, inserts, delete_ids); an update is the wanted row
+    with the stored ``id`` added, and only rows that differ are included.
+    """
+    def content(row):
+        return tuple(row[field] for field in fields)
+
+    unpaired = {}
+    for row in stored:
+        unpaired.setdefault(content(row), []).append(row)
+
+    pairs = []
+    for row in wanted:
+        same = unpaired.get(content(row))
+        pairs.append(same.pop(0) if same else None)
+
+    paired_ids = {row['id'] for row in pairs if row}
+    leftovers = [row for row in stored if row['id'] not in paired_ids]
+    for idx, row in enumerate(pairs):
+        if row is None and leftovers:
+            pairs[idx] = leftovers.pop(0)
+
+    updates, inserts = [], []
+    for row, old in zip(wanted, pairs):
+        if old is None:
+            inserts.append(row)
+        elif content(old) != content(row) or old['position'] != row['position']:
+            updates.append(dict(row, id=old['id']))
+    return updates, inserts, [row['id'] for row in leftovers]
+
+
+def _ingredient_key(name, brand):
+    return (name or '').lower(), (brand or GENERIC_BRAND).lower()
+
+
+def _sync_recipe_ingredients(cur, recipe_id, ingredients, user_id):
+    cur.execute('''
+        SELECT ri.id, ri.branded_ingredient_id, ri.quantity, ri.display_order AS position,
+               i.name, b.name AS brand
+        FROM recipe_ingredients ri
+        JOIN branded_ingredients bi ON ri.branded_ingredient_id = bi.id
+        JOIN base_ingredients i ON bi.base_ingredient_id = i.id
+        LEFT JOIN brands b ON bi.brand_id = b.id
+        WHERE ri.recipe_id = %s
+        ORDER BY ri.display_order, ri.id
+    ''', (recipe_id,))
+    stored = cur.fetchall()
+    for row in stored:
+        row['branded_ingredient_id'] = str(row['branded_ingredient_id'])
+
+    # Ingredients the recipe already uses keep their product without a
+    # lookup; only new names go through the resolver
+    known = {_ingredient_key(row['name'], row['brand']): row['branded_ingredient_id'] for row in stored}
+    if not all(ingredient.get('name') for ingredient in ingredients):
+        raise ValueError('Every ingredient needs a name')
+    new = [
+        ingredient for ingredient in ingredients
+        if _ingredient_key(ingredient['name'], ingredient.get('brand')) not in known
+    ]
+    for ingredient, branded_id in zip(new, resolve_branded_ingredients(cur, new, user_id)):
+        known[_ingredient_key(ingredient['name'], ingredient.get('brand'))] = str(branded_id)
+
+    wanted = [
+        {
+            'branded_ingredient_id': known[_ingredient_key(ingredient['name'], ingredient.get('brand'))],
+            'quantity': ingredient.get('quantity', ''),
+            'position': idx,
+        }
+        for idx, ingredient in enumerate(ingredients)
+    ]
+    updates, inserts, delete_ids = _diff_rows(stored, wanted, ('branded_ingredient_id', 'quantity'))
+
+    if delete_ids:
+        cur.execute('DELETE FROM recipe_ingredients WHERE id = ANY(%s::uuid[])', ([str(id) for id in delete_ids],))
+    if updates:
+        execute_values(cur, '''
+            UPDATE recipe_ingredients ri
+            SET branded_ingredient_id = v.branded_ingredient_id,
+                quantity = v.quantity,
+                display_order = v.display_order
+            FROM (VALUES %s) AS v(id, branded_ingredient_id, quantity, display_order)
+            WHERE ri.id = v.id
+        ''', [
+            (str(row['id']), row['branded_ingredient_id'], row['quantity'], row['position'])
+            for row in updates
+        ], template='(%s::uuid, %s::uuid, %s, %s)', page_size=len(updates))
+    if inserts:
+        execute_values(cur, '''
+            INSERT INTO recipe_ingredients (recipe_id, branded_ingredient_id, quantity, display_order)
+            VALUES %s
+        ''', [
+            (recipe_id, row['branded_ingredient_id'], row['quantity'], row['position'])
+            for row in inserts
+        ], template='(%s::uuid, %s::uuid, %s, %s)', page_size=len(inserts))
+    return len(updates) + len(inserts) + len(delete_ids)
+
+
+def _sync_recipe_steps(cur, recipe_id, steps):
+    """Returns (rows written, media URLs of the steps written)."""
+    cur.execute('''
+        SELECT id, step_number AS position, description, media_url, media_type
+        FROM recipe_steps
+        WHERE recipe_id = %s
+        ORDER BY step_number, id
+    ''', (recipe_id,))
+    stored = cur.fetchall()
+
+    wanted = [
+        {
+            'position': idx + 1,
+            'description': step.get('instruction', ''),
+            'media_url': step.get('stepImage'),
+            'media_type': 'image' if step.get('stepImage') else None,
+        }
+        for idx, step in enumerate(steps)
+    ]
+    updates, inserts, delete_ids = _diff_rows(stored, wanted, ('description', 'media_url', 'media_type'))
+
+    if delete_ids:
+        cur.execute('DELETE FROM recipe_steps WHERE id = ANY(%s::uuid[])', ([str(id) for id in delete_ids],))
+    if updates:
+        execute_values(cur, '''
+            UPDATE recipe_steps s
+            SET step_number = v.step_number,
+                description = v.description,
+                media_url = v.media_url,
+                media_type = v.media_type
+            FROM (VALUES %s) AS v(id, step_number, description, media_url, media_type)
+            WHERE s.id = v.id
+        ''', [
+            (str(row['id']), row['position'], row['description'], row['media_url'], row['media_type'])
+            for row in updates
+        ], template='(%s::uuid, %s, %s, %s::text, %s::varchar)', page_size=len(updates))
+    if inserts:
+        execute_values(cur, '''
+            INSERT INTO recipe_steps (recipe_id, step_number, description, media_url, media_type)
+            VALUES %s
+        ''', [
+            (recipe_id, row['position'], row['description'], row['media_url'], row['media_type'])
+            for row in inserts
+        ], template='(%s::uuid, %s, %s, %s, %s)', page_size=len(inserts))
+    written = updates + inserts
+    return len(written) + len(delete_ids), [row['media_url'] for row in written]
+
+
+def apply_recipe_changes(cur, recipe, data, user_id):
+    """Bring a stored recipe in line with ``data`` using as few writes as possible.
+
+    ``recipe`` is the locked recipes row and ``data`` uses the API field
+    names. Only fields present in ``data`` are considered; ``ingredients``
+    and ``steps`` each replace the whole list and are diffed against the
+    stored rows, so unchanged rows are not rewritten and no statement runs
+    for a list that did not change. Returns the set of what changed, from
+    RECIPE_FIELDS keys plus 'ingredients' and 'steps', and the image URLs
+    that may need variants.
+    """
+    recipe_id = str(recipe['id'])
+    changed = set()
+    images = []
+
+    columns = {
+        RECIPE_FIELDS[field]: data[field]
+        for field in RECIPE_FIELDS
+        if field in data and data[field] != recipe[RECIPE_FIELDS[field]]
+    }
+    if columns:
+        # Only the changed columns, so triggers watching the others
+        # (the search vector's title and description) stay quiet
+        assignments = ', '.join(f'{column} = %s' for column in columns)
+        cur.execute(f'UPDATE recipes SET {assignments} WHERE id = %s', (*columns.values(), recipe_id))
+        changed.update(field for field in RECIPE_FIELDS if RECIPE_FIELDS[field] in columns)
+        if 'image_url' in columns:
+            images.append(columns['image_url'])
+
+    if 'ingredients' in data and _sync_recipe_ingredients(cur, recipe_id, data['ingredients'] or [], user_id):
+        changed.add('ingredients')
+    if 'steps' in data:
+        written, step_images = _sync_recipe_steps(cur, recipe_id, data['steps'] or [])
+        if written:
+            changed.add('steps')
+            images.extend(step_images)
+    return changed, images
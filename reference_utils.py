@@ -0,0 +1,129 @@
+# reference_utils.py
+import os
+import time
+import select
+import logging
+import threading
+from dotenv import load_dotenv
+
+from db_utils import open_connection
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Backstop for changes whose notification was missed
+REFERENCE_CACHE_TTL = float(os.getenv('REFERENCE_CACHE_TTL', '3600'))
+# Cross-process invalidation; without it each process relies on the TTL
+REFERENCE_LISTEN = os.getenv('REFERENCE_LISTEN', 'true').lower() == 'true'
+# Notification channel; the triggers in migrations/014 send the table name
+REFERENCE_CHANNEL = 'reference_data'
+
+# Small, rarely edited tables served from memory
+REFERENCE_QUERIES = {
+    'cuisines': 'SELECT * FROM cuisines ORDER BY name',
+    'units': 'SELECT * FROM units ORDER BY name',
+    'nutrients': 'SELECT * FROM nutrients ORDER BY name',
+    'nutrient_categories': 'SELECT * FROM nutrient_categories ORDER BY display_order',
+    'additive_categories': 'SELECT * FROM additive_categories ORDER BY name',
+    'tags': 'SELECT * FROM tags ORDER BY name',
+}
+
+
+class ReferenceCache:
+    """Read-through, per-process copies of the REFERENCE_QUERIES tables.
+
+    Every table has a version that invalidate() bumps. A load only stores
+    its rows if the version is unchanged when it finishes, so a load that
+    raced with a change is used once and then thrown away instead of
+    caching stale rows. Rows are shared between requests; treat them as
+    read-only.
+    """
+
+    def __init__(self, queries, ttl):
+        self._queries = queries
+        self.ttl = ttl
+        self._entries = {}   # name -> (rows, expires_at)
+        self._versions = {}  # name -> int
+        self._lock = threading.Lock()
+
+    def get(self, cur, name):
+        entry = self._entries.get(name)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        with self._lock:
+            version = self._versions.get(name, 0)
+        cur.execute(self._queries[name])
+        rows = cur.fetchall()
+        with self._lock:
+            if self._versions.get(name, 0) == version:
+                self._entries[name] = (rows, time.monotonic() + self.ttl)
+        return rows
+
+    def invalidate(self, *names):
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+                self._entries.pop(name, None)
+
+    def invalidate_all(self):
+        self.invalidate(*self._queries)
+
+
+_cache = ReferenceCache(REFERENCE_QUERIES, REFERENCE_CACHE_TTL)
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def get_reference(cur, name):
+    """All rows of a reference table, loaded through ``cur`` on a miss."""
+    return _cache.get(cur, name)
+
+
+def invalidate_reference(*names):
+    """Drop this process's copies after a change; call once it is committed.
+
+    Other processes hear about it from the table's NOTIFY trigger.
+    """
+    _cache.invalidate(*names)
+
+
+def _listen():
+    while True:
+        conn = None
+        try:
+            conn = open_connection()
+            conn.autocommit = True
+            cur = conn.cursor()
+            cur.execute(f'LISTEN {REFERENCE_CHANNEL}')
+            # Anything may have changed while we were not listening
+            _cache.invalidate_all()
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    if notify.payload in REFERENCE_QUERIES:
+                        _cache.invalidate(notify.payload)
+        except Exception as e:
+            logger.warning("Reference data listener error, reconnecting: %s", e)
+            time.sleep(5)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
+def start_reference_listener():
+    """Start the LISTEN thread once per process; no-op when REFERENCE_LISTEN is off."""
+    global _listener_pid
+    with _listener_lock:
+        if not REFERENCE_LISTEN or _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+        threading.Thread(target=_listen, name='reference-listener', daemon=True).start()
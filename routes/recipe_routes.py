@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from db_utils import get_db_connection
+from recipe_utils import insert_recipe_ingredients, insert_recipe_steps
 import uuid
 
 recipe_bp = Blueprint('recipe', __name__)
@@ -50,118 +51,9 @@ def create_recipe():
         recipe_id = cur.fetchone()['id']
         print(f"Recipe created with ID: {recipe_id}")
         
-        # Insert ingredients
-        for idx, ingredient in enumerate(data.get('ingredients', [])):
-            # Get base ingredient ID by name
-            cur.execute("SELECT id FROM base_ingredients WHERE name ILIKE %s", (ingredient.get('name'),))
-            base_ingredient = cur.fetchone()
-            
-            if not base_ingredient:
-                # If ingredient doesn't exist, create it
-                cur.execute("""
-                    INSERT INTO base_ingredients (name, is_verified, added_by_user_id)
-                    VALUES (%s, %s, %s)
-                    RETURNING id
-                """, (
-                    ingredient.get('name'),
-                    False,
-                    user_id
-                ))
-                base_ingredient_id = cur.fetchone()['id']
-            else:
-                base_ingredient_id = base_ingredient['id']
-            
-            # Handle brand if provided
-            brand_id = None
-            if ingredient.get('brand'):
-                # Try to find the brand
-                cur.execute("SELECT id FROM brands WHERE name ILIKE %s", (ingredient.get('brand'),))
-                brand = cur.fetchone()
-                
-                if not brand:
-                    # Create the brand if it doesn't exist
-                    cur.execute("""
-                        INSERT INTO brands (name, is_verified, added_by_user_id)
-                        VALUES (%s, %s, %s)
-                        RETURNING id
-                    """, (
-                        ingredient.get('brand'),
-                        False,
-                        user_id
-                    ))
-                    brand_id = cur.fetchone()['id']
-                else:
-                    brand_id = brand['id']
-            else:
-                # Create or get a default "Generic" brand
-                cur.execute("SELECT id FROM brands WHERE name = 'Generic'")
-                generic_brand = cur.fetchone()
-                
-                if not generic_brand:
-                    # Create generic brand if it doesn't exist
-                    cur.execute("""
-                        INSERT INTO brands (name, is_verified, added_by_user_id)
-                        VALUES (%s, %s, %s)
-                        RETURNING id
-                    """, (
-                        'Generic',
-                        True,
-                        user_id
-                    ))
-                    brand_id = cur.fetchone()['id']
-                else:
-                    brand_id = generic_brand['id']
-            
-            # Get or create branded_ingredient entry
-            cur.execute("""
-                SELECT id FROM branded_ingredients 
-                WHERE base_ingredient_id = %s AND brand_id = %s
-            """, (base_ingredient_id, brand_id))
-            branded_ingredient = cur.fetchone()
-            
-            if not branded_ingredient:
-                # Create the branded ingredient if it doesn't exist
-                cur.execute("""
-                    INSERT INTO branded_ingredients (base_ingredient_id, brand_id, is_verified, added_by_user_id)
-                    VALUES (%s, %s, %s, %s)
-                    RETURNING id
-                """, (
-                    base_ingredient_id,
-                    brand_id,
-                    False,
-                    user_id
-                ))
-                branded_ingredient_id = cur.fetchone()['id']
-            else:
-                branded_ingredient_id = branded_ingredient['id']
-            
-            # Insert the recipe ingredient with the correct branded_ingredient_id
-            cur.execute("""
-                INSERT INTO recipe_ingredients (recipe_id, branded_ingredient_id, quantity, display_order)
-                VALUES (%s, %s, %s, %s)
-            """, (
-                recipe_id,
-                branded_ingredient_id,
-                ingredient.get('quantity', ''),
-                idx  # Use idx as display_order
-            ))
-        
-        # Insert steps with updated image handling
-        for idx, step in enumerate(data.get('steps', [])):
-            # Use stepImage directly from the step object
-            step_image = step.get('stepImage')
-            media_type = 'image' if step_image else None
-            
-            cur.execute("""
-                INSERT INTO recipe_steps (recipe_id, step_number, description, media_url, media_type)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (
-                recipe_id,
-                idx + 1,
-                step.get('instruction', ''),
-                step_image,  # Use the image path directly
-                media_type
-            ))
+        # Resolve and insert ingredients and steps in bulk
+        insert_recipe_ingredients(cur, recipe_id, data.get('ingredients', []), user_id)
+        insert_recipe_steps(cur, recipe_id, data.get('steps', []))
         
         # Commit transaction
         cur.execute("COMMIT")
@@ -238,117 +130,9 @@ def update_recipe(recipe_id):
         cur.execute("DELETE FROM recipe_ingredients WHERE recipe_id = %s", (recipe_id_str,))
         cur.execute("DELETE FROM recipe_steps WHERE recipe_id = %s", (recipe_id_str,))
         
-        # Re-insert ingredients
-        for idx, ingredient in enumerate(data.get('ingredients', [])):
-            # Get base ingredient ID by name
-            cur.execute("SELECT id FROM base_ingredients WHERE name ILIKE %s", (ingredient.get('name'),))
-            base_ingredient = cur.fetchone()
-            
-            if not base_ingredient:
-                # If ingredient doesn't exist, create it
-                cur.execute("""
-                    INSERT INTO base_ingredients (name, is_verified, added_by_user_id)
-                    VALUES (%s, %s, %s)
-                    RETURNING id
-                """, (
-                    ingredient.get('name'),
-                    False,
-                    current_user.id
-                ))
-                base_ingredient_id = cur.fetchone()['id']
-            else:
-                base_ingredient_id = base_ingredient['id']
-            
-            # Handle brand if provided
-            brand_id = None
-            if ingredient.get('brand'):
-                # Try to find the brand
-                cur.execute("SELECT id FROM brands WHERE name ILIKE %s", (ingredient.get('brand'),))
-                brand = cur.fetchone()
-                
-                if not brand:
-                    # Create the brand if it doesn't exist
-                    cur.execute("""
-                        INSERT INTO brands (name, is_verified, added_by_user_id)
-                        VALUES (%s, %s, %s)
-                        RETURNING id
-                    """, (
-                        ingredient.get('brand'),
-                        False,
-                        current_user.id
-                    ))
-                    brand_id = cur.fetchone()['id']
-                else:
-                    brand_id = brand['id']
-            else:
-                # Create or get a default "Generic" brand
-                cur.execute("SELECT id FROM brands WHERE name = 'Generic'")
-                generic_brand = cur.fetchone()
-                
-                if not generic_brand:
-                    # Create generic brand if it doesn't exist
-                    cur.execute("""
-                        INSERT INTO brands (name, is_verified, added_by_user_id)
-                        VALUES (%s, %s, %s)
-                        RETURNING id
-                    """, (
-                        'Generic',
-                        True,
-                        current_user.id
-                    ))
-                    brand_id = cur.fetchone()['id']
-                else:
-                    brand_id = generic_brand['id']
-            
-            # Get or create branded_ingredient entry
-            cur.execute("""
-                SELECT id FROM branded_ingredients 
-                WHERE base_ingredient_id = %s AND brand_id = %s
-            """, (base_ingredient_id, brand_id))
-            branded_ingredient = cur.fetchone()
-            
-            if not branded_ingredient:
-                # Create the branded ingredient if it doesn't exist
-                cur.execute("""
-                    INSERT INTO branded_ingredients (base_ingredient_id, brand_id, is_verified, added_by_user_id)
-                    VALUES (%s, %s, %s, %s)
-                    RETURNING id
-                """, (
-                    base_ingredient_id,
-                    brand_id,
-                    False,
-                    current_user.id
-                ))
-                branded_ingredient_id = cur.fetchone()['id']
-            else:
-                branded_ingredient_id = branded_ingredient['id']
-            
-            # Insert the recipe ingredient with the correct branded_ingredient_id
-            cur.execute("""
-                INSERT INTO recipe_ingredients (recipe_id, branded_ingredient_id, quantity, display_order)
-                VALUES (%s, %s, %s, %s)
-            """, (
-                recipe_id_str,  # Use string representation
-                branded_ingredient_id,
-                ingredient.get('quantity', ''),
-                idx  # Use idx as display_order
-            ))
-        
-        # Insert steps
-        for idx, step in enumerate(data.get('steps', [])):
-            step_image = step.get('stepImage')
-            media_type = 'image' if step_image else None
-            
-            cur.execute("""
-                INSERT INTO recipe_steps (recipe_id, step_number, description, media_url, media_type)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (
-                recipe_id_str,  # Use string representation
-                idx + 1,
-                step.get('instruction', ''),
-                step_image,
-                media_type
-            ))
+        # Re-insert ingredients and steps in bulk
+        insert_recipe_ingredients(cur, recipe_id_str, data.get('ingredients', []), current_user.id)
+        insert_recipe_steps(cur, recipe_id_str, data.get('steps', []))
         
         # Commit transaction
         cur.execute("COMMIT")
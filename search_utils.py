@@ -0,0 +1,77 @@
+# search_utils.py
+import html
+
+from recipe_utils import VISIBLE_RECIPE_SQL
+
+# Must match the configuration used for recipes.search_vector in migrations/011
+SEARCH_CONFIG = 'english'
+# Highlight markers, turned into <mark> after HTML-escaping. They are
+# stripped from the text first so user content cannot forge them.
+_START, _STOP = '\x02', '\x03'
+_HEADLINE_OPTIONS = f'StartSel="{_START}", StopSel="{_STOP}", MaxWords=30, MinWords=12, MaxFragments=2'
+
+
+def _highlight(text):
+    """HTML-escape ts_headline output and turn our markers into <mark> tags."""
+    if text is None:
+        return None
+    return html.escape(text).replace(_START, '<mark>').replace(_STOP, '</mark>')
+
+
+def search_recipes(cur, text, user_id, limit, after=None):
+    """Recipes matching ``text`` that ``user_id`` may see, best match first.
+
+    Visible recipes are the user's own, public ones, and those shared into
+    a family the user is an active member of; pass user_id=None for
+    anonymous searches. ``after`` is the (rank, id) of the last row of the
+    previous page. Pass one more than the page size as ``limit`` to tell
+    whether another page exists.
+
+    Only the page of results is highlighted, since ts_headline re-parses
+    the documents and costs far more than the indexed match.
+    """
+    params = {
+        'config': SEARCH_CONFIG,
+        'text': text,
+        'user_id': str(user_id) if user_id else None,
+        'limit': limit,
+        'options': _HEADLINE_OPTIONS,
+        'markers': _START + _STOP,
+    }
+    keyset = ''
+    if after:
+        keyset = 'AND (ts_rank_cd(r.search_vector, q.query), r.id) < (%(rank)s::real, %(after_id)s::uuid)'
+        params['rank'], params['after_id'] = after
+
+    cur.execute(f'''
+        WITH q AS (
+            SELECT websearch_to_tsquery(%(config)s::regconfig, %(text)s) AS query
+        ),
+        page AS (
+            SELECT r.id, ts_rank_cd(r.search_vector, q.query) AS rank
+            FROM recipes r, q
+            WHERE r.search_vector @@ q.query
+              AND {VISIBLE_RECIPE_SQL}
+              {keyset}
+            ORDER BY rank DESC, r.id DESC
+            LIMIT %(limit)s
+        )
+        SELECT r.id, p.rank, r.title, r.description, r.image_url, r.servings,
+               r.prep_time_minutes, r.cook_time_minutes, r.created_at,
+               c.name AS cuisine_name,
+               coalesce(r.created_by_user_id = %(user_id)s::uuid, false) AS is_owner,
+               ts_headline(%(config)s::regconfig, translate(r.title, %(markers)s, ''), q.query,
+                           %(options)s || ', HighlightAll=true') AS title_highlight,
+               ts_headline(%(config)s::regconfig, translate(coalesce(r.description, ''), %(markers)s, ''),
+                           q.query, %(options)s) AS snippet
+        FROM page p
+        JOIN recipes r ON r.id = p.id
+        LEFT JOIN cuisines c ON r.cuisine_id = c.id
+        CROSS JOIN q
+        ORDER BY p.rank DESC, r.id DESC
+    ''', params)
+    rows = cur.fetchall()
+    for row in rows:
+        row['title_highlight'] = _highlight(row['title_highlight'])
+        row['snippet'] = _highlight(row['snippet'])
+    return rows
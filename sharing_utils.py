@@ -0,0 +1,165 @@
+# sharing_utils.py
+
+
+def get_shared_feed(cur, user_id, limit, after=None):
+    """Recipes shared into any family ``user_id`` is an active member of.
+
+    Newest share first, one row per recipe however many of the user's
+    families it was shared into; the row describes its most recent share.
+    ``after`` is the (shared_at, recipe_id) of the last row of the previous
+    page. Pass one more than the page size as ``limit`` to tell whether
+    another page exists.
+
+    One statement for any number of families: each family contributes at
+    most ``limit`` of its newest shares from
+    idx_recipe_sharing_family_feed (migrations/013), a k-way merge of
+    sorted lists. Shares of a recipe that has a newer share in another of
+    the user's families are skipped inside the family scan, so every
+    recipe sits in exactly one list, at its feed position, and the merged
+    head of the lists is the page. Skipping them only after the per-family
+    limit would let them use up that family's quota and hide older shares
+    behind them.
+    """
+    params = {'user_id': str(user_id), 'limit': limit}
+    family_keyset = ''
+    if after:
+        params['shared_at'], params['after_id'] = after
+        family_keyset = 'AND (rs.shared_at, rs.recipe_id) < (%(shared_at)s::timestamptz, %(after_id)s::uuid)'
+
+    cur.execute(f'''
+        WITH my_families AS (
+            SELECT family_id FROM family_members
+            WHERE user_id = %(user_id)s::uuid AND is_active
+        ),
+        latest AS (
+            SELECT s.*
+            FROM my_families f
+            CROSS JOIN LATERAL (
+                SELECT rs.recipe_id, rs.shared_at, rs.family_id, rs.shared_by_user_id
+                FROM recipe_sharing rs
+                JOIN recipes r ON r.id = rs.recipe_id
+                WHERE rs.family_id = f.family_id
+                  AND r.created_by_user_id IS DISTINCT FROM %(user_id)s::uuid
+                  {family_keyset}
+                  -- Only the recipe's newest share among the user's families;
+                  -- ties go to the lowest family id
+                  AND NOT EXISTS (
+                      SELECT 1
+                      FROM recipe_sharing newer
+                      JOIN my_families nf ON nf.family_id = newer.family_id
+                      WHERE newer.recipe_id = rs.recipe_id
+                        AND (newer.shared_at > rs.shared_at
+                             OR (newer.shared_at = rs.shared_at AND newer.family_id < rs.family_id))
+                  )
+                ORDER BY rs.shared_at DESC, rs.recipe_id DESC
+                LIMIT %(limit)s
+            ) s
+            ORDER BY s.shared_at DESC, s.recipe_id DESC
+            LIMIT %(limit)s
+        )
+        SELECT r.id, r.title, r.description, r.image_url, r.servings,
+               r.prep_time_minutes, r.cook_time_minutes,
+               l.shared_at, l.family_id, f.name AS family_name,
+               u.first_name AS shared_by_first_name, u.last_name AS shared_by_last_name,
+               ARRAY(
+                   SELECT f2.name
+                   FROM recipe_sharing rs2
+                   JOIN families f2 ON f2.id = rs2.family_id
+                   WHERE rs2.recipe_id = r.id
+                     AND rs2.family_id IN (SELECT family_id FROM my_families)
+                   ORDER BY f2.name
+               ) AS family_names
+        FROM latest l
+        JOIN recipes r ON r.id = l.recipe_id
+        JOIN families f ON f.id = l.family_id
+        LEFT JOIN users u ON u.id = l.shared_by_user_id
+        ORDER BY l.shared_at DESC, l.recipe_id DESC
+    ''', params)
+    return cur.fetchall()
+
+
+# Statuses reported per (recipe, family) pair by share_recipes/unshare_recipes
+SHARED = 'shared'
+ALREADY_SHARED = 'already_shared'
+UNSHARED = 'unshared'
+NOT_SHARED = 'not_shared'
+RECIPE_NOT_FOUND = 'recipe_not_found'
+FORBIDDEN = 'forbidden'
+NOT_A_MEMBER = 'not_a_member'
+
+# Largest recipes x families product accepted in one request
+MAX_SHARE_PAIRS = 5000
+
+
+def _check_targets(cur, user_id, recipe_ids, family_ids):
+    """Per-recipe and per-family refusal reasons, in one query each.
+
+    Only a recipe's owner may share it, and only into families they are
+    an active member of.
+    """
+    cur.execute('''
+        SELECT id, created_by_user_id = %s::uuid AS is_owner
+        FROM recipes
+        WHERE id = ANY(%s::uuid[])
+    ''', (str(user_id), recipe_ids))
+    owned = {str(row['id']): row['is_owner'] for row in cur.fetchall()}
+    recipe_errors = {
+        recipe_id: RECIPE_NOT_FOUND if recipe_id not in owned else FORBIDDEN
+        for recipe_id in recipe_ids
+        if not owned.get(recipe_id)
+    }
+
+    cur.execute('''
+        SELECT family_id FROM family_members
+        WHERE user_id = %s::uuid AND is_active AND family_id = ANY(%s::uuid[])
+    ''', (str(user_id), family_ids))
+    member_of = {str(row['family_id']) for row in cur.fetchall()}
+    family_errors = {family_id: NOT_A_MEMBER for family_id in family_ids if family_id not in member_of}
+    return recipe_errors, family_errors
+
+
+def _apply(cur, user_id, recipe_ids, family_ids, statement, done, skipped):
+    recipe_errors, family_errors = _check_targets(cur, user_id, recipe_ids, family_ids)
+    recipes = [recipe_id for recipe_id in recipe_ids if recipe_id not in recipe_errors]
+    families = [family_id for family_id in family_ids if family_id not in family_errors]
+
+    changed = set()
+    if recipes and families:
+        # Every allowed pair in a single statement
+        cur.execute(statement, {'user_id': str(user_id), 'recipe_ids': recipes, 'family_ids': families})
+        changed = {(str(row['recipe_id']), str(row['family_id'])) for row in cur.fetchall()}
+
+    results = []
+    for recipe_id in recipe_ids:
+        for family_id in family_ids:
+            status = recipe_errors.get(recipe_id) or family_errors.get(family_id)
+            if status is None:
+                status = done if (recipe_id, family_id) in changed else skipped
+            results.append({"recipe_id": recipe_id, "family_id": family_id, "status": status})
+    return results
+
+
+def share_recipes(cur, user_id, recipe_ids, family_ids):
+    """Share every recipe with every family, skipping pairs already shared.
+
+    Ids must be normalized UUID strings without duplicates. Returns one
+    result per (recipe, family) pair; nothing is committed here.
+    """
+    return _apply(cur, user_id, recipe_ids, family_ids, '''
+        INSERT INTO recipe_sharing (recipe_id, family_id, shared_by_user_id)
+        SELECT r.id, f.id, %(user_id)s::uuid
+        FROM unnest(%(recipe_ids)s::uuid[]) AS r(id)
+        CROSS JOIN unnest(%(family_ids)s::uuid[]) AS f(id)
+        ON CONFLICT (recipe_id, family_id) DO NOTHING
+        RETURNING recipe_id, family_id
+    ''', SHARED, ALREADY_SHARED)
+
+
+def unshare_recipes(cur, user_id, recipe_ids, family_ids):
+    """Remove every recipe from every family; the counterpart of share_recipes()."""
+    return _apply(cur, user_id, recipe_ids, family_ids, '''
+        DELETE FROM recipe_sharing
+        WHERE recipe_id = ANY(%(recipe_ids)s::uuid[])
+          AND family_id = ANY(%(family_ids)s::uuid[])
+        RETURNING recipe_id, family_id
+    ''', UNSHARED, NOT_SHARED)
@@ -0,0 +1,191 @@
+# sql_stats_utils.py
+import os
+import re
+import time
+import logging
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from dotenv import load_dotenv
+from flask import request
+from psycopg2.sql import Composable
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SQL_STATS_ENABLED = os.getenv('SQL_STATS_ENABLED', 'true').lower() == 'true'
+# One statement run more often than this in a request is reported as a likely N+1
+SQL_REPEAT_THRESHOLD = int(os.getenv('SQL_REPEAT_THRESHOLD', '10'))
+# Server-Timing headers are sent in debug mode, or always when this is set
+SQL_STATS_HEADERS = os.getenv('SQL_STATS_HEADERS', 'false').lower() == 'true'
+
+_SLOW_SQL_CHARS = 500
+
+# Stats for the request being handled in this context; None outside requests
+_current = ContextVar('sql_stats', default=None)
+
+# Literals, so statements rendered client-side (execute_values, mogrify)
+# group with their siblings
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Statement shape used to spot repeats: literals replaced, whitespace collapsed."""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    elif not isinstance(sql, str):
+        sql = str(sql)
+    return _WHITESPACE.sub(' ', _LITERALS.sub('?', sql)).strip()
+
+
+class RequestQueryStats:
+    """Queries issued while handling one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = None
+        self._raw = []
+
+    def record(self, sql, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.slowest:
+            self.slowest = elapsed
+            self.slowest_sql = sql
+        # Normalizing is deferred to the end of the request
+        self._raw.append(sql)
+
+    def repeated(self, threshold):
+        """(statement, times) for statements run more than ``threshold`` times."""
+        counts = Counter(normalize_sql(sql) for sql in self._raw)
+        return [(sql, times) for sql, times in counts.most_common() if times > threshold]
+
+
+class _InstrumentedCursor:
+    """Mixin timing execute()/executemany() into the current request's stats."""
+
+    def _statement(self, query):
+        # psycopg2.sql objects only show their repr() until rendered
+        return query.as_string(self) if isinstance(query, Composable) else query
+
+    def execute(self, query, vars=None):
+        stats = _current.get()
+        if stats is None:
+            return super().execute(query, vars)
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            stats.record(self._statement(query), time.perf_counter() - start)
+
+    def executemany(self, query, vars_list):
+        stats = _current.get()
+        if stats is None:
+            return super().executemany(query, vars_list)
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            stats.record(self._statement(query), time.perf_counter() - start)
+
+
+_factories = {}
+_factories_lock = threading.Lock()
+
+
+def instrumented(cursor_factory):
+    """The instrumented subclass of a psycopg2 cursor class, created once."""
+    cls = _factories.get(cursor_factory)
+    if cls is None:
+        with _factories_lock:
+            cls = _factories.get(cursor_factory)
+            if cls is None:
+                cls = type(f'Instrumented{cursor_factory.__name__}', (_InstrumentedCursor, cursor_factory), {})
+                _factories[cursor_factory] = cls
+    return cls
+
+
+class EndpointMetrics:
+    """Per-endpoint totals since the process started."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, stats, repeat_warnings):
+        with self._lock:
+            entry = self._data.setdefault(endpoint, {
+                'requests': 0,
+                'queries': 0,
+                'db_seconds': 0.0,
+                'max_queries': 0,
+                'slowest_seconds': 0.0,
+                'slowest_sql': None,
+                'repeat_warnings': 0,
+            })
+            entry['requests'] += 1
+            entry['queries'] += stats.count
+            entry['db_seconds'] += stats.total
+            entry['max_queries'] = max(entry['max_queries'], stats.count)
+            entry['repeat_warnings'] += repeat_warnings
+            if stats.slowest > entry['slowest_seconds']:
+                entry['slowest_seconds'] = stats.slowest
+                entry['slowest_sql'] = normalize_sql(stats.slowest_sql)[:_SLOW_SQL_CHARS]
+
+    def snapshot(self):
+        """Endpoints with averages, most total DB time first."""
+        with self._lock:
+            rows = [dict(entry, endpoint=endpoint) for endpoint, entry in self._data.items()]
+        for row in rows:
+            row['avg_queries'] = round(row['queries'] / row['requests'], 2)
+            row['avg_db_ms'] = round(row['db_seconds'] * 1000 / row['requests'], 2)
+            row['db_seconds'] = round(row['db_seconds'], 4)
+            row['slowest_ms'] = round(row.pop('slowest_seconds') * 1000, 2)
+        return sorted(rows, key=lambda row: row['db_seconds'], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_metrics = EndpointMetrics()
+
+
+def get_sql_metrics():
+    return _metrics
+
+
+def init_sql_stats(app):
+    """Collect query stats for every request handled by ``app``."""
+    if not SQL_STATS_ENABLED:
+        return
+
+    @app.before_request
+    def _start_sql_stats():
+        _current.set(RequestQueryStats())
+
+    @app.after_request
+    def _finish_sql_stats(response):
+        stats = _current.get()
+        if stats is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+
+        repeated = stats.repeated(SQL_REPEAT_THRESHOLD)
+        for sql, times in repeated:
+            logger.warning("Possible N+1 in %s: statement ran %d times: %s", endpoint, times, sql[:200])
+        _metrics.add(endpoint, stats, len(repeated))
+
+        if app.debug or SQL_STATS_HEADERS:
+            response.headers.add('Server-Timing', f'db;dur={stats.total * 1000:.1f};desc="{stats.count} queries"')
+            response.headers.add('Server-Timing', f'db-slowest;dur={stats.slowest * 1000:.1f}')
+        return response
+
+    @app.teardown_request
+    def _reset_sql_stats(exc):
+        _current.set(None)
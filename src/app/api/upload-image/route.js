@@ -1,61 +1,139 @@
 // src/app/api/upload-image/route.js
 import { NextResponse } from 'next/server';
-import { writeFile, mkdir } from 'fs/promises';
+import { open, mkdir, rename, unlink, access } from 'fs/promises';
+import { createHash, randomBytes } from 'crypto';
 import path from 'path';
 
-// Helper function to ensure the upload directory exists
-async function ensureUploadDir() {
-  const uploadDir = path.join(process.cwd(), 'public', 'uploads');
+// Same layout as blob_utils.py on the Flask side: files are named by the
+// SHA-256 of their content and sharded two levels deep, so identical
+// uploads share one file.
+const BLOB_DIR = path.join(process.cwd(), 'public', 'uploads', 'blobs');
+const BLOB_URL_PREFIX = '/uploads/blobs';
+
+// Matches the 5MB check in ImageUploader
+const MAX_UPLOAD_BYTES = Number(process.env.MAX_UPLOAD_BYTES) || 5 * 1024 * 1024;
+// Enough leading bytes to recognise every accepted format
+const HEADER_BYTES = 12;
+const TOO_LARGE = `Image size should be less than ${Math.round(MAX_UPLOAD_BYTES / (1024 * 1024))}MB`;
+const NOT_AN_IMAGE = 'Invalid file type. Only JPEG, PNG, GIF and WebP images are allowed.';
+
+class UploadError extends Error {
+  constructor(message, status) {
+    super(message);
+    this.status = status;
+  }
+}
+
+// File extension for the image format in the first bytes, or null
+function sniffImage(header) {
+  if (header[0] === 0xff && header[1] === 0xd8 && header[2] === 0xff) return '.jpg';
+  if (header.subarray(0, 8).equals(Buffer.from([0x89, 0x50, 0x4e, 0x47, 0x0d, 0x0a, 0x1a, 0x0a]))) return '.png';
+  const gif = header.subarray(0, 6).toString('latin1');
+  if (gif === 'GIF87a' || gif === 'GIF89a') return '.gif';
+  if (header.subarray(0, 4).toString('latin1') === 'RIFF' && header.subarray(8, 12).toString('latin1') === 'WEBP') return '.webp';
+  return null;
+}
+
+async function fileExists(filePath) {
   try {
-    await mkdir(uploadDir, { recursive: true });
-    return uploadDir;
+    await access(filePath);
+    return true;
+  } catch {
+    return false;
+  }
+}
+
+// Write the request body to a temp file chunk by chunk, hashing and checking
+// it as it arrives, then move it to its content-addressed path. Memory use
+// stays at one chunk whatever the upload size.
+async function streamToBlob(body) {
+  await mkdir(BLOB_DIR, { recursive: true });
+  const tmpPath = path.join(BLOB_DIR, `.upload-${randomBytes(6).toString('hex')}`);
+  const handle = await open(tmpPath, 'w');
+  const reader = body.getReader();
+  const hash = createHash('sha256');
+  let header = Buffer.alloc(0);
+  let extension = null;
+  let size = 0;
+
+  try {
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      const chunk = Buffer.from(value);
+
+      size += chunk.length;
+      if (size > MAX_UPLOAD_BYTES) {
+        throw new UploadError(TOO_LARGE, 413);
+      }
+      if (extension === null && header.length < HEADER_BYTES) {
+        header = Buffer.concat([header, chunk.subarray(0, HEADER_BYTES - header.length)]);
+        if (header.length === HEADER_BYTES) {
+          extension = sniffImage(header);
+          if (!extension) {
+            throw new UploadError(NOT_AN_IMAGE, 415);
+          }
+        }
+      }
+
+      hash.update(chunk);
+      await handle.write(chunk);
+    }
+
+    if (size === 0) {
+      throw new UploadError('No image provided', 400);
+    }
+    extension = extension || sniffImage(header);
+    if (!extension) {
+      throw new UploadError(NOT_AN_IMAGE, 415);
+    }
   } catch (error) {
-    console.error('Error creating upload directory:', error);
+    // Stop receiving the rest of a rejected body and drop what was written
+    await reader.cancel().catch(() => {});
+    await handle.close();
+    await unlink(tmpPath).catch(() => {});
     throw error;
   }
-}
+  await handle.close();
+
+  const digest = hash.digest('hex');
+  const fileName = `${digest}${extension}`;
+  const dir = path.join(BLOB_DIR, digest.slice(0, 2), digest.slice(2, 4));
+  const filePath = path.join(dir, fileName);
 
-// Simple function to generate a unique filename without uuid
-function generateUniqueFilename(originalName) {
-  const timestamp = Date.now();
-  const randomStr = Math.random().toString(36).substring(2, 8);
-  const ext = originalName.split('.').pop();
-  return `${timestamp}-${randomStr}.${ext}`;
+  if (await fileExists(filePath)) {
+    // Already stored; keep the existing copy
+    await unlink(tmpPath);
+  } else {
+    await mkdir(dir, { recursive: true });
+    // Rename is atomic, so readers never see a partial file
+    await rename(tmpPath, filePath);
+  }
+
+  return `${BLOB_URL_PREFIX}/${digest.slice(0, 2)}/${digest.slice(2, 4)}/${fileName}`;
 }
 
+// Expects the raw image as the request body (not multipart form data)
 export async function POST(request) {
   try {
-    const formData = await request.formData();
-    const file = formData.get('image');
-    
-    if (!file) {
+    // Refuse oversized uploads before reading any of the body
+    const contentLength = Number(request.headers.get('content-length'));
+    if (contentLength > MAX_UPLOAD_BYTES) {
       return NextResponse.json(
-        { error: 'No image provided' },
-        { status: 400 }
+        { error: TOO_LARGE },
+        { status: 413 }
       );
     }
 
-    // Check file type
-    if (!file.type.match('image.*')) {
+    if (!request.body) {
       return NextResponse.json(
-        { error: 'Invalid file type. Only images are allowed.' },
+        { error: 'No image provided' },
         { status: 400 }
       );
     }
 
-    // Ensure upload directory exists
-    const uploadDir = await ensureUploadDir();
-    
-    // Create a unique filename
-    const buffer = Buffer.from(await file.arrayBuffer());
-    const fileName = generateUniqueFilename(file.name);
-    const filePath = path.join(uploadDir, fileName);
-    
-    // Write the file to disk
-    await writeFile(filePath, buffer);
-    
-    // Generate the URL path that will be accessible from the browser
-    const imagePath = `/uploads/${fileName}`;
+    // Store by content hash; the returned path is served from public/
+    const imagePath = await streamToBlob(request.body);
 
     console.log('Image saved successfully at:', imagePath);
 
@@ -64,10 +142,13 @@ export async function POST(request) {
       success: true
     });
   } catch (error) {
+    if (error instanceof UploadError) {
+      return NextResponse.json({ error: error.message }, { status: error.status });
+    }
     console.error('Error uploading image:', error);
     return NextResponse.json(
       { error: 'Failed to upload image: ' + error.message },
       { status: 500 }
     );
   }
-}
\ No newline at end of file
+}
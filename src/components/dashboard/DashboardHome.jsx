@@ -31,21 +31,18 @@ export default function DashboardHome() {
         
         // Fetch recipes and families in parallel
         const [recipesData, familiesData] = await Promise.all([
-          getUserRecipes(),
+          getUserRecipes({ limit: 3 }),
           getFamilies()
         ]);
         
         // Update stats with real counts
         setStats({
-          recipeCount: recipesData.length,
+          recipeCount: recipesData.total,
           familyCount: familiesData.length
         });
         
-        // Get recent recipes (sorted by date)
-        const sortedRecipes = [...recipesData].sort((a, b) => 
-          new Date(b.created_at) - new Date(a.created_at)
-        );
-        setRecentRecipes(sortedRecipes.slice(0, 3)); // Get top 3 recent recipes
+        // The API already returns newest first
+        setRecentRecipes(recipesData.recipes);
       } catch (error) {
         console.error('Error fetching dashboard data:', error);
       } finally {
@@ -4,44 +4,26 @@
 import React, { useState, useEffect } from 'react';
 import Link from 'next/link';
 import { useToast } from '@/contexts/ToastContext';
+import { getSharedRecipes } from '@/lib/api';
 
 export default function SharedWithMe() {
   const [sharedRecipes, setSharedRecipes] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const { showToast } = useToast();
 
   useEffect(() => {
     const fetchSharedRecipes = async () => {
       try {
         setIsLoading(true);
-        // TODO: Implement the fetchSharedRecipes API call
-        // For now, use mock data
-        const mockData = [
-          {
-            id: '123',
-            title: 'Mom\'s Special Curry',
-            description: 'A family recipe passed down for generations',
-            shared_by: 'Mom Smith',
-            shared_at: '2025-04-01T18:25:43.511Z',
-            family_name: 'Smith Family'
-          },
-          {
-            id: '456',
-            title: 'Dad\'s BBQ Sauce',
-            description: 'Perfect for summer cookouts',
-            shared_by: 'Dad Johnson',
-            shared_at: '2025-03-15T14:30:43.511Z',
-            family_name: 'Johnson Family'
-          }
-        ];
-
-        setTimeout(() => {
-          setSharedRecipes(mockData);
-          setIsLoading(false);
-        }, 800);
+        const data = await getSharedRecipes();
+        setSharedRecipes(data.recipes);
+        setNextCursor(data.next_cursor);
       } catch (error) {
         console.error('Error fetching shared recipes:', error);
         showToast('Failed to load shared recipes', 'error');
+      } finally {
         setIsLoading(false);
       }
     };
@@ -49,6 +31,22 @@ export default function SharedWithMe() {
     fetchSharedRecipes();
   }, [showToast]);
 
+  // Fetch the next page and append it
+  const loadMoreRecipes = async () => {
+    if (!nextCursor || isLoadingMore) return;
+    try {
+      setIsLoadingMore(true);
+      const data = await getSharedRecipes({ cursor: nextCursor });
+      setSharedRecipes(prev => [...prev, ...data.recipes]);
+      setNextCursor(data.next_cursor);
+    } catch (error) {
+      console.error('Error fetching more shared recipes:', error);
+      showToast('Failed to load more recipes', 'error');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   // Format date to readable string
   const formatDate = (dateString) => {
     const options = { year: 'numeric', month: 'long', day: 'numeric' };
@@ -109,7 +107,9 @@ export default function SharedWithMe() {
                       <svg className="flex-shrink-0 mr-1.5 h-5 w-5 text-gray-400" xmlns="http://www.w3.org/2000/svg" viewBox="0 0 20 20" fill="currentColor">
                         <path d="M13 6a3 3 0 11-6 0 3 3 0 016 0zM18 8a2 2 0 11-4 0 2 2 0 014 0zM14 15a4 4 0 00-8 0v3h8v-3zM6 8a2 2 0 11-4 0 2 2 0 014 0zM16 18v-3a5.972 5.972 0 00-.75-2.906A3.005 3.005 0 0119 15v3h-3zM4.75 12.094A5.973 5.973 0 004 15v3H1v-3a3 3 0 013.75-2.906z" />
                       </svg>
-                      {recipe.family_name}
+                      {recipe.family_names && recipe.family_names.length > 1
+                        ? recipe.family_names.join(', ')
+                        : recipe.family_name}
                     </p>
                   </div>
                   <div className="mt-2 flex items-center text-sm text-gray-500 sm:mt-0">
@@ -129,6 +129,18 @@ export default function SharedWithMe() {
           ))}
         </ul>
       )}
+
+      {nextCursor && (
+        <div className="mt-4 text-center">
+          <button
+            onClick={loadMoreRecipes}
+            disabled={isLoadingMore}
+            className="inline-flex items-center px-4 py-2 border border-gray-300 shadow-sm text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more recipes'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
\ No newline at end of file
@@ -52,14 +52,11 @@ export default function ImageUploader({ onImageUpload, currentImage = null, id =
       };
       reader.readAsDataURL(file);
 
-      // Create a FormData object to send the file
-      const formData = new FormData();
-      formData.append('image', file);
-
-      // Upload to your local server
+      // Send the raw file so the server can stream it straight to disk
       const response = await fetch('/api/upload-image', {
         method: 'POST',
-        body: formData,
+        headers: { 'Content-Type': file.type },
+        body: file,
       });
 
       const data = await response.json();
@@ -468,15 +468,6 @@ const IngredientsStep = ({ recipeData, updateRecipeData }) => {
       console.log("Adding new brand:", currentIngredient.brand, "for ingredient ID:", selectedIngredientId);
       
       try {
-        // First verify that the base ingredient exists
-        const ingredientsResponse = await getIngredients("");
-        const ingredientExists = ingredientsResponse.some(ing => ing.id === selectedIngredientId);
-        
-        if (!ingredientExists) {
-          showToast("Ingredient not found in database. Please try again.", "error");
-          return;
-        }
-        
         const result = await addBrand({ 
           name: currentIngredient.brand,
           ingredient_id: selectedIngredientId,
@@ -510,6 +501,11 @@ const IngredientsStep = ({ recipeData, updateRecipeData }) => {
         }
       } catch (error) {
         console.error('Error in brand API call:', error);
+        // The server checks that the ingredient exists; /ingredients lists only one page of names
+        if (error.message === 'API error: 404') {
+          showToast("Ingredient not found in database. Please try again.", "error");
+          return;
+        }
         showToast(`Server error: ${error.message || 'Database constraint error - ingredient may not exist'}`, 'error');
       }
     } catch (error) {
@@ -536,15 +532,6 @@ const IngredientsStep = ({ recipeData, updateRecipeData }) => {
       console.log("Adding new brand during edit:", editForm.brand, "for ingredient ID:", editIngredientId);
       
       try {
-        // First verify that the base ingredient exists
-        const ingredientsResponse = await getIngredients("");
-        const ingredientExists = ingredientsResponse.some(ing => ing.id === editIngredientId);
-        
-        if (!ingredientExists) {
-          showToast("Ingredient not found in database. Please try again.", "error");
-          return;
-        }
-        
         // Make API call with proper error handling
         const result = await addBrand({ 
           name: editForm.brand,
@@ -580,6 +567,11 @@ const IngredientsStep = ({ recipeData, updateRecipeData }) => {
         }
       } catch (error) {
         console.error('Error in brand API call:', error);
+        // The server checks that the ingredient exists; /ingredients lists only one page of names
+        if (error.message === 'API error: 404') {
+          showToast("Ingredient not found in database. Please try again.", "error");
+          return;
+        }
         showToast(`Server error: ${error.message || 'Database constraint error - ingredient may not exist'}`, 'error');
       }
     } catch (error) {
@@ -18,7 +18,7 @@ export default function RecipeDetailPage({ recipe }) {
           {recipe.image_url ? (
             <div className="w-full h-64 relative">
               <img 
-                src={recipe.image_url} 
+                src={recipe.image_variants?.large || recipe.image_variants?.webp || recipe.image_url} 
                 alt={recipe.title} 
                 className="w-full h-full object-cover" 
               />
@@ -110,7 +110,7 @@ export default function RecipeDetailPage({ recipe }) {
                     {step.media_url && step.media_type === 'image' && (
                       <div className="mt-3">
                         <img 
-                          src={step.media_url} 
+                          src={step.media_variants?.card || step.media_variants?.webp || step.media_url} 
                           alt={`Step ${idx + 1}`} 
                           className="rounded-md border border-gray-200 max-h-48 object-cover" 
                         />
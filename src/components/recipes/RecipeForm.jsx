@@ -105,7 +105,7 @@ const RecipeForm = ({ username, editMode = false, initialRecipe = null, recipeId
       let result;
       
       if (editMode) {
-        // Update existing recipe
+        // Update existing recipe; the form always sends every field, so PATCH replaces them all
         result = await updateRecipe(recipeId, {
           name: recipeData.name,
           story: recipeData.story,
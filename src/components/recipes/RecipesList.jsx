@@ -9,7 +9,9 @@ import { getUserRecipes, deleteRecipe } from '@/lib/api';
 
 export default function RecipesList() {
   const [recipes, setRecipes] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [filter, setFilter] = useState('all'); // 'all', 'private', 'shared'
   const { showToast } = useToast();
@@ -23,7 +25,8 @@ export default function RecipesList() {
       try {
         setIsLoading(true);
         const data = await getUserRecipes();
-        setRecipes(data);
+        setRecipes(data.recipes);
+        setNextCursor(data.next_cursor);
       } catch (error) {
         console.error('Error fetching recipes:', error);
         showToast('Failed to load recipes', 'error');
@@ -35,6 +38,22 @@ export default function RecipesList() {
     fetchRecipes();
   }, [showToast]);
 
+  // Fetch the next page and append it
+  const loadMoreRecipes = async () => {
+    if (!nextCursor || isLoadingMore) return;
+    try {
+      setIsLoadingMore(true);
+      const data = await getUserRecipes({ cursor: nextCursor });
+      setRecipes(prev => [...prev, ...data.recipes]);
+      setNextCursor(data.next_cursor);
+    } catch (error) {
+      console.error('Error fetching more recipes:', error);
+      showToast('Failed to load more recipes', 'error');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   // Filter and search recipes
   const filteredRecipes = recipes.filter(recipe => {
     // Apply search term filter
@@ -160,6 +179,14 @@ export default function RecipesList() {
                 <div className="px-4 py-4 sm:px-6">
                   <div className="flex items-center justify-between">
                     <div className="flex items-center">
+                      {recipe.thumbnail_url && (
+                        <img
+                          src={recipe.thumbnail_url}
+                          alt=""
+                          loading="lazy"
+                          className="h-10 w-10 mr-3 rounded object-cover flex-shrink-0"
+                        />
+                      )}
                       <p className="text-sm font-medium text-green-600 truncate">
                         {recipe.title}
                       </p>
@@ -253,6 +280,18 @@ export default function RecipesList() {
         )}
       </div>
 
+      {nextCursor && (
+        <div className="mt-4 text-center">
+          <button
+            onClick={loadMoreRecipes}
+            disabled={isLoadingMore}
+            className="inline-flex items-center px-4 py-2 border border-gray-300 shadow-sm text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more recipes'}
+          </button>
+        </div>
+      )}
+
       {/* Delete Confirmation Modal */}
       {showDeleteModal && (
         <div className="fixed inset-0 bg-black bg-opacity-50 flex items-center justify-center z-50">
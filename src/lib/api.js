@@ -1,6 +1,20 @@
 // src/lib/api.js
 const BASE_URL = 'http://localhost:5000/api';
 
+// Last response of each GET that came with an ETag. The next request for
+// the same URL sends If-None-Match, and a 304 reuses the stored body.
+const MAX_CACHED_RESPONSES = 100;
+const responseCache = new Map();
+
+function rememberResponse(url, etag, data) {
+  // Re-inserting keeps the Map in least-recently-used order
+  responseCache.delete(url);
+  responseCache.set(url, { etag, data });
+  if (responseCache.size > MAX_CACHED_RESPONSES) {
+    responseCache.delete(responseCache.keys().next().value);
+  }
+}
+
 async function fetchApi(endpoint, options = {}) {
   const url = `${BASE_URL}${endpoint}`;
   console.log(`Fetching from: ${url}`);
@@ -9,6 +23,12 @@ async function fetchApi(endpoint, options = {}) {
     'Content-Type': 'application/json',
   };
   
+  const isGet = (options.method || 'GET').toUpperCase() === 'GET';
+  const cached = isGet ? responseCache.get(url) : undefined;
+  if (cached) {
+    defaultHeaders['If-None-Match'] = cached.etag;
+  }
+  
   try {
     const response = await fetch(url, {
       ...options,
@@ -19,13 +39,25 @@ async function fetchApi(endpoint, options = {}) {
       credentials: 'include'  // This is crucial for authentication
     });
     
+    if (response.status === 304 && cached) {
+      rememberResponse(url, cached.etag, cached.data);
+      return cached.data;
+    }
+    
     if (!response.ok) {
       const errorText = await response.text();
       console.error(`API error (${response.status}): ${errorText}`);
       throw new Error(`API error: ${response.status}`);
     }
     
-    return response.json();
+    const data = await response.json();
+    const etag = isGet && response.headers.get('ETag');
+    if (etag) {
+      rememberResponse(url, etag, data);
+    } else if (cached) {
+      responseCache.delete(url);
+    }
+    return data;
   } catch (error) {
     console.error(`Fetch error for ${url}:`, error);
     throw error;
@@ -41,8 +73,64 @@ export async function createRecipe(recipeData) {
   });
 }
 
-export async function getUserRecipes() {
-  return fetchApi('/user/recipes');
+// Sends only the fields given; ingredients and steps, when present, replace the whole list
+export async function updateRecipe(recipeId, changes) {
+  return fetchApi(`/recipes/${recipeId}`, {
+    method: 'PATCH',
+    body: JSON.stringify(changes),
+  });
+}
+
+// Returns { recipes, next_cursor, total }; pass next_cursor back to get the next page
+export async function getUserRecipes({ cursor, limit } = {}) {
+  const params = new URLSearchParams();
+  if (cursor) params.set('cursor', cursor);
+  if (limit) params.set('limit', limit);
+  const query = params.toString();
+  return fetchApi(`/user/recipes${query ? `?${query}` : ''}`);
+}
+
+// Recipes shared into the user's families, newest first; returns { recipes, next_cursor }
+export async function getSharedRecipes({ cursor, limit } = {}) {
+  const params = new URLSearchParams();
+  if (cursor) params.set('cursor', cursor);
+  if (limit) params.set('limit', limit);
+  const query = params.toString();
+  return fetchApi(`/recipes/shared${query ? `?${query}` : ''}`);
+}
+
+// Share every recipe with every family in one request; returns { results, summary }
+// with a status per recipe/family pair
+export async function shareRecipes(recipeIds, familyIds) {
+  return fetchApi('/recipes/share', {
+    method: 'POST',
+    body: JSON.stringify({ recipe_ids: recipeIds, family_ids: familyIds }),
+  });
+}
+
+export async function unshareRecipes(recipeIds, familyIds) {
+  return fetchApi('/recipes/unshare', {
+    method: 'POST',
+    body: JSON.stringify({ recipe_ids: recipeIds, family_ids: familyIds }),
+  });
+}
+
+// Returns { recipes, next_cursor }; title_highlight and snippet are HTML with <mark> around matches
+export async function searchRecipes(query, { cursor, limit } = {}) {
+  const params = new URLSearchParams({ q: query });
+  if (cursor) params.set('cursor', cursor);
+  if (limit) params.set('limit', limit);
+  return fetchApi(`/recipes/search?${params.toString()}`);
+}
+
+// Recipes ranked by coverage of the given base ingredient ids, each with missing_count
+export async function getCookableRecipes(ingredientIds, { maxMissing, limit, offset } = {}) {
+  const params = new URLSearchParams();
+  ingredientIds.forEach((id) => params.append('ingredient_id', id));
+  if (maxMissing !== undefined) params.set('max_missing', maxMissing);
+  if (limit) params.set('limit', limit);
+  if (offset) params.set('offset', offset);
+  return fetchApi(`/recipes/cookable?${params.toString()}`);
 }
 
 export async function getRecipeById(id) {
@@ -79,14 +167,6 @@ export async function addBrand(brandData) {
   });
 }
 
-// Add to src/lib/api.js
-export async function updateRecipe(id, recipeData) {
-  return fetchApi(`/recipes/${id}`, {
-    method: 'PUT',
-    body: JSON.stringify(recipeData),
-  });
-}
-
 // Family API calls
 export async function getFamilies() {
   return fetchApi('/families');
@@ -0,0 +1,74 @@
+# stats_utils.py
+import os
+import psycopg2
+from dotenv import load_dotenv
+
+from db_utils import get_db_connection
+from cache_utils import TTLCache
+
+# Load environment variables
+load_dotenv()
+
+# Template key -> table whose rows it counts
+STAT_TABLES = {
+    'user_count': 'users',
+    'recipe_count': 'recipes',
+    'ingredient_count': 'base_ingredients',
+    'brand_count': 'brands',
+    'additive_count': 'additives',
+    'product_count': 'branded_ingredients',
+}
+
+# 'counters' reads the trigger-maintained table_counts table
+# (migrations/001_table_counts.sql); 'estimate' reads pg_class.reltuples.
+STATS_SOURCE = os.getenv('STATS_SOURCE', 'counters')
+
+_stats_cache = TTLCache(maxsize=1, ttl=float(os.getenv('STATS_CACHE_TTL', '10')))
+
+
+def _read_counters(cur):
+    cur.execute('SELECT table_name, row_count FROM table_counts WHERE table_name = ANY(%s)',
+                (list(STAT_TABLES.values()),))
+    return {row['table_name']: row['row_count'] for row in cur.fetchall()}
+
+
+def _read_estimates(cur):
+    # reltuples is -1 for tables that have never been analyzed
+    cur.execute('''
+        SELECT relname AS table_name, GREATEST(reltuples, 0)::bigint AS row_count
+        FROM pg_class
+        WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace AND relname = ANY(%s)
+    ''', (list(STAT_TABLES.values()),))
+    return {row['table_name']: row['row_count'] for row in cur.fetchall()}
+
+
+def get_admin_stats():
+    """Row counts for the admin header, served from cache when fresh."""
+    stats = _stats_cache.get('stats')
+    if stats is not None:
+        return stats
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    try:
+        if STATS_SOURCE == 'estimate':
+            counts = _read_estimates(cur)
+        else:
+            try:
+                counts = _read_counters(cur)
+            except psycopg2.errors.UndefinedTable:
+                # Migration not applied yet; approximate rather than scan
+                conn.rollback()
+                counts = _read_estimates(cur)
+    finally:
+        cur.close()
+        conn.close()
+
+    stats = {key: counts.get(table, 0) for key, table in STAT_TABLES.items()}
+    _stats_cache.set('stats', stats)
+    return stats
+
+
+def invalidate_stats():
+    _stats_cache.clear()
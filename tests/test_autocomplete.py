@@ -0,0 +1,121 @@
+# tests/test_autocomplete.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import autocomplete_utils
+from autocomplete_utils import PrefixIndex, AutocompleteService
+
+CATALOG = [
+    ('1', 'Basmati Rice', 'बासमती चावल'),
+    ('2', 'Brown Rice'),
+    ('3', 'Rice Flour'),
+    ('4', 'Red Lentils', 'masoor dal'),
+    ('5', 'Turmeric', 'haldi'),
+]
+
+
+def _names(index, ids):
+    return [index.name(id) for id in ids]
+
+
+@pytest.fixture
+def index():
+    return PrefixIndex.build(CATALOG)
+
+
+@pytest.mark.parametrize('term, expected', [
+    # Every word start is indexed; prefix matches in key order
+    ('rice', ['Basmati Rice', 'Brown Rice', 'Rice Flour']),
+    ('RI', ['Basmati Rice', 'Brown Rice', 'Rice Flour']),
+    ('  brown   ri ', ['Brown Rice']),
+    # Aliases find the primary name
+    ('haldi', ['Turmeric']),
+    ('dal', ['Red Lentils']),
+    ('चावल', ['Basmati Rice']),
+    # Typos fall back to trigram similarity on the name
+    ('turmerc', ['Turmeric']),
+    ('xyz', []),
+])
+def test_search(index, term, expected):
+    ids, has_more = index.search(term, 10)
+    assert _names(index, ids) == expected
+    assert not has_more
+
+
+def test_empty_term_lists_names_in_order(index):
+    ids, has_more = index.search('', 3)
+    assert _names(index, ids) == ['Basmati Rice', 'Brown Rice', 'Red Lentils']
+    assert has_more
+    ids, has_more = index.search('', 3, offset=3)
+    assert _names(index, ids) == ['Rice Flour', 'Turmeric']
+    assert not has_more
+
+
+@pytest.mark.parametrize('allowed', [{'2', '3'}, {'2', '3', 'missing'}])
+def test_allowed_filters_both_strategies(index, allowed, monkeypatch):
+    for threshold in (0, 1000):
+        # Large allowed sets walk the sorted keys, small ones are scanned
+        monkeypatch.setattr(autocomplete_utils, 'SCAN_THRESHOLD', threshold)
+        assert _names(index, index.search('ri', 10, allowed=allowed)[0]) == ['Brown Rice', 'Rice Flour']
+        assert _names(index, index.search('', 10, allowed=allowed)[0]) == ['Brown Rice', 'Rice Flour']
+
+
+def test_build_matches_incremental_adds():
+    built = PrefixIndex.build(CATALOG)
+    added = PrefixIndex()
+    for id, name, *aliases in reversed(CATALOG):
+        added.add(id, name, *aliases)
+    for term in ('', 'r', 'rice', 'masoor', 'lentls'):
+        assert built.search(term, 10) == added.search(term, 10)
+
+
+def test_add_replaces_and_remove_forgets(index):
+    index.add('2', 'Wild Rice')
+    assert _names(index, index.search('brown', 10)[0]) == []
+    assert _names(index, index.search('wild', 10)[0]) == ['Wild Rice']
+    assert 'Wild Rice' in _names(index, index.search('', 10)[0])
+
+    index.remove('2')
+    index.remove('2')
+    assert len(index) == 4
+    assert _names(index, index.search('rice', 10)[0]) == ['Basmati Rice', 'Rice Flour']
+    assert 'Wild Rice' not in _names(index, index.search('', 10)[0])
+
+
+def _service(monkeypatch):
+    service = AutocompleteService()
+    snapshot = (PrefixIndex.build(CATALOG), PrefixIndex.build([('b1', 'Acme'), ('b2', 'Zest')]),
+                {'p1': ('1', 'b1')}, {'1': {'b1'}})
+    monkeypatch.setattr(service, '_read_snapshot', lambda: snapshot)
+    service.load()
+    return service
+
+
+def test_brand_search_is_limited_to_the_ingredient(monkeypatch):
+    service = _service(monkeypatch)
+    assert service.search_brands('1', '', 10) == ([{'id': 'b1', 'name': 'Acme'}], False)
+    service.branded_saved('p2', '1', 'b2')
+    assert service.search_brands('1', '', 10) == ([{'id': 'b1', 'name': 'Acme'}, {'id': 'b2', 'name': 'Zest'}], False)
+    service.branded_deleted('p1')
+    assert service.search_brands('1', '', 10) == ([{'id': 'b2', 'name': 'Zest'}], False)
+    assert service.search_brands('2', '', 10) == ([], False)
+
+
+def test_changes_during_a_reload_survive_the_swap(monkeypatch):
+    service = _service(monkeypatch)
+    stale = (PrefixIndex.build(CATALOG), PrefixIndex(), {}, {})
+
+    def read_snapshot():
+        # Saved by a request while the reload reads the database
+        service.ingredient_saved('6', 'Jaggery', 'gur')
+        service.ingredient_deleted('5')
+        return stale
+
+    monkeypatch.setattr(service, '_read_snapshot', read_snapshot)
+    service.load()
+    assert service.search_ingredients('gur', 10) == ([{'id': '6', 'name': 'Jaggery'}], False)
+    assert service.search_ingredients('turmeric', 10) == ([], False)
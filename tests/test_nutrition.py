@@ -0,0 +1,103 @@
+# tests/test_nutrition.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nutrition_utils import parse_quantity, calculate_nutrition
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('2', (2.0, '')),
+    ('1.5 cups', (1.5, 'cups')),
+    ('1 1/2 cups', (1.5, 'cups')),
+    ('3/4 tsp', (0.75, 'tsp')),
+    ('½ cup', (0.5, 'cup')),
+    ('1½ cups', (1.5, 'cups')),
+    ('200g', (200.0, 'g')),
+    ('2 Tbsp.', (2.0, 'tbsp')),
+    ('  3   pieces ', (3.0, 'pieces')),
+    ('1/0', (None, '')),
+    ('0/0 g', (None, '')),
+    ('a pinch', (None, '')),
+    ('', (None, '')),
+    (None, (None, '')),
+])
+def test_parse_quantity(text, expected):
+    assert parse_quantity(text) == expected
+
+
+FLOUR = 'flour'          # 364 kcal per 100 g
+COOKIE = 'cookie'        # 70 kcal per 30 g serving
+SALT = 'salt'            # no nutrient rows
+
+UNITS = {
+    'by_id': {'unit-g': 1.0, 'unit-piece': None},
+    'by_name': {'g': 1.0, 'gram': 1.0, 'kg': 1000.0, 'piece': None},
+}
+NUTRIENT_ROWS = [
+    {'branded_ingredient_id': FLOUR, 'nutrient_id': 'kcal', 'amount': 364, 'per_serving': False,
+     'name': 'Energy', 'unit': 'kcal', 'daily_value': 2000, 'display_order': 1},
+    {'branded_ingredient_id': COOKIE, 'nutrient_id': 'kcal', 'amount': 70, 'per_serving': True,
+     'name': 'Energy', 'unit': 'kcal', 'daily_value': 2000, 'display_order': 1},
+]
+SERVING_SIZES = {COOKIE: (30, 'g')}
+
+
+def _inputs(servings, *ingredients):
+    rows = []
+    for product, quantity, unit_id in ingredients:
+        serving_size, serving_unit = SERVING_SIZES.get(product, (None, None))
+        rows.append({
+            'branded_ingredient_id': product, 'quantity': quantity, 'unit_id': unit_id,
+            'ingredient_name': product, 'serving_size': serving_size, 'serving_unit': serving_unit,
+        })
+    # Only the recipe's products, as load_nutrition_inputs() reads them
+    products = {product for product, _, _ in ingredients}
+    nutrient_rows = [row for row in NUTRIENT_ROWS if row['branded_ingredient_id'] in products]
+    return {'recipe_id': 'recipe', 'servings': servings, 'ingredients': rows,
+            'nutrient_rows': nutrient_rows, 'units': UNITS}
+
+
+@pytest.mark.parametrize('servings, ingredients, total, unresolved', [
+    # Grams against per-100 g data plus a count against per-serving data
+    (4, [(FLOUR, '200 g', None), (COOKIE, '2', None)], 868.0, []),
+    # Unit from unit_id rather than the quantity text
+    (1, [(FLOUR, '50', 'unit-g')], 182.0, []),
+    (1, [(FLOUR, '0.5 kg', None)], 1820.0, []),
+    # Weight converted to servings through serving_info
+    (1, [(COOKIE, '60 g', None)], 140.0, []),
+    # Count units are servings of the product
+    (1, [(COOKIE, '3 pieces', None)], 210.0, []),
+    (1, [(COOKIE, '1', 'unit-piece')], 70.0, []),
+    # A count of a product measured per 100 g has no weight to go by
+    (1, [(FLOUR, '2', None)], 0.0, ['quantity could not be converted']),
+    (1, [(FLOUR, 'a pinch', None)], 0.0, ['quantity could not be converted']),
+    (1, [(FLOUR, '2 handfuls', None)], 0.0, ['quantity could not be converted']),
+    (1, [(FLOUR, '1/0 g', None)], 0.0, ['quantity could not be converted']),
+    (1, [(SALT, '5 g', None), (FLOUR, '100 g', None)], 364.0, ['no nutrition data']),
+    # Missing servings count as one
+    (None, [(FLOUR, '100 g', None)], 364.0, []),
+])
+def test_calculate_nutrition(servings, ingredients, total, unresolved):
+    result = calculate_nutrition(_inputs(servings, *ingredients))
+
+    energy, = result['nutrients']
+    assert energy['total'] == total
+    assert energy['per_serving'] == round(total / (servings or 1), 2)
+    assert [item['reason'] for item in result['unresolved']] == unresolved
+
+
+def test_calculate_nutrition_per_serving_and_daily_value():
+    result = calculate_nutrition(_inputs(4, (FLOUR, '200 g', None), (COOKIE, '2', None)))
+    assert result['servings'] == 4
+    assert result['nutrients'] == [{
+        'id': 'kcal', 'name': 'Energy', 'unit': 'kcal',
+        'total': 868.0, 'per_serving': 217.0, 'percent_daily_value': 10.8,
+    }]
+
+
+def test_calculate_nutrition_without_recipe():
+    assert calculate_nutrition(None) is None
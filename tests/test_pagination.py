@@ -0,0 +1,78 @@
+# tests/test_pagination.py
+import os
+import sys
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pagination_utils import InvalidCursor, encode_cursor, decode_cursor, parse_limit, like_escape
+
+
+@pytest.mark.parametrize('values, decoded', [
+    (('abc',), ['abc']),
+    ((datetime(2025, 1, 2, 3, 4, 5, 678, tzinfo=timezone.utc), 'f8b0c3c2-5a6e-4c53-9a39-0c6f9d1f3e11'),
+     ['2025-01-02T03:04:05.000678+00:00', 'f8b0c3c2-5a6e-4c53-9a39-0c6f9d1f3e11']),
+    ((42, 'ünïcode ✓', ''), ['42', 'ünïcode ✓', '']),
+])
+def test_cursor_round_trip(values, decoded):
+    token = encode_cursor(*values)
+    assert '=' not in token
+    assert decode_cursor(token, len(values)) == decoded
+
+
+def test_cursor_datetime_parses_back():
+    shown = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    shared_at, _ = decode_cursor(encode_cursor(shown, 'id'), 2)
+    assert datetime.fromisoformat(shared_at) == shown
+
+
+def _token(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('token, size', [
+    ('', 1),
+    ('not base64!', 1),
+    (base64.urlsafe_b64encode(b'not json').decode(), 1),
+    (_token({'a': 'b'}), 1),
+    (_token(['a', 'b']), 1),
+    (_token(['a']), 2),
+    (_token([1]), 1),
+    (_token([None]), 1),
+])
+def test_decode_cursor_rejects_foreign_tokens(token, size):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, size)
+
+
+def test_invalid_cursor_is_a_value_error():
+    # Callers that already catch ValueError keep working
+    assert issubclass(InvalidCursor, ValueError)
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, 20),
+    ('10', 10),
+    ('0', 1),
+    ('-5', 1),
+    ('500', 50),
+    ('abc', 20),
+    ('', 20),
+])
+def test_parse_limit(value, expected):
+    assert parse_limit(value, 20, 50) == expected
+
+
+@pytest.mark.parametrize('term, escaped', [
+    ('rice', 'rice'),
+    ('100%', '100\\%'),
+    ('a_b', 'a\\_b'),
+    ('back\\slash', 'back\\\\slash'),
+    ('%_\\', '\\%\\_\\\\'),
+])
+def test_like_escape(term, escaped):
+    assert like_escape(term) == escaped
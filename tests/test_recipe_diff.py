@@ -0,0 +1,50 @@
+# tests/test_recipe_diff.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recipe_utils import _diff_rows
+
+FIELDS = ('text',)
+
+
+def stored(*texts):
+    return [{'id': 100 + idx, 'text': text, 'position': idx} for idx, text in enumerate(texts)]
+
+
+def wanted(*texts):
+    return [{'text': text, 'position': idx} for idx, text in enumerate(texts)]
+
+
+@pytest.mark.parametrize('old, new, updates, inserts, delete_ids', [
+    # Unchanged rows produce no writes
+    (('a', 'b'), ('a', 'b'), [], [], []),
+    # Swapping two rows only rewrites their positions
+    (('a', 'b'), ('b', 'a'),
+     [{'id': 101, 'text': 'b', 'position': 0}, {'id': 100, 'text': 'a', 'position': 1}], [], []),
+    # An edited row becomes one UPDATE in place
+    (('a', 'b', 'c'), ('a', 'B', 'c'), [{'id': 101, 'text': 'B', 'position': 1}], [], []),
+    # Appending inserts; the existing rows stay put
+    (('a',), ('a', 'b'), [], [{'text': 'b', 'position': 1}], []),
+    # Removing from the middle shifts the rows after it
+    (('a', 'b', 'c'), ('a', 'c'), [{'id': 102, 'text': 'c', 'position': 1}], [], [101]),
+    # Leftovers are reused in order before anything is inserted
+    (('a', 'b'), ('x', 'y', 'z'),
+     [{'id': 100, 'text': 'x', 'position': 0}, {'id': 101, 'text': 'y', 'position': 1}],
+     [{'text': 'z', 'position': 2}], []),
+    # Duplicate content pairs one stored row each
+    (('a', 'a', 'b'), ('a', 'b'), [{'id': 102, 'text': 'b', 'position': 1}], [], [101]),
+    ((), ('a',), [], [{'text': 'a', 'position': 0}], []),
+    (('a', 'b'), (), [], [], [100, 101]),
+])
+def test_diff_rows(old, new, updates, inserts, delete_ids):
+    assert _diff_rows(stored(*old), wanted(*new), FIELDS) == (updates, inserts, delete_ids)
+
+
+def test_diff_rows_compares_every_field():
+    old = [{'id': 1, 'amount': '1', 'unit': 'cup', 'position': 0}]
+    new = [{'amount': '1', 'unit': 'tbsp', 'position': 0}]
+    assert _diff_rows(old, new, ('amount', 'unit')) == ([dict(new[0], id=1)], [], [])
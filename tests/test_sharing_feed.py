@@ -0,0 +1,107 @@
+# tests/test_sharing_feed.py
+# Runs against the database configured by DB_HOST/DB_NAME/DB_USER/DB_PASSWORD
+# with the schema and migrations applied; every test rolls back its rows.
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_utils import open_connection
+from sharing_utils import get_shared_feed
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def cur():
+    try:
+        conn = open_connection()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"database not available: {e}")
+    try:
+        yield conn.cursor()
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def _user(cur, name):
+    cur.execute('''
+        INSERT INTO users (email, password_hash, first_name, last_name)
+        VALUES (%s, 'x', %s, 'Test') RETURNING id
+    ''', (f"{name}-{uuid.uuid4().hex}@example.com", name))
+    return str(cur.fetchone()['id'])
+
+
+def _family(cur, name, owner_id, *member_ids):
+    cur.execute('INSERT INTO families (name, created_by_user_id) VALUES (%s, %s) RETURNING id', (name, owner_id))
+    family_id = str(cur.fetchone()['id'])
+    for user_id in (owner_id,) + member_ids:
+        cur.execute('INSERT INTO family_members (family_id, user_id, is_active) VALUES (%s, %s, true)',
+                    (family_id, user_id))
+    return family_id
+
+
+def _recipe(cur, title, owner_id):
+    cur.execute('INSERT INTO recipes (title, created_by_user_id) VALUES (%s, %s) RETURNING id', (title, owner_id))
+    return str(cur.fetchone()['id'])
+
+
+def _share(cur, recipe_id, family_id, user_id, minutes):
+    cur.execute('''
+        INSERT INTO recipe_sharing (recipe_id, family_id, shared_by_user_id, shared_at)
+        VALUES (%s, %s, %s, %s)
+    ''', (recipe_id, family_id, user_id, T0 + timedelta(minutes=minutes)))
+
+
+def _walk(cur, user_id, page_size):
+    """Every page of the feed the way GET /api/recipes/shared pages it."""
+    titles, after = [], None
+    while True:
+        rows = get_shared_feed(cur, user_id, page_size + 1, after)
+        page = rows[:page_size]
+        titles.extend(row['title'] for row in page)
+        if len(rows) <= page_size:
+            return titles
+        after = (page[-1]['shared_at'], str(page[-1]['id']))
+
+
+def test_recipes_shared_again_in_another_family_do_not_hide_older_shares(cur):
+    viewer = _user(cur, 'viewer')
+    owner = _user(cur, 'owner')
+    family_a = _family(cur, 'A', owner, viewer)
+    family_b = _family(cur, 'B', owner, viewer)
+    r1, r2, r3 = (_recipe(cur, title, owner) for title in ('R1', 'R2', 'R3'))
+
+    _share(cur, r1, family_b, owner, 10)
+    _share(cur, r2, family_b, owner, 9)
+    _share(cur, r1, family_a, owner, 5)
+    _share(cur, r2, family_a, owner, 4)
+    _share(cur, r3, family_a, owner, 3)
+
+    for page_size in (1, 2, 3, 10):
+        assert _walk(cur, viewer, page_size) == ['R1', 'R2', 'R3']
+
+
+def test_feed_lists_each_recipe_once_at_its_newest_share(cur):
+    viewer = _user(cur, 'viewer')
+    owner = _user(cur, 'owner')
+    family_a = _family(cur, 'A', owner, viewer)
+    family_b = _family(cur, 'B', owner, viewer)
+    own = _recipe(cur, 'Own', viewer)
+    r1, r2 = _recipe(cur, 'R1', owner), _recipe(cur, 'R2', owner)
+
+    _share(cur, r1, family_a, owner, 1)
+    _share(cur, r2, family_a, owner, 2)
+    _share(cur, r1, family_b, owner, 3)
+    _share(cur, own, family_a, viewer, 4)
+
+    rows = get_shared_feed(cur, viewer, 10)
+    assert [row['title'] for row in rows] == ['R1', 'R2']
+    assert str(rows[0]['family_id']) == family_b
+    assert rows[0]['family_names'] == ['A', 'B']
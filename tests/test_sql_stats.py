@@ -0,0 +1,71 @@
+# tests/test_sql_stats.py
+import os
+import sys
+
+import psycopg2
+import pytest
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sql_stats_utils
+from sql_stats_utils import normalize_sql, RequestQueryStats, instrumented
+
+
+@pytest.mark.parametrize('statement, shape', [
+    ("SELECT * FROM t WHERE id = 'abc' AND n = 42", 'SELECT * FROM t WHERE id = ? AND n = ?'),
+    ("SELECT 'it''s', 'a' || 'b'", 'SELECT ?, ? || ?'),
+    ('WHERE price > 3.50 LIMIT 10 OFFSET 20', 'WHERE price > ? LIMIT ? OFFSET ?'),
+    # Digits inside identifiers and placeholders are kept
+    ('SELECT t1.col2 FROM t1 WHERE id = %s', 'SELECT t1.col2 FROM t1 WHERE id = %s'),
+    ('SELECT x FROM t WHERE id = %(id)s', 'SELECT x FROM t WHERE id = %(id)s'),
+    ('  SELECT\n\tx\n  FROM   t  ', 'SELECT x FROM t'),
+    (b"INSERT INTO t VALUES (1, 'a'), (2, 'b')", 'INSERT INTO t VALUES (?, ?), (?, ?)'),
+])
+def test_normalize_sql(statement, shape):
+    assert normalize_sql(statement) == shape
+
+
+def test_repeated_groups_statements_by_shape():
+    stats = RequestQueryStats()
+    for id in range(12):
+        stats.record(f"SELECT * FROM recipes WHERE id = '{id}'", 0.001)
+    for _ in range(3):
+        stats.record('SELECT * FROM users WHERE id = %s', 0.002)
+    stats.record('SELECT 1', 0.010)
+
+    assert stats.count == 16
+    assert stats.slowest_sql == 'SELECT 1'
+    assert stats.repeated(10) == [('SELECT * FROM recipes WHERE id = ?', 12)]
+    assert stats.repeated(2) == [('SELECT * FROM recipes WHERE id = ?', 12),
+                                 ('SELECT * FROM users WHERE id = %s', 3)]
+
+
+@pytest.fixture
+def conn():
+    try:
+        conn = psycopg2.connect(
+            host=os.getenv('DB_HOST', 'localhost'),
+            database=os.getenv('DB_NAME', 'recipe_keeper'),
+            user=os.getenv('DB_USER', 'postgres'),
+            password=os.getenv('DB_PASSWORD', 'password'),
+        )
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"database not available: {e}")
+    yield conn
+    conn.close()
+
+
+def test_composed_statements_are_recorded_as_sql(conn):
+    stats = RequestQueryStats()
+    token = sql_stats_utils._current.set(stats)
+    try:
+        cur = conn.cursor(cursor_factory=instrumented(RealDictCursor))
+        for column in ('typname', 'typlen'):
+            cur.execute(sql.SQL('SELECT {} FROM pg_type WHERE oid = %s').format(sql.Identifier(column)), (23,))
+    finally:
+        sql_stats_utils._current.reset(token)
+
+    assert stats.repeated(0) == [('SELECT "typname" FROM pg_type WHERE oid = %s', 1),
+                                 ('SELECT "typlen" FROM pg_type WHERE oid = %s', 1)]